@@ -43,7 +43,7 @@ show_help() {
     echo "用法: $0 [选项]"
     echo ""
     echo "选项:"
-    echo "  --component <name>    只构建指定组件 (debezium-embedded|sftp-to-s3|mysql-to-s3)"
+    echo "  --component <name>    只构建指定组件 (debezium-embedded|sftp-to-s3|mysql-to-s3|multi-source-host)"
     echo "  --parallel           并行构建所有组件"
     echo "  --release            发布模式构建"
     echo "  --clean              清理构建产物"
@@ -130,7 +130,7 @@ build_sftp_component() {
     cd components/sftp-to-s3
     
     # 验证Python代码语法
-    python3 -m py_compile sftp_to_s3.py || {
+    python3 -m py_compile sftp_to_s3.py ../common/pipeline_common.py || {
         log_error "SFTP组件Python代码语法错误"
         return 1
     }
@@ -158,7 +158,7 @@ build_mysql_component() {
     cd components/mysql-to-s3
     
     # 验证Python代码语法
-    python3 -m py_compile mysql_to_s3.py || {
+    python3 -m py_compile mysql_to_s3.py ../common/pipeline_common.py || {
         log_error "MySQL组件Python代码语法错误"
         return 1
     }
@@ -179,6 +179,42 @@ build_mysql_component() {
     log_success "MySQL组件构建完成"
 }
 
+# 构建多源宿主组件
+build_multi_source_component() {
+    log_info "构建多源宿主组件..."
+    
+    cd components/multi-source-host
+    
+    # 验证Python代码语法
+    python3 -m py_compile multi_source_host.py || {
+        log_error "多源宿主组件Python代码语法错误"
+        return 1
+    }
+    
+    # 宿主进程加载的源组件和共享模块必须与宿主一起发布
+    for source_file in ../sftp-to-s3/sftp_to_s3.py ../mysql-to-s3/mysql_to_s3.py ../common/pipeline_common.py; do
+        if [ ! -f "$source_file" ]; then
+            log_error "源组件文件不存在: $source_file"
+            return 1
+        fi
+    done
+    
+    # 验证依赖文件
+    if [ ! -f "multi_source_requirements.txt" ]; then
+        log_error "multi_source_requirements.txt文件不存在"
+        return 1
+    fi
+    
+    # 验证recipe文件
+    python3 -c "import json; json.load(open('recipe.json'))" || {
+        log_error "recipe.json格式验证失败"
+        return 1
+    }
+    
+    cd ../..
+    log_success "多源宿主组件构建完成"
+}
+
 # 并行构建所有组件
 build_all_parallel() {
     log_info "开始并行构建所有组件..."
@@ -202,6 +238,11 @@ build_all_parallel() {
     ) &
     MYSQL_PID=$!
     
+    (
+        build_multi_source_component && echo "multi-source-success" > /tmp/build-results/multi-source.result
+    ) &
+    MULTI_SOURCE_PID=$!
+    
     # 等待所有构建完成
     wait $DEBEZIUM_PID
     DEBEZIUM_EXIT=$?
@@ -212,8 +253,11 @@ build_all_parallel() {
     wait $MYSQL_PID
     MYSQL_EXIT=$?
     
+    wait $MULTI_SOURCE_PID
+    MULTI_SOURCE_EXIT=$?
+    
     # 检查构建结果
-    if [ $DEBEZIUM_EXIT -eq 0 ] && [ $SFTP_EXIT -eq 0 ] && [ $MYSQL_EXIT -eq 0 ]; then
+    if [ $DEBEZIUM_EXIT -eq 0 ] && [ $SFTP_EXIT -eq 0 ] && [ $MYSQL_EXIT -eq 0 ] && [ $MULTI_SOURCE_EXIT -eq 0 ]; then
         log_success "所有组件并行构建完成"
         rm -rf /tmp/build-results
         return 0
@@ -231,6 +275,7 @@ build_all_sequential() {
     build_debezium_component || return 1
     build_sftp_component || return 1
     build_mysql_component || return 1
+    build_multi_source_component || return 1
     
     log_success "所有组件顺序构建完成"
 }
@@ -284,6 +329,10 @@ IoT Greengrass CDC 解决方案构建报告
    版本: ${MYSQL_COMPONENT_VERSION}
    状态: $([ -f "components/mysql-to-s3/mysql_to_s3.py" ] && echo "✅ 构建成功" || echo "❌ 构建失败")
 
+4. 多源宿主组件
+   版本: ${MULTI_SOURCE_COMPONENT_VERSION}
+   状态: $([ -f "components/multi-source-host/multi_source_host.py" ] && echo "✅ 构建成功" || echo "❌ 构建失败")
+
 文件统计:
 ---------
 $(find components -name "*.py" -o -name "*.jar" -o -name "*.json" | wc -l) 个源文件
@@ -369,9 +418,12 @@ main() {
             mysql-to-s3)
                 build_mysql_component
                 ;;
+            multi-source-host)
+                build_multi_source_component
+                ;;
             *)
                 log_error "未知组件: $COMPONENT"
-                log_info "可用组件: debezium-embedded, sftp-to-s3, mysql-to-s3"
+                log_info "可用组件: debezium-embedded, sftp-to-s3, mysql-to-s3, multi-source-host"
                 exit 1
                 ;;
         esac
@@ -0,0 +1,804 @@
+#!/usr/bin/env python3
+"""
+SFTP/MySQL到S3组件的共享模块
+日志配置、分阶段计时、导出准入控制、导出预写日志、本地存储转发缓冲区和运行时配置来源。
+作为工件与各组件文件一起部署到同一目录，由组件和多源宿主导入。
+"""
+
+import atexit
+import bisect
+import contextlib
+import cProfile
+import json
+import logging
+import mmap
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class JsonLogFormatter(logging.Formatter):
+    """结构化日志: 每条日志输出一行JSON
+    汇总类日志通过extra={'fields': {...}}附带数值字段，合并到顶层，便于日志系统直接按字段聚合
+    """
+    
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.utcfromtimestamp(record.created).isoformat() + 'Z',
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'msg': record.getMessage(),
+        }
+        entry.update(getattr(record, 'fields', {}))
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """按日志模板限流: 每个时间窗口内同一模板最多输出rate条，被抑制的条数附加到下一窗口的第一条上
+    只限制INFO/DEBUG等低于WARNING的日志，警告和错误总是输出，避免重复的失败信息被丢弃
+    依赖惰性格式化（logger.info("...%s", arg)），模板相同的日志才能归为一类
+    """
+    
+    def __init__(self, rate: int, interval: int):
+        super().__init__()
+        self.rate = rate
+        self.interval = interval
+        # (logger名, 模板) -> [窗口开始时间, 已输出条数, 被抑制条数]
+        self.windows: Dict[Tuple[str, str], List[Any]] = {}
+        self.last_expire = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def expire_windows(self, now: float):
+        """清理过期窗口，避免只出现过一次的模板一直占用内存
+        有被抑制条数的窗口多保留一个周期，模板再次出现时仍能附加抑制条数
+        """
+        self.windows = {
+            key: window for key, window in self.windows.items()
+            if now - window[0] < (2 * self.interval if window[2] else self.interval)
+        }
+        self.last_expire = now
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        key = (record.name, str(record.msg))
+        now = time.monotonic()
+        with self.lock:
+            if now - self.last_expire >= self.interval:
+                self.expire_windows(now)
+            window = self.windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                suppressed = window[2] if window else 0
+                self.windows[key] = [now, 1, 0]
+                if suppressed:
+                    record.msg = f"{record.msg} [前一窗口内另有{suppressed}条相同日志被抑制]"
+                return True
+            if window[1] < self.rate:
+                window[1] += 1
+                return True
+            window[2] += 1
+            return False
+
+
+def configure_logging() -> Optional[QueueListener]:
+    """配置日志: LOG_LEVEL控制级别，LOG_FORMAT=json输出结构化日志，LOG_RATE_LIMIT按模板限流
+    消息在调用线程中格式化（QueueHandler.prepare）后放入队列，写出由QueueListener后台线程完成，工作线程不做日志I/O
+    """
+    root_logger = logging.getLogger()
+    if root_logger.handlers:
+        # 已由宿主进程配置
+        return None
+    
+    output_handler = logging.StreamHandler()
+    if os.getenv('LOG_FORMAT', 'text').lower() == 'json':
+        output_handler.setFormatter(JsonLogFormatter())
+    else:
+        output_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    rate_limit = int(os.getenv('LOG_RATE_LIMIT', 20))
+    if rate_limit > 0:
+        queue_handler.addFilter(RateLimitFilter(rate_limit, int(os.getenv('LOG_RATE_INTERVAL', 60))))
+    
+    root_logger.addHandler(queue_handler)
+    root_logger.setLevel(os.getenv('LOG_LEVEL', 'INFO').upper())
+    
+    listener = QueueListener(log_queue, output_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+
+class TimingSpan:
+    """单调时钟计时span，退出时将耗时记录到所属阶段"""
+    
+    __slots__ = ('profiler', 'stage', 'started')
+    
+    def __init__(self, profiler: "StageProfiler", stage: str):
+        self.profiler = profiler
+        self.stage = stage
+        self.started = 0.0
+    
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.profiler.record(self.stage, time.perf_counter() - self.started)
+        return False
+
+
+class StageProfiler:
+    """可选的分阶段计时: 按阶段聚合耗时直方图，并可按需对一轮处理做cProfile采样
+    未启用时span()返回共享的空上下文管理器，热路径开销只有一次属性判断
+    """
+    
+    BUCKET_BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+    NULL_SPAN = contextlib.nullcontext()
+    
+    def __init__(self, name: str, enabled: bool, report_interval: int, profile_dir: str):
+        self.name = name
+        self.enabled = enabled
+        self.report_interval = report_interval
+        self.profile_dir = profile_dir
+        
+        # 阶段名 -> {'count', 'total', 'max', 'buckets'}
+        self.stats: Dict[str, Dict[str, Any]] = {}
+        self.lock = threading.Lock()
+        self.last_report = time.monotonic()
+        self.profile_requested = False
+    
+    def span(self, stage: str):
+        if not self.enabled:
+            return self.NULL_SPAN
+        return TimingSpan(self, stage)
+    
+    def record(self, stage: str, elapsed: float):
+        elapsed_ms = elapsed * 1000
+        with self.lock:
+            stat = self.stats.get(stage)
+            if stat is None:
+                stat = {'count': 0, 'total': 0.0, 'max': 0.0, 'buckets': [0] * (len(self.BUCKET_BOUNDS_MS) + 1)}
+                self.stats[stage] = stat
+            stat['count'] += 1
+            stat['total'] += elapsed_ms
+            stat['max'] = max(stat['max'], elapsed_ms)
+            stat['buckets'][bisect.bisect_left(self.BUCKET_BOUNDS_MS, elapsed_ms)] += 1
+    
+    def percentile(self, stat: Dict[str, Any], fraction: float) -> float:
+        """按直方图桶上界估算分位数(毫秒)"""
+        target = stat['count'] * fraction
+        cumulative = 0
+        for index, count in enumerate(stat['buckets']):
+            cumulative += count
+            if cumulative >= target:
+                return self.BUCKET_BOUNDS_MS[index] if index < len(self.BUCKET_BOUNDS_MS) else stat['max']
+        return stat['max']
+    
+    def report(self, force: bool = False):
+        """按报告间隔输出各阶段耗时汇总"""
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        if not force and now - self.last_report < self.report_interval:
+            return
+        self.last_report = now
+        
+        with self.lock:
+            for stage, stat in sorted(self.stats.items(), key=lambda item: -item[1]['total']):
+                fields = {
+                    'profile': self.name,
+                    'stage': stage,
+                    'count': stat['count'],
+                    'total_ms': round(stat['total'], 1),
+                    'avg_ms': round(stat['total'] / stat['count'], 2),
+                    'p50_ms': self.percentile(stat, 0.5),
+                    'p99_ms': self.percentile(stat, 0.99),
+                    'max_ms': round(stat['max'], 1),
+                }
+                logger.info("[profile %s] %s: 次数=%d 总计=%.1fms 平均=%.2fms p50≤%sms p99≤%sms 最大=%.1fms",
+                            self.name, stage, fields['count'], fields['total_ms'], fields['avg_ms'],
+                            fields['p50_ms'], fields['p99_ms'], fields['max_ms'], extra={'fields': fields})
+    
+    def request_profile(self):
+        """请求对下一轮处理做cProfile采样（可在信号处理函数中调用）"""
+        self.profile_requested = True
+    
+    def run_cycle(self, func: Callable[[], Any]) -> Any:
+        """执行一轮处理；有采样请求时在cProfile下执行并写出pstats文件"""
+        if not self.profile_requested:
+            result = func()
+            self.report()
+            return result
+        
+        self.profile_requested = False
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(func)
+        finally:
+            dump_path = os.path.join(
+                self.profile_dir,
+                f"{self.name}_{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}.pstats"
+            )
+            profiler.dump_stats(dump_path)
+            logger.info("cProfile采样已写出: %s", dump_path)
+            self.report(force=True)
+
+
+class ExportBackpressure:
+    """导出准入控制: 在途导出任务数或数据流占用超过高水位时暂停生产，回落到低水位后恢复"""
+    
+    def __init__(self, high_water_tasks: int, low_water_tasks: int,
+                 high_water_bytes: int, low_water_bytes: int):
+        self.high_water_tasks = high_water_tasks
+        self.low_water_tasks = low_water_tasks
+        self.high_water_bytes = high_water_bytes
+        self.low_water_bytes = low_water_bytes
+        
+        self.in_flight_tasks = 0
+        self.stream_bytes = 0
+        self.paused = False
+        self.condition = threading.Condition()
+    
+    def task_submitted(self):
+        with self.condition:
+            self.in_flight_tasks += 1
+            self._update_state()
+    
+    def task_finished(self):
+        with self.condition:
+            self.in_flight_tasks = max(0, self.in_flight_tasks - 1)
+            self._update_state()
+    
+    def update_stream_bytes(self, total_bytes: int):
+        with self.condition:
+            self.stream_bytes = total_bytes
+            self._update_state()
+    
+    def _update_state(self):
+        """高低水位滞回，避免在阈值附近频繁切换"""
+        if not self.paused:
+            if self.in_flight_tasks >= self.high_water_tasks or self.stream_bytes >= self.high_water_bytes:
+                self.paused = True
+                logger.warning("导出积压超过高水位，暂停生产: 在途任务 %s, 流占用 %s 字节", self.in_flight_tasks, self.stream_bytes)
+        elif self.in_flight_tasks <= self.low_water_tasks and self.stream_bytes <= self.low_water_bytes:
+            self.paused = False
+            logger.info("导出积压回落到低水位，恢复生产: 在途任务 %s, 流占用 %s 字节", self.in_flight_tasks, self.stream_bytes)
+            self.condition.notify_all()
+    
+    def update_thresholds(self, high_water_tasks: int, low_water_tasks: int,
+                          high_water_bytes: int, low_water_bytes: int):
+        """运行时调整水位"""
+        with self.condition:
+            self.high_water_tasks = high_water_tasks
+            self.low_water_tasks = low_water_tasks
+            self.high_water_bytes = high_water_bytes
+            self.low_water_bytes = low_water_bytes
+            self._update_state()
+    
+    def admit(self) -> bool:
+        """非阻塞检查是否允许继续生产"""
+        return not self.paused
+    
+    def wait_for_capacity(self, timeout: float) -> bool:
+        """阻塞等待直到恢复生产或超时"""
+        with self.condition:
+            return self.condition.wait_for(lambda: not self.paused, timeout)
+
+
+class ExportJournal:
+    """导出预写日志(JSON Lines)
+    append_message之前写入intent（批次ID、S3键、临时文件、清单、提交后要生效的状态更新），
+    成功后写入commit，失败写入abort。重启时重放日志恢复已提交的状态，并用保留的临时文件重新提交未完成的批次，
+    相同批次使用相同的S3键，重复提交只会覆盖同一对象。
+    """
+    
+    def __init__(self, path: Optional[str], fsync: bool = True, compact_every: int = 1000):
+        self.path = path
+        self.fsync = fsync
+        self.compact_every = compact_every
+        # 已提交的状态: 分区名 -> {键: 值}
+        self.state: Dict[str, Dict[str, Any]] = {}
+        # 未完成的批次: 批次ID -> intent记录
+        self.pending: Dict[str, Dict[str, Any]] = {}
+        self.records_since_compact = 0
+        self.lock = threading.Lock()
+        self.file = None
+        if path:
+            self.load()
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self.file = open(path, 'a', encoding='utf-8')
+    
+    def load(self):
+        """重放日志；崩溃时只写了一半的最后一行被忽略"""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning("导出日志末尾记录不完整，已忽略: %s", self.path)
+                    break
+                self.apply(record)
+                self.records_since_compact += 1
+        logger.info("导出日志已加载: %s (未完成批次 %d)", self.path, len(self.pending))
+    
+    def apply(self, record: Dict[str, Any]):
+        record_type = record['type']
+        if record_type == 'snapshot':
+            self.state = record['state']
+            self.pending = {intent['batch_id']: intent for intent in record['pending']}
+        elif record_type == 'intent':
+            self.pending[record['batch_id']] = record
+        elif record_type == 'commit':
+            intent = self.pending.pop(record['batch_id'], None)
+            if intent:
+                for section, values in intent.get('state_updates', {}).items():
+                    self.state.setdefault(section, {}).update(values)
+        elif record_type == 'abort':
+            self.pending.pop(record['batch_id'], None)
+        elif record_type == 'state':
+            for section, values in record.get('updates', {}).items():
+                self.state.setdefault(section, {}).update(values)
+            for section, keys in record.get('removals', {}).items():
+                for key in keys:
+                    self.state.get(section, {}).pop(key, None)
+    
+    def write(self, record: Dict[str, Any]):
+        with self.lock:
+            self.apply(record)
+            if not self.file:
+                return
+            self.file.write(json.dumps(record, ensure_ascii=False) + '\n')
+            self.file.flush()
+            if self.fsync:
+                os.fsync(self.file.fileno())
+            self.records_since_compact += 1
+    
+    def begin(self, batch_id: str, s3_key: str, file_path: str, manifest: Dict[str, Any],
+              state_updates: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.write({'type': 'intent', 'batch_id': batch_id, 's3_key': s3_key, 'file_path': file_path,
+                    'manifest': manifest, 'state_updates': state_updates or {}})
+    
+    def commit(self, batch_id: str):
+        self.write({'type': 'commit', 'batch_id': batch_id})
+    
+    def abort(self, batch_id: str):
+        self.write({'type': 'abort', 'batch_id': batch_id})
+    
+    def update_state(self, updates: Optional[Dict[str, Dict[str, Any]]] = None,
+                     removals: Optional[Dict[str, List[str]]] = None):
+        """不属于任何批次的状态变化（如导出结果确认），立即生效"""
+        self.write({'type': 'state', 'updates': updates or {}, 'removals': removals or {}})
+    
+    def compact(self, state_provider: Optional[Callable[[], Dict[str, Dict[str, Any]]]] = None):
+        """记录数超过阈值时用快照重写日志（临时文件+os.replace原子替换）
+        state_provider返回组件当前的完整状态（可以丢弃已淘汰的条目）；None表示保留日志中的状态
+        """
+        with self.lock:
+            if not self.file or self.records_since_compact < self.compact_every:
+                return
+            if state_provider is not None:
+                self.state = state_provider()
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.write(json.dumps({'type': 'snapshot', 'state': self.state,
+                                    'pending': list(self.pending.values())}, ensure_ascii=False) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            self.file.close()
+            os.replace(temp_path, self.path)
+            self.file = open(self.path, 'a', encoding='utf-8')
+            self.records_since_compact = 1
+    
+    def close(self):
+        with self.lock:
+            if self.file:
+                self.file.close()
+                self.file = None
+
+
+def source_scoped_path(path: str, source_id: str) -> str:
+    """在文件或目录路径后附加源ID（多源宿主中所有源共享同一组环境变量）"""
+    root, extension = os.path.splitext(path.rstrip('/'))
+    return f"{root}_{source_id}{extension}"
+
+
+class StoreAndForwardBuffer:
+    """本地磁盘存储转发缓冲区: 上行链路中断时导出对象先压缩写入本地段文件，恢复后按顺序大批量排空
+    段文件只追加，按优先级分别写入(seg-p<优先级>-<序号>.log)，每条记录为:
+        REC1 | 头部长度 | 压缩数据长度 | CRC32 | 头部JSON(S3键、清单) | zlib压缩数据
+    排空时用mmap顺序读取整段，每提交一条记录就把段内已排空的位置写入<段文件名>.offset，暂停或重启后从该位置继续；
+    超过磁盘预算时按策略淘汰整段: oldest(最旧的段) 或 priority(最低优先级中最旧的段)
+    """
+    
+    RECORD_HEADER = struct.Struct('>4sIII')
+    RECORD_MAGIC = b'REC1'
+    
+    def __init__(self, directory: str, budget_bytes: int, segment_bytes: int,
+                 eviction: str = 'oldest', compress_level: int = 3, fsync: bool = True):
+        if eviction not in ('oldest', 'priority'):
+            raise ValueError(f"不支持的淘汰策略: {eviction}")
+        self.directory = directory
+        self.budget_bytes = budget_bytes
+        self.segment_bytes = segment_bytes
+        self.eviction = eviction
+        self.compress_level = compress_level
+        self.fsync = fsync
+        os.makedirs(directory, exist_ok=True)
+        
+        # 段文件名 -> {'priority', 'sequence', 'bytes', 'records', 'drained_offset', 'drained_records'}
+        self.segments: Dict[str, Dict[str, Any]] = {}
+        # 每个优先级当前写入的段: 优先级 -> (段文件名, 文件对象)
+        self.active: Dict[int, Tuple[str, Any]] = {}
+        self.next_sequence = 0
+        self.draining_segment: Optional[str] = None
+        self.lock = threading.Lock()
+        
+        # 指标: 写入/排空字节数的指数加权速率
+        self.ingest_rate = 0.0
+        self.drain_rate = 0.0
+        self.rate_updated = time.monotonic()
+        self.ingested_since_update = 0
+        self.drained_since_update = 0
+        self.evicted_records = 0
+        
+        self.load_segments()
+    
+    def load_segments(self):
+        """重启后接管已有段文件（全部视为已封存），统计记录数、截掉写了一半的尾部记录并恢复排空位置"""
+        names = os.listdir(self.directory)
+        for name in sorted(names):
+            if name.endswith('.offset') and name[:-len('.offset')] not in names:
+                # 段文件已删除但位置文件还在（删除过程中崩溃）
+                os.remove(os.path.join(self.directory, name))
+            if not (name.startswith('seg-p') and name.endswith('.log')):
+                continue
+            _, priority, sequence = name[:-len('.log')].split('-')
+            path = os.path.join(self.directory, name)
+            records, valid_bytes = 0, 0
+            for _, _, end_offset in self.iter_segment(path):
+                records += 1
+                valid_bytes = end_offset
+            if valid_bytes < os.path.getsize(path):
+                logger.warning("缓冲段末尾记录不完整，已截断: %s", name)
+                os.truncate(path, valid_bytes)
+            drained_offset, drained_records = self.load_drain_offset(name)
+            if not records or drained_records >= records:
+                self.remove_segment_files(name)
+                continue
+            self.segments[name] = {'priority': int(priority[1:]), 'sequence': int(sequence),
+                                   'bytes': valid_bytes, 'records': records,
+                                   'drained_offset': drained_offset, 'drained_records': drained_records}
+            self.next_sequence = max(self.next_sequence, int(sequence) + 1)
+        if self.segments:
+            logger.info("本地缓冲区已加载: %d 个段, %d 条记录, %d 字节",
+                        len(self.segments), self.depth_records(), self.depth_bytes())
+    
+    def load_drain_offset(self, name: str) -> Tuple[int, int]:
+        """读取段的排空位置: (字节偏移, 已排空记录数)"""
+        offset_path = os.path.join(self.directory, f"{name}.offset")
+        if not os.path.exists(offset_path):
+            return 0, 0
+        try:
+            with open(offset_path, 'r', encoding='utf-8') as f:
+                position = json.load(f)
+            return position['offset'], position['records']
+        except (ValueError, KeyError) as e:
+            # 位置文件损坏时从段头重新提交，相同的S3键只会覆盖同一对象
+            logger.warning("缓冲段排空位置无效，从段头重新排空 %s: %s", name, e)
+            return 0, 0
+    
+    def save_drain_offset(self, name: str, offset: int, records: int):
+        """原子写入段的排空位置（先写临时文件再替换）"""
+        offset_path = os.path.join(self.directory, f"{name}.offset")
+        temp_path = f"{offset_path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'offset': offset, 'records': records}, f)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        os.replace(temp_path, offset_path)
+    
+    def remove_segment_files(self, name: str):
+        """删除段文件及其排空位置文件"""
+        for path in (os.path.join(self.directory, name), os.path.join(self.directory, f"{name}.offset")):
+            if os.path.exists(path):
+                os.remove(path)
+    
+    def iter_segment(self, path: str, start_offset: int = 0):
+        """用mmap从start_offset开始顺序读取段文件，逐条返回(头部, 压缩数据, 记录结束偏移)；遇到损坏或不完整的记录即停止"""
+        if os.path.getsize(path) == 0:
+            return
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            offset = start_offset
+            header_size = self.RECORD_HEADER.size
+            while offset + header_size <= len(mm):
+                magic, header_length, payload_length, checksum = self.RECORD_HEADER.unpack_from(mm, offset)
+                body_start = offset + header_size
+                body_end = body_start + header_length + payload_length
+                if magic != self.RECORD_MAGIC or body_end > len(mm):
+                    return
+                body = mm[body_start:body_end]
+                if zlib.crc32(body) != checksum:
+                    return
+                yield json.loads(body[:header_length]), body[header_length:], body_end
+                offset = body_end
+    
+    def append(self, s3_key: str, content: bytes, manifest: Dict[str, Any], priority: int = 0):
+        """压缩并追加一条记录，超出磁盘预算时淘汰整段"""
+        header = json.dumps({'s3_key': s3_key, 'manifest': manifest}, ensure_ascii=False, default=str).encode('utf-8')
+        payload = zlib.compress(content, self.compress_level)
+        record = self.RECORD_HEADER.pack(self.RECORD_MAGIC, len(header), len(payload),
+                                          zlib.crc32(header + payload)) + header + payload
+        
+        with self.lock:
+            name, segment_file = self.active_segment(priority)
+            segment_file.write(record)
+            segment_file.flush()
+            if self.fsync:
+                os.fsync(segment_file.fileno())
+            segment = self.segments[name]
+            segment['bytes'] += len(record)
+            segment['records'] += 1
+            self.ingested_since_update += len(record)
+            if segment['bytes'] >= self.segment_bytes:
+                self.seal(priority)
+            self.evict_over_budget()
+    
+    def active_segment(self, priority: int) -> Tuple[str, Any]:
+        if priority not in self.active:
+            name = f"seg-p{priority:03d}-{self.next_sequence:012d}.log"
+            self.next_sequence += 1
+            self.segments[name] = {'priority': priority, 'sequence': self.next_sequence - 1, 'bytes': 0, 'records': 0,
+                                   'drained_offset': 0, 'drained_records': 0}
+            self.active[priority] = (name, open(os.path.join(self.directory, name), 'ab'))
+        return self.active[priority]
+    
+    def seal(self, priority: int):
+        """封存当前写入段，之后只读"""
+        name, segment_file = self.active.pop(priority)
+        segment_file.close()
+    
+    def evict_over_budget(self):
+        """淘汰整段直到段文件总大小回到预算内（正在排空的段不淘汰）"""
+        while self.disk_bytes() > self.budget_bytes:
+            candidates = [name for name in self.segments if name != self.draining_segment]
+            if not candidates:
+                return
+            if self.eviction == 'priority':
+                victim = min(candidates, key=lambda n: (self.segments[n]['priority'], self.segments[n]['sequence']))
+            else:
+                victim = min(candidates, key=lambda n: self.segments[n]['sequence'])
+            segment = self.segments.pop(victim)
+            if segment['priority'] in self.active and self.active[segment['priority']][0] == victim:
+                self.seal(segment['priority'])
+            self.remove_segment_files(victim)
+            remaining_records = segment['records'] - segment['drained_records']
+            self.evicted_records += remaining_records
+            logger.error("本地缓冲区超出磁盘预算，淘汰段 %s: 丢弃 %d 条记录 (%d 字节)",
+                         victim, remaining_records, segment['bytes'] - segment['drained_offset'])
+    
+    def next_segment(self) -> Optional[str]:
+        """下一个要排空的段: 高优先级优先，同优先级按写入顺序；选中写入中的段时先封存"""
+        with self.lock:
+            if not self.segments:
+                return None
+            name = min(self.segments, key=lambda n: (-self.segments[n]['priority'], self.segments[n]['sequence']))
+            priority = self.segments[name]['priority']
+            if priority in self.active and self.active[priority][0] == name:
+                self.seal(priority)
+            self.draining_segment = name
+            return name
+    
+    def drain(self, submit: Callable[[str, bytes, Dict[str, Any]], Any], should_continue: Callable[[], bool]) -> int:
+        """按段顺序排空: submit(s3_key, 原始内容, 清单)提交一条记录，should_continue()为False时暂停
+        每条记录提交成功后保存段内排空位置，暂停、出错或重启后从下一条继续；整段提交完成后删除段文件。
+        只有提交成功但位置尚未保存时崩溃的那一条会重新提交，相同的S3键只会覆盖同一对象
+        """
+        drained = 0
+        while should_continue():
+            name = self.next_segment()
+            if name is None:
+                break
+            path = os.path.join(self.directory, name)
+            segment = self.segments[name]
+            completed = False
+            try:
+                offset = segment['drained_offset']
+                for header, payload, end_offset in self.iter_segment(path, offset):
+                    if not should_continue():
+                        break
+                    submit(header['s3_key'], zlib.decompress(payload), header['manifest'])
+                    drained += 1
+                    with self.lock:
+                        segment['drained_offset'] = end_offset
+                        segment['drained_records'] += 1
+                        self.drained_since_update += end_offset - offset
+                    # 只有排空线程写位置文件，不必持有锁
+                    self.save_drain_offset(name, end_offset, segment['drained_records'])
+                    offset = end_offset
+                else:
+                    completed = True
+            finally:
+                with self.lock:
+                    self.draining_segment = None
+                    if completed and name in self.segments:
+                        del self.segments[name]
+                        self.remove_segment_files(name)
+            if not completed:
+                break
+        return drained
+    
+    def disk_bytes(self) -> int:
+        """段文件占用的磁盘空间（部分排空的段在排空完成前仍占用整段）"""
+        return sum(segment['bytes'] for segment in self.segments.values())
+    
+    def depth_bytes(self) -> int:
+        """尚未排空的字节数"""
+        return sum(segment['bytes'] - segment['drained_offset'] for segment in self.segments.values())
+    
+    def depth_records(self) -> int:
+        return sum(segment['records'] - segment['drained_records'] for segment in self.segments.values())
+    
+    def empty(self) -> bool:
+        return not self.segments
+    
+    def has_capacity(self, ratio: float) -> bool:
+        """缓冲区占用低于预算的给定比例时允许继续写入"""
+        with self.lock:
+            return self.disk_bytes() < self.budget_bytes * ratio
+    
+    def metrics(self) -> Dict[str, Any]:
+        """缓冲深度、写入/排空速率(磁盘字节/秒)和预计排空所需时间"""
+        with self.lock:
+            now = time.monotonic()
+            elapsed = now - self.rate_updated
+            if elapsed >= 1:
+                # 指数加权平均，平滑突发
+                self.ingest_rate = 0.7 * self.ingest_rate + 0.3 * self.ingested_since_update / elapsed
+                self.drain_rate = 0.7 * self.drain_rate + 0.3 * self.drained_since_update / elapsed
+                self.ingested_since_update = self.drained_since_update = 0
+                self.rate_updated = now
+            depth_bytes = self.depth_bytes()
+            net_rate = self.drain_rate - self.ingest_rate
+            return {
+                'segments': len(self.segments),
+                'records': self.depth_records(),
+                'bytes': depth_bytes,
+                'ingest_rate': self.ingest_rate,
+                'drain_rate': self.drain_rate,
+                'evicted_records': self.evicted_records,
+                'catch_up_seconds': depth_bytes / net_rate if net_rate > 0 and depth_bytes else None,
+            }
+    
+    def close(self):
+        with self.lock:
+            for priority in list(self.active):
+                self.seal(priority)
+
+
+class RuntimeConfigSource:
+    """运行时配置来源: 本地JSON文件（测试/调试用的替身）或Greengrass组件配置(IPC)
+    watch()启动后台线程，配置变化时调用on_change(新配置)；文件按修改时间轮询，IPC订阅配置更新事件。
+    未指定文件且不在Greengrass中运行（或未安装awsiotsdk）时只返回空配置。
+    """
+    
+    def __init__(self, file_path: Optional[str], key_path: List[str], poll_interval: int = 5):
+        self.file_path = file_path
+        self.key_path = key_path
+        self.poll_interval = poll_interval
+        self.ipc_client = None
+        self.file_mtime = None
+        self.last_value: Optional[Dict[str, Any]] = None
+        self.changed = threading.Event()
+        self.running = False
+        self.thread: Optional[threading.Thread] = None
+        
+        if not file_path and os.getenv('AWS_GG_NUCLEUS_DOMAIN_SOCKET_FILEPATH_FOR_COMPONENT'):
+            try:
+                from awsiot.greengrasscoreipc.clientv2 import GreengrassCoreIPCClientV2
+                self.ipc_client = GreengrassCoreIPCClientV2()
+            except ImportError:
+                logger.warning("未安装awsiotsdk，无法读取组件配置，使用默认配置")
+    
+    def load(self) -> Dict[str, Any]:
+        """读取当前配置"""
+        if self.file_path:
+            if not os.path.exists(self.file_path):
+                return {}
+            self.file_mtime = os.path.getmtime(self.file_path)
+            with open(self.file_path, 'r', encoding='utf-8') as f:
+                value = json.load(f)
+            for key in self.key_path:
+                value = value.get(key, {})
+        elif self.ipc_client:
+            value = self.ipc_client.get_configuration(key_path=self.key_path).value or {}
+        else:
+            value = {}
+        self.last_value = value
+        return value
+    
+    def watch(self, on_change: Callable[[Dict[str, Any]], Any]):
+        """启动配置监视线程"""
+        if not self.file_path and not self.ipc_client:
+            return
+        if self.ipc_client:
+            self.ipc_client.subscribe_to_configuration_update(
+                key_path=self.key_path,
+                on_stream_event=lambda event: self.changed.set()
+            )
+        self.running = True
+        self.thread = threading.Thread(target=self.watch_loop, args=(on_change,), daemon=True)
+        self.thread.start()
+    
+    def watch_loop(self, on_change: Callable[[Dict[str, Any]], Any]):
+        while self.running:
+            self.changed.wait(self.poll_interval)
+            self.changed.clear()
+            if not self.running:
+                break
+            try:
+                if self.file_path:
+                    mtime = os.path.getmtime(self.file_path) if os.path.exists(self.file_path) else None
+                    if mtime == self.file_mtime:
+                        continue
+                previous = self.last_value
+                value = self.load()
+                if value != previous:
+                    on_change(value)
+            except Exception as e:
+                logger.error("重新加载运行时配置失败: %s", e)
+    
+    def close(self):
+        self.running = False
+        self.changed.set()
+        if self.ipc_client:
+            self.ipc_client.close()
+
+
+def coerce_config_value(value_type: type, value: Any) -> Any:
+    """把组件配置中的值转换为配置项声明的类型（IPC返回的数字可能是浮点数，文件中的值可能是字符串）
+    None表示恢复默认行为；非字符串配置项的空字符串同样视为None
+    """
+    if value is None or (value == '' and value_type is not str):
+        return None
+    if value_type is bool:
+        if isinstance(value, str):
+            if value.lower() not in ('true', 'false'):
+                raise ValueError(f"无效的布尔值: {value}")
+            return value.lower() == 'true'
+        return bool(value)
+    if value_type is int:
+        if isinstance(value, float) and not value.is_integer():
+            raise ValueError(f"需要整数: {value}")
+        return int(value)
+    if value_type is float:
+        return float(value)
+    if value_type is list:
+        if isinstance(value, str):
+            return [item for item in value.split(',') if item]
+        if not isinstance(value, list):
+            raise TypeError(f"需要列表: {value!r}")
+        return value
+    if value_type is dict:
+        value = json.loads(value) if isinstance(value, str) else value
+        if not isinstance(value, dict):
+            raise TypeError(f"需要对象: {value!r}")
+        return value
+    if isinstance(value, (list, dict)):
+        raise TypeError(f"需要字符串: {value!r}")
+    return str(value)
@@ -0,0 +1,567 @@
+#!/usr/bin/env python3
+"""
+多源宿主组件
+在单个进程中托管多个SFTP服务器和MySQL数据库源，共享Stream Manager客户端、临时文件目录和调度器
+"""
+
+import json
+import logging
+import os
+import signal
+import sys
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from stream_manager.streammanagerclient import StreamManagerClient
+from stream_manager.data import (
+    MessageStreamDefinition,
+    StrategyOnFull,
+    ExportDefinition,
+    S3ExportTaskExecutorConfig,
+    StatusConfig,
+    StatusLevel,
+    ReadMessagesOptions
+)
+from stream_manager.exceptions import ResourceNotFoundException
+
+# 共享模块: 部署后与组件文件位于同一工件目录，源码树中位于 components/common
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'common'))
+from pipeline_common import ExportBackpressure, RuntimeConfigSource, configure_logging
+
+# 配置日志
+log_listener = configure_logging()
+logger = logging.getLogger(__name__)
+
+
+def create_source_component(source_type: str, source_id: str, config_overrides: Dict[str, Any],
+                            stream_manager_client: StreamManagerClient):
+    """按源类型创建组件实例（按需导入，只部署一种源时无需安装另一种的依赖）"""
+    if source_type == 'sftp':
+        from sftp_to_s3 import SFTPToS3Component
+        return SFTPToS3Component(source_id, config_overrides, stream_manager_client)
+    if source_type == 'mysql':
+        from mysql_to_s3 import MySQLToS3Component
+        return MySQLToS3Component(source_id, config_overrides, stream_manager_client)
+    raise ValueError(f"不支持的源类型: {source_type}")
+
+
+class SourceSlot:
+    """单个源在调度器中的运行状态"""
+    
+    def __init__(self, source_id: str, source_type: str, component):
+        self.source_id = source_id
+        self.source_type = source_type
+        self.component = component
+        self.next_run = 0.0
+        self.in_flight = False
+        self.consecutive_failures = 0
+    
+    @property
+    def interval(self) -> int:
+        """当前源的调度间隔(秒)"""
+        if self.source_type == 'sftp':
+            return self.component.config['scan_interval']
+        return self.component.config['polling_interval']
+    
+    @property
+    def streaming(self) -> bool:
+        """binlog模式的MySQL源持续读取不返回，在自己的线程中运行，不由调度器提交到线程池"""
+        return self.source_type == 'mysql' and self.component.config['capture_mode'] == 'binlog'
+    
+    def run_cycle(self) -> int:
+        """执行一轮扫描/轮询"""
+        if self.source_type == 'sftp':
+            return self.component.scan_once()
+        return self.component.poll_once()
+
+
+class MultiSourceHost:
+    """多源宿主：一个进程托管N个源实例"""
+    
+    # 只在启动时生效的配置（共享数据流和临时文件目录）
+    RESTART_CONFIG_KEYS = ('stream_name', 'status_stream_name', 'stream_max_size', 'stream_segment_size',
+                           'strategy_on_full', 'spool_dir')
+    
+    def __init__(self, host_config: Dict[str, Any]):
+        # 配置参数
+        self.config = {
+            # S3配置
+            's3_bucket': 'zihangh-gg-streammanager-poc',
+            's3_key_prefix': 'gg_mysql/multi-source/',
+            
+            # Stream Manager配置（所有源共享一个数据流和状态流）
+            'stream_name': 'MultiSourceDataStream_ab',
+            'status_stream_name': 'MultiSourceDataStream_ab_Status',
+            
+            # 数据流容量与背压配置（RejectNewData: 流满时拒绝写入而不是覆盖最旧数据）
+            'stream_max_size': 256 * 1024 * 1024,
+            'stream_segment_size': 16 * 1024 * 1024,
+            'strategy_on_full': 'RejectNewData',
+            'backpressure_high_water_tasks': 50,
+            'backpressure_low_water_tasks': 20,
+            'backpressure_high_water_ratio': 0.8,
+            'backpressure_low_water_ratio': 0.5,
+            
+            # 调度配置
+            'max_workers': 4,        # 工作线程数，所有源共享
+            'scheduler_tick': 1,     # 调度器检查间隔(秒)
+            'max_backoff': 600,      # 失败源的最大退避时间(秒)
+            
+            # 共享临时文件目录
+            'spool_dir': os.path.join(os.getenv('TMPDIR', '/tmp'), 'multi-source-spool'),
+            
+            # 源列表: [{"source_id": ..., "type": "sftp|mysql", "config": {...}}]
+            'sources': [],
+        }
+        self.config.update(host_config)
+        
+        # 运行状态
+        self.running = False
+        self.stream_manager_client: Optional[StreamManagerClient] = None
+        self.slots: List[SourceSlot] = []
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self.executor_workers = 0
+        # 配置监视线程替换线程池时，调度线程不能向已关闭的旧线程池提交任务
+        self.executor_lock = threading.Lock()
+        # 共享数据流的在途任务和占用是全局的，所有源共享同一个导出准入控制器
+        self.backpressure = ExportBackpressure(
+            high_water_tasks=self.config['backpressure_high_water_tasks'],
+            low_water_tasks=self.config['backpressure_low_water_tasks'],
+            high_water_bytes=int(self.config['stream_max_size'] * self.config['backpressure_high_water_ratio']),
+            low_water_bytes=int(self.config['stream_max_size'] * self.config['backpressure_low_water_ratio'])
+        )
+        self.next_status_sequence = 0
+        
+        # 宿主配置来源: MULTI_SOURCE_CONFIG_FILE文件或组件配置中的host_config，变化时运行中生效
+        config_file = os.getenv('MULTI_SOURCE_CONFIG_FILE')
+        self.config_source = RuntimeConfigSource(config_file, [] if config_file else ['host_config'])
+        
+        # 线程
+        self.scheduler_thread: Optional[threading.Thread] = None
+        self.status_monitor_thread: Optional[threading.Thread] = None
+        
+        logger.info("多源宿主组件初始化完成，配置源数量: %s", len(self.config['sources']))
+    
+    def setup_stream_manager(self) -> bool:
+        """设置共享的Stream Manager客户端和流"""
+        max_retries = 10
+        retry_delay = 5
+        
+        for attempt in range(max_retries):
+            try:
+                logger.info("尝试连接Stream Manager (第%s次/共%s次)", attempt + 1, max_retries)
+                
+                # 创建Stream Manager客户端
+                self.stream_manager_client = StreamManagerClient()
+                logger.info("Stream Manager客户端创建成功")
+                
+                # 删除已存在的流（重新开始）
+                try:
+                    self.stream_manager_client.delete_message_stream(self.config['status_stream_name'])
+                    logger.info("删除已存在的状态流: %s", self.config['status_stream_name'])
+                except ResourceNotFoundException:
+                    pass
+                
+                try:
+                    self.stream_manager_client.delete_message_stream(self.config['stream_name'])
+                    logger.info("删除已存在的数据流: %s", self.config['stream_name'])
+                except ResourceNotFoundException:
+                    pass
+                
+                # 创建S3导出配置
+                exports = ExportDefinition(
+                    s3_task_executor=[
+                        S3ExportTaskExecutorConfig(
+                            identifier="S3Export" + self.config['stream_name'],
+                            status_config=StatusConfig(
+                                status_level=StatusLevel.INFO,
+                                status_stream_name=self.config['status_stream_name'],
+                            ),
+                        )
+                    ]
+                )
+                
+                # 创建状态流
+                self.stream_manager_client.create_message_stream(
+                    MessageStreamDefinition(
+                        name=self.config['status_stream_name'],
+                        strategy_on_full=StrategyOnFull.OverwriteOldestData
+                    )
+                )
+                logger.info("成功创建状态流: %s", self.config['status_stream_name'])
+                
+                # 创建带S3导出的消息流
+                self.stream_manager_client.create_message_stream(
+                    MessageStreamDefinition(
+                        name=self.config['stream_name'],
+                        max_size=self.config['stream_max_size'],
+                        stream_segment_size=self.config['stream_segment_size'],
+                        strategy_on_full=getattr(StrategyOnFull, self.config['strategy_on_full']),
+                        export_definition=exports
+                    )
+                )
+                logger.info("成功创建S3导出数据流: %s", self.config['stream_name'])
+                
+                return True
+            
+            except Exception as e:
+                logger.error("设置Stream Manager失败 (第%s次尝试): %s", attempt + 1, e)
+                if attempt < max_retries - 1:
+                    logger.info("等待%s秒后重试...", retry_delay)
+                    time.sleep(retry_delay)
+                else:
+                    logger.error("所有重试都失败了")
+                    return False
+        
+        return False
+    
+    def build_source_overrides(self, source: Dict[str, Any]) -> Dict[str, Any]:
+        """合并宿主级共享配置与单个源的配置"""
+        source_id = source['source_id']
+        overrides = {
+            's3_bucket': self.config['s3_bucket'],
+            's3_key_prefix': f"{self.config['s3_key_prefix']}{source_id}/",
+            'stream_name': self.config['stream_name'],
+            'status_stream_name': self.config['status_stream_name'],
+            'spool_dir': self.config['spool_dir'],
+        }
+        for key in ('stream_max_size', 'backpressure_high_water_tasks', 'backpressure_low_water_tasks',
+                    'backpressure_high_water_ratio', 'backpressure_low_water_ratio'):
+            overrides[key] = self.config[key]
+        overrides.update(source.get('config', {}))
+        return overrides
+    
+    def setup_sources(self):
+        """创建所有源实例（连接在首次调度时建立，单个源连接失败不影响启动）"""
+        os.makedirs(self.config['spool_dir'], exist_ok=True)
+        
+        self.validate_sources(self.config['sources'])
+        for source in self.config['sources']:
+            self.slots.append(self.create_slot(source))
+    
+    def validate_sources(self, sources: List[Dict[str, Any]]):
+        seen_ids = set()
+        for source in sources:
+            source_id = source['source_id']
+            if source_id in seen_ids:
+                raise ValueError(f"重复的源ID: {source_id}")
+            seen_ids.add(source_id)
+    
+    def create_slot(self, source: Dict[str, Any]) -> SourceSlot:
+        """创建单个源实例及其调度状态"""
+        source_id = source['source_id']
+        component = create_source_component(
+            source['type'],
+            source_id,
+            self.build_source_overrides(source),
+            self.stream_manager_client
+        )
+        component.running = True
+        component.backpressure = self.backpressure
+        # 源的本地缓冲区按共享准入控制器的状态排空
+        component.start_store_buffer_drain()
+        slot = SourceSlot(source_id, source['type'], component)
+        if slot.streaming:
+            component.start_binlog_thread()
+        logger.info("已注册源: %s (%s)", source_id, source['type'])
+        return slot
+    
+    def apply_host_config(self, new_config: Dict[str, Any]):
+        """运行时应用宿主配置: 新增/移除/修改源，调整线程数和调度参数
+        未变化的源不重连；修改的源只更新自身配置（连接参数变化时由源在下一轮重连）；
+        移除的源在当前一轮处理完成后停止
+        """
+        self.validate_sources(new_config.get('sources', []))
+        changed = [key for key, value in new_config.items() if self.config.get(key) != value]
+        for key in [key for key in changed if key in self.RESTART_CONFIG_KEYS]:
+            logger.warning("配置项 %s 需要重启宿主才能生效，已忽略", key)
+            changed.remove(key)
+        if not changed:
+            return
+        self.config.update({key: new_config[key] for key in changed})
+        
+        if any(key.startswith('backpressure_') for key in changed):
+            self.backpressure.update_thresholds(
+                high_water_tasks=self.config['backpressure_high_water_tasks'],
+                low_water_tasks=self.config['backpressure_low_water_tasks'],
+                high_water_bytes=int(self.config['stream_max_size'] * self.config['backpressure_high_water_ratio']),
+                low_water_bytes=int(self.config['stream_max_size'] * self.config['backpressure_low_water_ratio'])
+            )
+        
+        # 按源ID对比源列表，共享配置（S3前缀、水位）变化时所有源都会收到新的覆盖配置
+        current = {slot.source_id: slot for slot in self.slots}
+        new_slots = []
+        retired = []
+        now = time.monotonic()
+        for source in self.config['sources']:
+            slot = current.pop(source['source_id'], None)
+            if slot and slot.source_type == source['type']:
+                slot.component.apply_runtime_config(self.build_source_overrides(source))
+                # 间隔缩短时不必等到原定的下次运行时间
+                slot.next_run = min(slot.next_run, now + slot.interval)
+                new_slots.append(slot)
+            else:
+                if slot:
+                    retired.append(slot)
+                new_slots.append(self.create_slot(source))
+        retired.extend(current.values())
+        self.slots = new_slots
+        
+        for slot in retired:
+            logger.info("移除源: %s", slot.source_id)
+            threading.Thread(target=self.retire_source, args=(slot,), daemon=True).start()
+        
+        # 线程池无法调整大小: 新建线程池，旧线程池中正在执行的任务继续完成
+        workers = min(self.config['max_workers'], self.scheduled_slot_count()) or 1
+        with self.executor_lock:
+            if self.executor and self.executor_workers != workers:
+                old_executor = self.executor
+                self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='source-worker')
+                self.executor_workers = workers
+                old_executor.shutdown(wait=False)
+                logger.info("工作线程数调整为 %d", workers)
+        
+        logger.info("宿主配置已更新: %s", ', '.join(sorted(changed)))
+    
+    def retire_source(self, slot: SourceSlot):
+        """等待源当前一轮处理结束后停止并释放连接"""
+        slot.component.running = False
+        while slot.in_flight:
+            time.sleep(0.5)
+        try:
+            slot.component.stop()
+        except Exception as e:
+            logger.error("停止源 %s 失败: %s", slot.source_id, e)
+    
+    def request_profile(self):
+        """请求对所有源的下一轮处理做cProfile采样"""
+        for slot in self.slots:
+            slot.component.profiler.request_profile()
+    
+    def scheduled_slot_count(self) -> int:
+        """由调度器提交到线程池的源数量（binlog源使用独立线程）"""
+        return sum(1 for slot in self.slots if not slot.streaming)
+    
+    def run_source_cycle(self, slot: SourceSlot):
+        """在工作线程中执行单个源的一轮处理，异常只影响该源自身的调度"""
+        try:
+            count = slot.run_cycle()
+            slot.consecutive_failures = 0
+            slot.next_run = time.monotonic() + slot.interval
+            if count:
+                logger.debug("源 %s 本轮处理完成: %d", slot.source_id, count)
+        except Exception as e:
+            slot.consecutive_failures += 1
+            backoff = min(slot.interval * (2 ** slot.consecutive_failures), self.config['max_backoff'])
+            slot.next_run = time.monotonic() + backoff
+            logger.error("源 %s 处理失败 (连续第%d次)，%s秒后重试: %s",
+                         slot.source_id, slot.consecutive_failures, backoff, e)
+        finally:
+            slot.in_flight = False
+    
+    def scheduler_loop(self):
+        """调度循环：到期且未在执行中的源提交到共享线程池"""
+        while self.running:
+            now = time.monotonic()
+            for slot in self.slots:
+                if slot.streaming or slot.in_flight or now < slot.next_run:
+                    continue
+                slot.in_flight = True
+                try:
+                    with self.executor_lock:
+                        self.executor.submit(self.run_source_cycle, slot)
+                except RuntimeError as e:
+                    # 线程池已关闭（宿主正在停止）: 源保持可调度状态
+                    slot.in_flight = False
+                    logger.warning("提交源 %s 失败: %s", slot.source_id, e)
+            
+            time.sleep(self.config['scheduler_tick'])
+    
+    def dispatch_export_status(self, status_data: Dict[str, Any], status: str):
+        """把导出完成状态交给提交该任务的源（按S3键匹配）"""
+        s3_key = status_data.get('statusContext', {}).get('s3ExportTaskDefinition', {}).get('key')
+        for slot in self.slots:
+            handler = getattr(slot.component, 'handle_export_status', None)
+            if handler and handler(s3_key, status):
+                return
+    
+    def monitor_s3_export_status(self):
+        """监控共享状态流中的S3导出状态"""
+        while self.running:
+            try:
+                if not self.stream_manager_client:
+                    time.sleep(5)
+                    continue
+                
+                # 刷新数据流占用，用于背压判断
+                stream_info = self.stream_manager_client.describe_message_stream(self.config['stream_name'])
+                self.backpressure.update_stream_bytes(stream_info.storage_status.total_bytes)
+                
+                # 读取状态流消息（从上次读到的位置继续，避免重复计数）
+                messages = self.stream_manager_client.read_messages(
+                    self.config['status_stream_name'],
+                    ReadMessagesOptions(
+                        desired_start_sequence_number=self.next_status_sequence,
+                        min_message_count=1,
+                        max_message_count=100,
+                        read_timeout_millis=1000
+                    )
+                )
+                
+                # 按批汇总状态，成功/进行中每批只输出一行
+                status_counts = {'Success': 0, 'InProgress': 0}
+                for message in messages:
+                    self.next_status_sequence = message.sequence_number + 1
+                    try:
+                        status_data = json.loads(message.payload.decode('utf-8'))
+                        
+                        # 检查状态
+                        if 'status' in status_data:
+                            status = status_data['status']
+                            if status in ['Success', 'Failure', 'Canceled']:
+                                self.dispatch_export_status(status_data, status)
+                            if status == 'Success':
+                                self.backpressure.task_finished()
+                                status_counts['Success'] += 1
+                            elif status in ['Failure', 'Canceled']:
+                                self.backpressure.task_finished()
+                                logger.error("❌ S3上传失败: %s", status_data.get('message', 'Unknown error'))
+                            elif status == 'InProgress':
+                                status_counts['InProgress'] += 1
+                    except Exception as e:
+                        logger.debug("解析状态消息失败: %s", e)
+                
+                if status_counts['Success'] or status_counts['InProgress']:
+                    logger.info("S3导出状态: ✅ 成功 %d, ⏳ 进行中 %d", status_counts['Success'], status_counts['InProgress'])
+            
+            except Exception as e:
+                logger.debug("读取状态流时出错: %s", e)
+            
+            time.sleep(5)  # 每5秒检查一次状态
+    
+    def start(self):
+        """启动宿主"""
+        logger.info("启动多源宿主组件...")
+        
+        # 设置共享Stream Manager
+        if not self.setup_stream_manager():
+            raise Exception("Stream Manager设置失败")
+        
+        # 创建源实例
+        self.setup_sources()
+        if not self.slots:
+            raise Exception("未配置任何源")
+        
+        # 按需采样: kill -USR1 <pid> 对所有源的下一轮处理做cProfile
+        signal.signal(signal.SIGUSR1, lambda signum, frame: self.request_profile())
+        
+        # 启动运行标志
+        self.running = True
+        
+        # 共享线程池：线程数不随源数量增长
+        self.executor_workers = min(self.config['max_workers'], self.scheduled_slot_count()) or 1
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.executor_workers,
+            thread_name_prefix='source-worker'
+        )
+        
+        # 启动调度线程
+        self.scheduler_thread = threading.Thread(target=self.scheduler_loop, daemon=True)
+        self.scheduler_thread.start()
+        logger.info("调度线程已启动")
+        
+        # 启动状态监控线程
+        self.status_monitor_thread = threading.Thread(target=self.monitor_s3_export_status, daemon=True)
+        self.status_monitor_thread.start()
+        logger.info("状态监控线程已启动")
+        
+        # 监视宿主配置变化，运行中增删和调整源
+        self.config_source.load()
+        self.config_source.watch(self.apply_host_config)
+        
+        logger.info("多源宿主组件启动完成，共 %s 个源", len(self.slots))
+    
+    def stop(self):
+        """停止宿主"""
+        logger.info("停止多源宿主组件...")
+        
+        self.running = False
+        self.config_source.close()
+        for slot in self.slots:
+            slot.component.running = False
+        
+        # 等待线程结束
+        if self.scheduler_thread and self.scheduler_thread.is_alive():
+            self.scheduler_thread.join(timeout=10)
+        
+        if self.status_monitor_thread and self.status_monitor_thread.is_alive():
+            self.status_monitor_thread.join(timeout=10)
+        
+        if self.executor:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+        
+        # 关闭各个源的连接（共享客户端不会被源关闭）
+        for slot in self.slots:
+            try:
+                slot.component.stop()
+            except Exception as e:
+                logger.error("停止源 %s 失败: %s", slot.source_id, e)
+        
+        if self.stream_manager_client:
+            self.stream_manager_client.close()
+        
+        logger.info("多源宿主组件已停止")
+    
+    def run(self):
+        """运行宿主主循环"""
+        try:
+            self.start()
+            
+            # 保持运行
+            while self.running:
+                time.sleep(1)
+        
+        except KeyboardInterrupt:
+            logger.info("收到中断信号，正在停止...")
+        except Exception as e:
+            logger.error("宿主运行出错: %s", e)
+            raise
+        finally:
+            self.stop()
+
+
+def load_host_config() -> Dict[str, Any]:
+    """加载宿主配置: 环境变量MULTI_SOURCE_CONFIG(JSON)、MULTI_SOURCE_CONFIG_FILE(文件路径)或组件配置中的host_config"""
+    config_json = os.getenv('MULTI_SOURCE_CONFIG')
+    if config_json:
+        return json.loads(config_json)
+    
+    config_file = os.getenv('MULTI_SOURCE_CONFIG_FILE')
+    if config_file:
+        with open(config_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    
+    # 通过IPC读取组件配置（不使用Setenv插值，配置变化时组件无需重启）
+    host_config = RuntimeConfigSource(None, ['host_config']).load()
+    if host_config:
+        return host_config
+    
+    raise ValueError("未提供多源配置: 请设置MULTI_SOURCE_CONFIG、MULTI_SOURCE_CONFIG_FILE或组件配置host_config")
+
+
+def main():
+    """主函数"""
+    logger.info("启动多源宿主组件")
+    
+    host = MultiSourceHost(load_host_config())
+    
+    try:
+        host.run()
+    except Exception as e:
+        logger.error("宿主启动失败: %s", e)
+        raise
+
+if __name__ == "__main__":
+    main()
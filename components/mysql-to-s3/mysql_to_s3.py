@@ -7,11 +7,16 @@ MySQL到S3定时轮询组件
 import json
 import logging
 import os
+import signal
+import sys
 import time
 import threading
+import hashlib
+import tempfile
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from decimal import Decimal
-from typing import Dict, List, Optional, Any
+from typing import Callable, Dict, List, Optional, Any, Tuple
 import mysql.connector
 from mysql.connector import Error
 from stream_manager.streammanagerclient import StreamManagerClient
@@ -29,17 +34,188 @@ from stream_manager.exceptions import ResourceNotFoundException
 from stream_manager.util import Util
 import re
 
-# 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+# 共享模块: 部署后与组件文件位于同一工件目录，源码树中位于 components/common
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'common'))
+from pipeline_common import (
+    ExportBackpressure,
+    ExportJournal,
+    RuntimeConfigSource,
+    StageProfiler,
+    StoreAndForwardBuffer,
+    coerce_config_value,
+    configure_logging,
+    source_scoped_path,
 )
+
+# 配置日志
+log_listener = configure_logging()
 logger = logging.getLogger(__name__)
 
+class PartitionedRolloverWriter:
+    """按表累积记录，写入Hive风格分区(table=/dt=/hour=)，按目标大小或最大时长滚动S3对象"""
+    
+    def __init__(self, key_prefix: str, max_bytes: int, max_age: int, spool_dir: Optional[str],
+                 export_callback: Callable[[str, str, Dict[str, Any]], Any]):
+        self.key_prefix = key_prefix
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.spool_dir = spool_dir
+        # export_callback(s3_key, local_file_path, manifest)，失败时抛出异常
+        self.export_callback = export_callback
+        
+        # (表名, dt, hour) -> 分区缓冲区
+        self.partitions: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+        self.lock = threading.Lock()
+    
+    def add_record(self, table_name: str, event_time: Optional[datetime], line: str,
+                   dedup_key: Any = None, cursor: Any = None) -> int:
+        """追加一条JSON行，分区达到目标大小时立即滚动，返回滚动的对象数
+        指定dedup_key（如主键）时，同一分区缓冲中相同键的旧记录被替换，只导出最新状态；
+        cursor为该记录的增量游标（可JSON序列化），写入对象清单的键范围
+        """
+        event_time = event_time or datetime.utcnow()
+        partition_key = (table_name, event_time.strftime('%Y-%m-%d'), event_time.strftime('%H'))
+        
+        with self.lock:
+            partition = self.partitions.get(partition_key)
+            if partition is None:
+                partition = {
+                    # 键 -> JSON行；无去重键的记录使用递增序号
+                    'lines': OrderedDict(),
+                    'bytes': 0,
+                    'opened_at': time.monotonic(),
+                    'first_event': event_time,
+                    'sequence': 0,
+                    'first_cursor': cursor,
+                    'last_cursor': cursor,
+                }
+                self.partitions[partition_key] = partition
+            elif cursor is not None:
+                partition['last_cursor'] = cursor
+            
+            if dedup_key is None:
+                partition['sequence'] += 1
+                line_key = ('seq', partition['sequence'])
+            else:
+                line_key = ('key', dedup_key)
+                replaced_line = partition['lines'].pop(line_key, None)
+                if replaced_line is not None:
+                    partition['bytes'] -= len(replaced_line) + 1
+            
+            partition['lines'][line_key] = line
+            partition['bytes'] += len(line) + 1
+            
+            if partition['bytes'] >= self.max_bytes:
+                return self._roll(partition_key)
+        return 0
+    
+    def flush_expired(self) -> int:
+        """滚动超过最大时长的分区"""
+        now = time.monotonic()
+        with self.lock:
+            expired = [key for key, partition in self.partitions.items()
+                       if now - partition['opened_at'] >= self.max_age]
+            # 前面的分区滚动时可能已带走后面的同表旧分区，_roll对已滚动的键返回0
+            return sum(self._roll(key) for key in expired)
+    
+    def flush_all(self) -> int:
+        """滚动所有分区（停止组件时调用）"""
+        with self.lock:
+            return sum(self._roll(key) for key in list(self.partitions))
+    
+    def build_object_key(self, partition_key: Tuple[str, str, str], first_event: datetime, content: bytes) -> str:
+        """生成确定性对象键：相同内容重试时得到相同的键，同一秒内的不同批次通过内容哈希区分"""
+        table_name, dt, hour = partition_key
+        content_hash = hashlib.sha256(content).hexdigest()[:16]
+        return (f"{self.key_prefix}table={table_name}/dt={dt}/hour={hour}/"
+                f"part-{first_event.strftime('%Y%m%dT%H%M%S')}-{content_hash}.jsonl")
+    
+    def _roll(self, partition_key: Tuple[str, str, str]) -> int:
+        """滚动分区；同一表中更早打开的分区先滚动，保证已导出的数据始终是增量游标的前缀"""
+        if partition_key not in self.partitions:
+            return 0
+        table_keys = [key for key in self.partitions if key[0] == partition_key[0]]
+        rolled = 0
+        for key in table_keys[:table_keys.index(partition_key) + 1]:
+            if not self.export_partition(key):
+                break
+            rolled += 1
+        return rolled
+    
+    def export_partition(self, partition_key: Tuple[str, str, str]) -> bool:
+        """将分区缓冲区写入临时文件并提交导出；提交失败时保留缓冲区，下次重试生成相同的键"""
+        partition = self.partitions.get(partition_key)
+        if not partition or not partition['lines']:
+            self.partitions.pop(partition_key, None)
+            return True
+        
+        content = ('\n'.join(partition['lines'].values()) + '\n').encode('utf-8')
+        s3_key = self.build_object_key(partition_key, partition['first_event'], content)
+        table_name, dt, hour = partition_key
+        manifest = {
+            'table': table_name,
+            'partition': f"dt={dt}/hour={hour}",
+            'row_count': len(partition['lines']),
+            'content_sha256': hashlib.sha256(content).hexdigest(),
+            'first_cursor': partition['first_cursor'],
+            'last_cursor': partition['last_cursor'],
+        }
+        
+        with tempfile.NamedTemporaryFile(mode='wb', suffix='.jsonl', delete=False,
+                                         dir=self.spool_dir) as temp_file:
+            temp_file.write(content)
+            temp_file_path = temp_file.name
+        
+        try:
+            self.export_callback(s3_key, temp_file_path, manifest)
+        except Exception as e:
+            logger.error("分区对象提交失败，保留缓冲区待重试 %s: %s", s3_key, e)
+            os.remove(temp_file_path)
+            return False
+        
+        logger.info("滚动分区对象: %d条记录, %d字节 -> %s", len(partition['lines']), partition['bytes'], s3_key)
+        del self.partitions[partition_key]
+        return True
+
+
 class MySQLToS3Component:
     """MySQL到S3定时轮询组件"""
     
-    def __init__(self):
+    # 声明式过滤条件支持的操作符
+    FILTER_OPERATORS = ('=', '!=', '<', '<=', '>', '>=', 'in', 'not in', 'is null', 'is not null')
+    # 运行时修改后需要重建MySQL连接的配置
+    CONNECTION_CONFIG_KEYS = ('mysql_host', 'mysql_port', 'mysql_database', 'mysql_username', 'mysql_password')
+    # 只在启动时生效的配置（采集模式、数据流、临时文件和日志位置）
+    RESTART_CONFIG_KEYS = ('capture_mode', 'stream_name', 'status_stream_name', 'stream_max_size',
+                           'stream_segment_size', 'strategy_on_full', 'spool_dir', 'export_journal_path',
+                           'binlog_server_id', 'binlog_checkpoint_file', 'binlog_fixture_path',
+                           'store_buffer_enabled', 'store_buffer_dir', 'store_buffer_budget',
+                           'store_buffer_segment_size', 'store_buffer_eviction', 'store_buffer_compress_level')
+    # 每个源独占的本地文件
+    SOURCE_PATH_CONFIG_KEYS = ('export_journal_path', 'binlog_checkpoint_file', 'store_buffer_dir')
+    # 每个配置项的类型，运行时配置按此转换（默认值为None的可选项也能转换）
+    CONFIG_TYPES = {
+        'mysql_host': str, 'mysql_port': int, 'mysql_database': str, 'mysql_username': str, 'mysql_password': str,
+        's3_bucket': str, 's3_key_prefix': str, 'stream_name': str, 'status_stream_name': str,
+        'polling_interval': int, 'batch_size': int, 'max_retries': int, 'retry_delay': int,
+        'monitored_tables': list, 'timestamp_column': str, 'table_specs': dict,
+        'capture_mode': str, 'binlog_server_id': int, 'binlog_batch_timeout_ms': int,
+        'binlog_checkpoint_file': str, 'binlog_fixture_path': str,
+        'export_journal_path': str, 'export_journal_fsync': bool, 'export_journal_compact_every': int,
+        'store_buffer_enabled': bool, 'store_buffer_dir': str, 'store_buffer_budget': int,
+        'store_buffer_segment_size': int, 'store_buffer_eviction': str, 'store_buffer_compress_level': int,
+        'store_buffer_high_water_ratio': float, 'store_buffer_report_interval': int,
+        'rollover_max_bytes': int, 'rollover_max_age': int,
+        'stream_max_size': int, 'stream_segment_size': int, 'strategy_on_full': str,
+        'backpressure_high_water_tasks': int, 'backpressure_low_water_tasks': int,
+        'backpressure_high_water_ratio': float, 'backpressure_low_water_ratio': float,
+        'profiling_enabled': bool, 'profiling_report_interval': int, 'profile_dir': str,
+        'spool_dir': str,
+    }
+    
+    def __init__(self, source_id: str = 'default',
+                 config_overrides: Optional[Dict[str, Any]] = None,
+                 stream_manager_client: Optional[StreamManagerClient] = None):
         # 配置参数
         self.config = {
             # MySQL配置
@@ -66,19 +242,236 @@ class MySQLToS3Component:
             # 监控表配置
             'monitored_tables': ['sensor_data'],  # 可配置监控的表
             'timestamp_column': 'created_at',     # 时间戳列名
+            # 按表的变更跟踪规格（未配置的表按timestamp_column轮询），可用TABLE_SPECS(JSON)覆盖:
+            #   timestamp: 单列时间戳; greatest: 多列取GREATEST; id: 单调递增主键（只追加的表）
+            #   projection: 只查询的列（主键和变更列自动加入），不配置则SELECT *
+            #   filters: 服务端过滤条件，如 [{"column": "severity", "op": "in", "value": ["error", "critical"]}]
+            #   priority: 本地缓冲区排空顺序和淘汰顺序（越大越先排空、越晚淘汰），默认0
+            'table_specs': {
+                # updated_at由ON UPDATE维护且不小于created_at，单列即可同时捕获插入和更新，走idx_updated_at
+                'sensor_data': {'mode': 'timestamp', 'columns': ['updated_at'], 'primary_key': 'id'},
+                'device_status': {'mode': 'timestamp', 'columns': ['updated_at'], 'primary_key': 'id'},
+                'event_log': {'mode': 'id', 'primary_key': 'id'},
+                **json.loads(os.getenv('TABLE_SPECS', '{}')),
+            },
+            
+            # 采集模式: polling(按时间戳轮询) 或 binlog(流式读取binlog，可捕获UPDATE/DELETE)
+            'capture_mode': os.getenv('CAPTURE_MODE', 'polling'),
+            'binlog_server_id': int(os.getenv('BINLOG_SERVER_ID', 3002)),  # 不能与Debezium的3001冲突
+            'binlog_batch_timeout_ms': int(os.getenv('BINLOG_BATCH_TIMEOUT_MS', 500)),
+            'binlog_checkpoint_file': os.getenv('BINLOG_CHECKPOINT_FILE'),  # None表示按源ID生成默认路径
+            'binlog_fixture_path': os.getenv('BINLOG_FIXTURE_PATH'),  # 回放录制的变更事件(JSON Lines)，无需真实服务器
+            
+            # 导出预写日志: 记录每个批次的意图/提交和已提交的增量游标，重启后据此恢复
+            'export_journal_path': os.getenv('EXPORT_JOURNAL_PATH'),  # None表示按源ID生成默认路径
+            'export_journal_fsync': os.getenv('EXPORT_JOURNAL_FSYNC', 'true').lower() == 'true',
+            'export_journal_compact_every': int(os.getenv('EXPORT_JOURNAL_COMPACT_EVERY', 1000)),
+            
+            # 本地存储转发缓冲区（默认关闭）: 上行中断导致导出积压时，导出对象压缩写入本地段文件而不是暂停采集，
+            # 恢复后按优先级和写入顺序排空；超过磁盘预算时按 oldest/priority 策略淘汰整段
+            'store_buffer_enabled': os.getenv('STORE_BUFFER_ENABLED', 'false').lower() == 'true',
+            'store_buffer_dir': os.getenv('STORE_BUFFER_DIR'),  # None表示按源ID生成默认路径
+            'store_buffer_budget': int(os.getenv('STORE_BUFFER_BUDGET', 1024 * 1024 * 1024)),
+            'store_buffer_segment_size': int(os.getenv('STORE_BUFFER_SEGMENT_SIZE', 64 * 1024 * 1024)),
+            'store_buffer_eviction': os.getenv('STORE_BUFFER_EVICTION', 'oldest'),
+            'store_buffer_compress_level': int(os.getenv('STORE_BUFFER_COMPRESS_LEVEL', 3)),
+            # 缓冲区占用超过预算的该比例后才暂停采集，剩余空间留给已读取未导出的数据
+            'store_buffer_high_water_ratio': float(os.getenv('STORE_BUFFER_HIGH_WATER_RATIO', 0.9)),
+            'store_buffer_report_interval': int(os.getenv('STORE_BUFFER_REPORT_INTERVAL', 60)),
+            
+            # S3对象滚动配置（分区布局: table=/dt=/hour=）
+            'rollover_max_bytes': int(os.getenv('ROLLOVER_MAX_BYTES', 64 * 1024 * 1024)),
+            'rollover_max_age': int(os.getenv('ROLLOVER_MAX_AGE', 300)),  # 秒
+            
+            # 数据流容量与背压配置（RejectNewData: 流满时拒绝写入而不是覆盖最旧数据）
+            'stream_max_size': int(os.getenv('STREAM_MAX_SIZE', 256 * 1024 * 1024)),
+            'stream_segment_size': int(os.getenv('STREAM_SEGMENT_SIZE', 16 * 1024 * 1024)),
+            'strategy_on_full': os.getenv('STREAM_STRATEGY_ON_FULL', 'RejectNewData'),
+            'backpressure_high_water_tasks': int(os.getenv('BACKPRESSURE_HIGH_WATER_TASKS', 50)),
+            'backpressure_low_water_tasks': int(os.getenv('BACKPRESSURE_LOW_WATER_TASKS', 20)),
+            'backpressure_high_water_ratio': float(os.getenv('BACKPRESSURE_HIGH_WATER_RATIO', 0.8)),
+            'backpressure_low_water_ratio': float(os.getenv('BACKPRESSURE_LOW_WATER_RATIO', 0.5)),
+            
+            # 性能剖析配置（默认关闭；kill -USR1 <pid> 对下一轮处理做cProfile采样）
+            'profiling_enabled': os.getenv('PROFILING_ENABLED', 'false').lower() == 'true',
+            'profiling_report_interval': int(os.getenv('PROFILING_REPORT_INTERVAL', 300)),
+            'profile_dir': os.getenv('PROFILE_DIR', tempfile.gettempdir()),
+            
+            # 临时文件目录（None表示系统默认临时目录）
+            'spool_dir': None,
         }
         
+        # 多源宿主模式下由宿主进程覆盖单个源的配置（下发的值同样可能是浮点数或字符串，按声明的类型转换）
+        if config_overrides:
+            self.apply_runtime_config(config_overrides, initial=True)
+        self.source_id = source_id
+        # 宿主模式下所有源共享进程环境变量: 来自环境变量的文件路径按源ID区分，源自己配置的路径保持不变
+        if stream_manager_client is not None:
+            for key in self.SOURCE_PATH_CONFIG_KEYS:
+                if self.config[key] and key not in (config_overrides or {}):
+                    self.config[key] = source_scoped_path(self.config[key], source_id)
+        
+        # 独立运行时从组件配置（或COMPONENT_CONFIG_FILE）加载并监视变化；宿主模式下由宿主下发
+        self.config_source: Optional[RuntimeConfigSource] = None
+        if stream_manager_client is None:
+            self.config_source = RuntimeConfigSource(os.getenv('COMPONENT_CONFIG_FILE'), [])
+            self.apply_runtime_config(self.config_source.load(), initial=True)
+        # 配置变化后需要在轮询线程中重建连接
+        self.reconnect_requested = False
+        # 轮询间隔变化时提前唤醒等待中的轮询循环
+        self.wake_event = threading.Event()
+        
         # 运行状态
         self.running = False
         self.mysql_connection: Optional[mysql.connector.MySQLConnection] = None
-        self.stream_manager_client: Optional[StreamManagerClient] = None
-        self.last_sync_timestamps: Dict[str, datetime] = {}
+        self.stream_manager_client: Optional[StreamManagerClient] = stream_manager_client
+        # 共享客户端由宿主进程负责创建流和关闭连接
+        self.shared_stream_manager = stream_manager_client is not None
+        # 每个表的增量游标: 变更位置（时间戳或主键）及同一位置上已导出的最大主键
+        self.last_sync_timestamps: Dict[str, Any] = {}
+        self.last_sync_keys: Dict[str, Any] = {}
+        # 已通过INFORMATION_SCHEMA校验的表规格
+        self.validated_specs: Dict[str, Dict[str, Any]] = {}
+        
+        # binlog模式状态: 已提交事务的GTID集合 {server_uuid: 最大事务号}
+        self.binlog_gtid_set: Dict[str, int] = {}
+        self.binlog_checkpoint_loaded = False
+        # 正在导出的binlog批次: 剩余待提交的分区对象数和批次完成后的GTID集合（随最后一个对象的提交写入预写日志）
+        self.binlog_batch_exports = 0
+        self.binlog_batch_gtid_set: Dict[str, int] = {}
+        self.binlog_stream = None
+        if not self.config['binlog_checkpoint_file']:
+            self.config['binlog_checkpoint_file'] = os.path.join(
+                self.config['spool_dir'] or tempfile.gettempdir(),
+                f"mysql_to_s3_binlog_checkpoint_{self.source_id}.json"
+            )
+        
+        if not self.config['export_journal_path']:
+            self.config['export_journal_path'] = os.path.join(
+                self.config['spool_dir'] or tempfile.gettempdir(),
+                f"mysql_to_s3_journal_{self.source_id}.jsonl"
+            )
+        self.journal = ExportJournal(
+            self.config['export_journal_path'],
+            fsync=self.config['export_journal_fsync'],
+            compact_every=self.config['export_journal_compact_every']
+        )
+        # 从已提交的游标继续: 未导出的缓冲记录会重新读取，已导出的不会重复
+        for table_name, cursor in self.journal.state.get('cursors', {}).items():
+            self.restore_cursor(table_name, cursor)
+        
+        # 本地存储转发缓冲区: 写入缓冲区即视为批次已提交，游标随之推进
+        self.store_buffer: Optional[StoreAndForwardBuffer] = None
+        if self.config['store_buffer_enabled']:
+            if not self.config['store_buffer_dir']:
+                self.config['store_buffer_dir'] = os.path.join(
+                    self.config['spool_dir'] or tempfile.gettempdir(),
+                    f"mysql_to_s3_buffer_{self.source_id}"
+                )
+            self.store_buffer = StoreAndForwardBuffer(
+                self.config['store_buffer_dir'],
+                budget_bytes=self.config['store_buffer_budget'],
+                segment_bytes=self.config['store_buffer_segment_size'],
+                eviction=self.config['store_buffer_eviction'],
+                compress_level=self.config['store_buffer_compress_level'],
+                fsync=self.config['export_journal_fsync']
+            )
+        
+        # 按表分区累积记录的滚动写入器
+        self.rollover_writer = PartitionedRolloverWriter(
+            key_prefix=self.config['s3_key_prefix'],
+            max_bytes=self.config['rollover_max_bytes'],
+            max_age=self.config['rollover_max_age'],
+            spool_dir=self.config['spool_dir'],
+            export_callback=self.submit_s3_export
+        )
+        
+        # 导出准入控制（多源宿主模式下所有源共享同一个实例）
+        self.backpressure = ExportBackpressure(
+            high_water_tasks=self.config['backpressure_high_water_tasks'],
+            low_water_tasks=self.config['backpressure_low_water_tasks'],
+            high_water_bytes=int(self.config['stream_max_size'] * self.config['backpressure_high_water_ratio']),
+            low_water_bytes=int(self.config['stream_max_size'] * self.config['backpressure_low_water_ratio'])
+        )
+        self.next_status_sequence = 0
+        
+        # 分阶段计时
+        self.profiler = StageProfiler(
+            name=f"mysql_{self.source_id}",
+            enabled=self.config['profiling_enabled'],
+            report_interval=self.config['profiling_report_interval'],
+            profile_dir=self.config['profile_dir']
+        )
         
         # 线程
         self.polling_thread: Optional[threading.Thread] = None
         self.status_monitor_thread: Optional[threading.Thread] = None
+        self.store_buffer_thread: Optional[threading.Thread] = None
+        
+        logger.info("MySQL到S3轮询组件初始化完成: %s", self.source_id)
+    
+    def apply_runtime_config(self, new_config: Dict[str, Any], initial: bool = False) -> Dict[str, Any]:
+        """应用运行时配置，返回实际变化的配置项
+        轮询间隔、批次大小、表列表和表规格等在下一轮轮询生效，不影响已缓冲的记录；
+        连接参数变化时在下一轮轮询开始前重连；采集模式和数据流等配置需要重启组件
+        """
+        changed = {}
+        for key, value in new_config.items():
+            if key not in self.config:
+                logger.debug("忽略未知配置项: %s", key)
+                continue
+            try:
+                value = coerce_config_value(self.CONFIG_TYPES[key], value)
+            except (TypeError, ValueError, json.JSONDecodeError) as e:
+                logger.error("配置项 %s 的值无效: %s", key, e)
+                continue
+            if value != self.config[key]:
+                changed[key] = value
         
-        logger.info("MySQL到S3轮询组件初始化完成")
+        if not initial:
+            for key in [key for key in changed if key in self.RESTART_CONFIG_KEYS]:
+                logger.warning("配置项 %s 需要重启组件才能生效，已忽略", key)
+                del changed[key]
+        if not changed:
+            return changed
+        
+        previous_specs = {table: self.get_table_spec(table) for table in self.config['monitored_tables']}
+        self.config.update(changed)
+        if initial:
+            return changed
+        
+        if 'table_specs' in changed or 'timestamp_column' in changed:
+            self.validated_specs.clear()
+            # 跟踪方式变化后旧游标不再有意义，从表的当前位置重新开始
+            for table, previous_spec in previous_specs.items():
+                spec = self.get_table_spec(table)
+                if (spec['mode'], spec['columns'], spec['primary_key']) != \
+                        (previous_spec['mode'], previous_spec['columns'], previous_spec['primary_key']):
+                    logger.warning("表 %s 的变更跟踪方式已变化，同步位置将重新初始化", table)
+                    self.last_sync_timestamps.pop(table, None)
+                    self.last_sync_keys.pop(table, None)
+        if any(key.startswith('backpressure_') for key in changed):
+            self.backpressure.update_thresholds(
+                high_water_tasks=self.config['backpressure_high_water_tasks'],
+                low_water_tasks=self.config['backpressure_low_water_tasks'],
+                high_water_bytes=int(self.config['stream_max_size'] * self.config['backpressure_high_water_ratio']),
+                low_water_bytes=int(self.config['stream_max_size'] * self.config['backpressure_low_water_ratio'])
+            )
+        self.rollover_writer.key_prefix = self.config['s3_key_prefix']
+        self.rollover_writer.max_bytes = self.config['rollover_max_bytes']
+        self.rollover_writer.max_age = self.config['rollover_max_age']
+        self.profiler.enabled = self.config['profiling_enabled']
+        self.profiler.report_interval = self.config['profiling_report_interval']
+        self.journal.fsync = self.config['export_journal_fsync']
+        self.journal.compact_every = self.config['export_journal_compact_every']
+        if any(key in self.CONNECTION_CONFIG_KEYS for key in changed):
+            self.reconnect_requested = True
+        if 'polling_interval' in changed:
+            self.wake_event.set()
+        
+        # 不在日志中输出配置值（可能包含密码）
+        logger.info("运行时配置已更新: %s", ', '.join(sorted(changed)))
+        return changed
     
     def setup_stream_manager(self) -> bool:
         """设置Stream Manager"""
@@ -87,7 +480,7 @@ class MySQLToS3Component:
         
         for attempt in range(max_retries):
             try:
-                logger.info(f"尝试连接Stream Manager (第{attempt + 1}次/共{max_retries}次)")
+                logger.info("尝试连接Stream Manager (第%s次/共%s次)", attempt + 1, max_retries)
                 
                 # 创建Stream Manager客户端
                 self.stream_manager_client = StreamManagerClient()
@@ -96,13 +489,13 @@ class MySQLToS3Component:
                 # 删除已存在的流（重新开始）
                 try:
                     self.stream_manager_client.delete_message_stream(self.config['status_stream_name'])
-                    logger.info(f"删除已存在的状态流: {self.config['status_stream_name']}")
+                    logger.info("删除已存在的状态流: %s", self.config['status_stream_name'])
                 except ResourceNotFoundException:
                     pass
                 
                 try:
                     self.stream_manager_client.delete_message_stream(self.config['stream_name'])
-                    logger.info(f"删除已存在的数据流: {self.config['stream_name']}")
+                    logger.info("删除已存在的数据流: %s", self.config['stream_name'])
                 except ResourceNotFoundException:
                     pass
                 
@@ -126,24 +519,26 @@ class MySQLToS3Component:
                         strategy_on_full=StrategyOnFull.OverwriteOldestData
                     )
                 )
-                logger.info(f"成功创建状态流: {self.config['status_stream_name']}")
+                logger.info("成功创建状态流: %s", self.config['status_stream_name'])
                 
                 # 创建带S3导出的消息流
                 self.stream_manager_client.create_message_stream(
                     MessageStreamDefinition(
                         name=self.config['stream_name'],
-                        strategy_on_full=StrategyOnFull.OverwriteOldestData,
+                        max_size=self.config['stream_max_size'],
+                        stream_segment_size=self.config['stream_segment_size'],
+                        strategy_on_full=getattr(StrategyOnFull, self.config['strategy_on_full']),
                         export_definition=exports
                     )
                 )
-                logger.info(f"成功创建S3导出数据流: {self.config['stream_name']}")
+                logger.info("成功创建S3导出数据流: %s", self.config['stream_name'])
                 
                 return True
-                
+            
             except Exception as e:
-                logger.error(f"设置Stream Manager失败 (第{attempt + 1}次尝试): {e}")
+                logger.error("设置Stream Manager失败 (第%s次尝试): %s", attempt + 1, e)
                 if attempt < max_retries - 1:
-                    logger.info(f"等待{retry_delay}秒后重试...")
+                    logger.info("等待%s秒后重试...", retry_delay)
                     time.sleep(retry_delay)
                 else:
                     logger.error("所有重试都失败了")
@@ -154,7 +549,7 @@ class MySQLToS3Component:
     def setup_mysql_connection(self) -> bool:
         """设置MySQL连接"""
         try:
-            logger.info(f"连接到MySQL数据库: {self.config['mysql_username']}@{self.config['mysql_host']}:{self.config['mysql_port']}")
+            logger.info("连接到MySQL数据库: %s@%s:%s", self.config['mysql_username'], self.config['mysql_host'], self.config['mysql_port'])
             
             self.mysql_connection = mysql.connector.connect(
                 host=self.config['mysql_host'],
@@ -175,247 +570,426 @@ class MySQLToS3Component:
             else:
                 logger.error("MySQL连接失败")
                 return False
-                
+        
         except Error as e:
-            logger.error(f"MySQL连接错误: {e}")
+            logger.error("MySQL连接错误: %s", e)
             return False
     
-    def execute_max_query_with_validation(self, table_name, column_name):
-        """Execute MAX query with SQL-based validation using INFORMATION_SCHEMA"""
-        try:
+    def get_table_spec(self, table_name: str) -> Dict[str, Any]:
+        """获取表的变更跟踪规格，未配置的表按timestamp_column轮询"""
+        spec = {
+            'mode': 'timestamp',
+            'columns': [self.config['timestamp_column']],
+            'primary_key': 'id',
+        }
+        spec.update(self.config['table_specs'].get(table_name, {}))
+        if spec['mode'] == 'id':
+            spec['columns'] = [spec['primary_key']]
+        return spec
+    
+    def validate_table_spec(self, table_name: str) -> Dict[str, Any]:
+        """用INFORMATION_SCHEMA校验表和列是否存在（每个表只校验一次），返回可安全拼接到SQL中的规格"""
+        if table_name in self.validated_specs:
+            return self.validated_specs[table_name]
+        
+        spec = self.get_table_spec(table_name)
+        if spec['mode'] not in ('timestamp', 'greatest', 'id'):
+            raise ValueError(f"不支持的变更跟踪模式: {spec['mode']} (表 {table_name})")
+        if spec['mode'] == 'greatest' and len(spec['columns']) < 2:
+            raise ValueError(f"greatest模式至少需要两个列 (表 {table_name})")
+        
+        for predicate in spec.get('filters', []):
+            if predicate.get('op', '').lower() not in self.FILTER_OPERATORS:
+                raise ValueError(f"不支持的过滤操作符: {predicate.get('op')} (表 {table_name})")
+            if predicate['op'].lower() in ('in', 'not in') and not predicate.get('value'):
+                raise ValueError(f"{predicate['op']}过滤条件需要非空的值列表 (表 {table_name})")
+        
+        required_columns = (set(spec['columns']) | {spec['primary_key']}
+                            | set(spec.get('projection', []))
+                            | {predicate['column'] for predicate in spec.get('filters', [])})
+        for identifier in [table_name, *required_columns]:
+            if not re.fullmatch(r'[A-Za-z0-9_]+', identifier):
+                raise ValueError(f"非法的标识符: {identifier}")
+        
+        with self.profiler.span('schema_validation'):
             cursor = self.mysql_connection.cursor()
-            
-            # SQL statement that validates table and column existence before executing the query
-            validation_and_query_sql = """
-            SET @table_exists = (
-                SELECT COUNT(*) FROM information_schema.tables
-                WHERE table_name = %s AND table_schema = DATABASE()
-            );
-            
-            SET @column_exists = (
-                SELECT COUNT(*) FROM information_schema.columns
-                WHERE table_name = %s AND column_name = %s AND table_schema = DATABASE()
-            );
-            
-            SET @sql = CASE 
-                WHEN @table_exists > 0 AND @column_exists > 0 THEN
-                    CONCAT('SELECT MAX(`', %s, '`) FROM `', %s, '`')
-                ELSE
-                    'SELECT NULL as validation_error'
-            END;
-            
-            PREPARE stmt FROM @sql;
-            EXECUTE stmt;
-            DEALLOCATE PREPARE stmt;
-            
-            SELECT @table_exists as table_exists, @column_exists as column_exists;
-            """
-            
-            # Execute the validation and query
-            for result in cursor.execute(validation_and_query_sql, 
-                                       (table_name, table_name, column_name, column_name, table_name), 
-                                       multi=True):
-                if result.with_rows:
-                    rows = result.fetchall()
-                    # The last result contains our validation flags
-                    if len(rows) > 0 and len(rows[0]) == 2:
-                        table_exists, column_exists = rows[0]
-                        if table_exists == 0:
-                            raise ValueError(f"Table does not exist: {table_name}")
-                        if column_exists == 0:
-                            raise ValueError(f"Column does not exist: {column_name} in table {table_name}")
-                    else:
-                        # This should be our MAX result
-                        return rows[0][0] if rows and rows[0] else None
-            
-            cursor.close()
-            return None
-            
-        except Error as e:
-            logger.error(f"SQL validation and query error: {e}")
-            raise
-
-    def execute_incremental_query_with_validation(self, table_name, timestamp_column, last_timestamp, batch_size):
-        """Execute incremental query with SQL-based validation using INFORMATION_SCHEMA"""
-        try:
-            cursor = self.mysql_connection.cursor(dictionary=True)
-            
-            # SQL statement that validates table and column existence before executing the query
-            validation_and_query_sql = """
-            SET @table_exists = (
-                SELECT COUNT(*) FROM information_schema.tables
-                WHERE table_name = %s AND table_schema = DATABASE()
-            );
-            
-            SET @column_exists = (
-                SELECT COUNT(*) FROM information_schema.columns
-                WHERE table_name = %s AND column_name = %s AND table_schema = DATABASE()
-            );
-            
-            SET @sql = CASE 
-                WHEN @table_exists > 0 AND @column_exists > 0 THEN
-                    CONCAT('SELECT * FROM `', %s, '` WHERE `', %s, '` > ? ORDER BY `', %s, '` ASC LIMIT ?')
-                ELSE
-                    'SELECT NULL as validation_error'
-            END;
-            
-            PREPARE stmt FROM @sql;
-            SET @last_timestamp = %s;
-            SET @batch_size = %s;
-            EXECUTE stmt USING @last_timestamp, @batch_size;
-            DEALLOCATE PREPARE stmt;
-            
-            SELECT @table_exists as table_exists, @column_exists as column_exists;
-            """
-            
-            # Execute the validation and query
-            results = []
-            validation_info = None
-            
-            for result in cursor.execute(validation_and_query_sql, 
-                                       (table_name, table_name, timestamp_column, 
-                                        table_name, timestamp_column, timestamp_column,
-                                        last_timestamp, batch_size), 
-                                       multi=True):
-                if result.with_rows:
-                    rows = result.fetchall()
-                    if rows and len(rows[0]) == 2 and 'table_exists' in rows[0]:
-                        # This is our validation result
-                        validation_info = rows[0]
-                    else:
-                        # This is our data result
-                        results = rows
-            
-            # Check validation results
-            if validation_info:
-                if validation_info['table_exists'] == 0:
-                    raise ValueError(f"Table does not exist: {table_name}")
-                if validation_info['column_exists'] == 0:
-                    raise ValueError(f"Column does not exist: {timestamp_column} in table {table_name}")
-            
+            cursor.execute(
+                "SELECT column_name FROM information_schema.columns "
+                "WHERE table_schema = DATABASE() AND table_name = %s",
+                (table_name,)
+            )
+            existing_columns = {row[0] for row in cursor.fetchall()}
             cursor.close()
-            return results
-            
-        except Error as e:
-            logger.error(f"SQL validation and incremental query error: {e}")
-            raise
-
+        
+        if not existing_columns:
+            raise ValueError(f"Table does not exist: {table_name}")
+        missing_columns = required_columns - existing_columns
+        if missing_columns:
+            raise ValueError(f"Column does not exist: {', '.join(sorted(missing_columns))} in table {table_name}")
+        
+        self.validated_specs[table_name] = spec
+        return spec
+    
+    def select_list(self, spec: Dict[str, Any]) -> str:
+        """查询列: 配置了projection时只取这些列，主键和变更列始终包含"""
+        if not spec.get('projection'):
+            return '*'
+        columns = list(dict.fromkeys([spec['primary_key'], *spec['columns'], *spec['projection']]))
+        return ', '.join(f"`{column}`" for column in columns)
+    
+    def build_filter_clause(self, spec: Dict[str, Any]) -> Tuple[str, List[Any]]:
+        """把声明式过滤条件转换为参数化的SQL片段（列名已校验，值全部走参数）"""
+        clauses = []
+        params: List[Any] = []
+        for predicate in spec.get('filters', []):
+            column = f"`{predicate['column']}`"
+            op = predicate['op'].lower()
+            if op in ('is null', 'is not null'):
+                clauses.append(f"{column} {op.upper()}")
+            elif op in ('in', 'not in'):
+                values = list(predicate['value'])
+                clauses.append(f"{column} {op.upper()} ({', '.join(['%s'] * len(values))})")
+                params.extend(values)
+            else:
+                clauses.append(f"{column} {op} %s")
+                params.append(predicate['value'])
+        return ''.join(f" AND {clause}" for clause in clauses), params
+    
+    def change_position_expression(self, spec: Dict[str, Any]) -> str:
+        """变更位置表达式: 单列、多列GREATEST或主键"""
+        if spec['mode'] == 'greatest':
+            return 'GREATEST(' + ', '.join(f"`{column}`" for column in spec['columns']) + ')'
+        return f"`{spec['columns'][0]}`"
+    
+    def build_change_query(self, table_name: str, spec: Dict[str, Any], has_key_cursor: bool) -> str:
+        """构造增量查询
+        以(变更位置, 主键)作为复合游标，同一时间戳的记录跨批次时不会丢失；
+        greatest模式额外加上逐列的 >= 条件，使优化器可以对各列索引做index merge，而不是全表扫描
+        """
+        position = self.change_position_expression(spec)
+        primary_key = f"`{spec['primary_key']}`"
+        select_list = self.select_list(spec)
+        filter_clause, _ = self.build_filter_clause(spec)
+        
+        if spec['mode'] == 'id':
+            return (f"SELECT {select_list} FROM `{table_name}` WHERE {primary_key} > %s{filter_clause} "
+                    f"ORDER BY {primary_key} ASC LIMIT %s")
+        
+        index_filter = ' OR '.join(f"`{column}` >= %s" for column in spec['columns'])
+        if has_key_cursor:
+            cursor_filter = f"({position} > %s OR ({position} = %s AND {primary_key} > %s))"
+        else:
+            cursor_filter = f"{position} > %s"
+        return (f"SELECT {select_list}, {position} AS `__change_position` FROM `{table_name}` "
+                f"WHERE ({index_filter}) AND {cursor_filter}{filter_clause} "
+                f"ORDER BY {position} ASC, {primary_key} ASC LIMIT %s")
+    
+    def query_initial_position(self, table_name: str, spec: Dict[str, Any]):
+        """查询表当前的最大变更位置（多列时分别取各列MAX，每个都能走索引）"""
+        cursor = self.mysql_connection.cursor()
+        select_list = ', '.join(f"MAX(`{column}`)" for column in spec['columns'])
+        cursor.execute(f"SELECT {select_list} FROM `{table_name}`")
+        row = cursor.fetchone()
+        cursor.close()
+        values = [value for value in (row or []) if value is not None]
+        return max(values) if values else None
+    
     def initialize_sync_timestamps(self):
-        """初始化同步时间戳"""
-        try:
-            for table in self.config['monitored_tables']:
-                # 获取表中最新记录的时间戳 - using SQL-based validation
-                result = self.execute_max_query_with_validation(table, self.config['timestamp_column'])
-                
-                if result:
-                    self.last_sync_timestamps[table] = result
-                    logger.info(f"表 {table} 初始同步时间戳: {result}")
-                else:
-                    # 如果表为空，使用当前时间前1小时
-                    self.last_sync_timestamps[table] = datetime.now() - timedelta(hours=1)
-                    logger.info(f"表 {table} 使用默认同步时间戳: {self.last_sync_timestamps[table]}")
+        """初始化同步位置（重连时保留已有位置，只初始化新表）"""
+        for table in self.config['monitored_tables']:
+            if table in self.last_sync_timestamps:
+                continue
             
-        except Exception as e:
-            logger.error(f"初始化同步时间戳失败: {e}")
-            # 使用默认时间戳
-            for table in self.config['monitored_tables']:
+            spec = self.get_table_spec(table)
+            try:
+                # 获取表中最新记录的变更位置
+                spec = self.validate_table_spec(table)
+                with self.profiler.span('initial_position'):
+                    result = self.query_initial_position(table, spec)
+            except Exception as e:
+                logger.error("初始化表 %s 同步位置失败: %s", table, e)
+                result = None
+            
+            if result is not None:
+                self.last_sync_timestamps[table] = result
+                logger.info("表 %s 初始同步位置: %s", table, result)
+            elif spec['mode'] == 'id':
+                self.last_sync_timestamps[table] = 0
+                logger.info("表 %s 使用默认同步位置: 0", table)
+            else:
+                # 如果表为空，使用当前时间前1小时
                 self.last_sync_timestamps[table] = datetime.now() - timedelta(hours=1)
+                logger.info("表 %s 使用默认同步时间戳: %s", table, self.last_sync_timestamps[table])
+    
+    def execute_change_query(self, table_name: str, spec: Dict[str, Any], batch_size: int) -> List[Dict[str, Any]]:
+        """执行增量查询，返回记录（已去掉内部的__change_position列）并推进游标"""
+        last_position = self.last_sync_timestamps[table_name]
+        last_key = self.last_sync_keys.get(table_name)
+        
+        if spec['mode'] == 'id':
+            params = [last_position]
+        else:
+            params = [last_position] * len(spec['columns'])
+            params += [last_position, last_position, last_key] if last_key is not None else [last_position]
+        params += self.build_filter_clause(spec)[1]
+        params.append(batch_size)
+        
+        cursor = self.mysql_connection.cursor(dictionary=True)
+        with self.profiler.span('incremental_query'):
+            cursor.execute(self.build_change_query(table_name, spec, last_key is not None), params)
+            with self.profiler.span('fetchall'):
+                records = cursor.fetchall()
+        cursor.close()
+        
+        if records:
+            last_record = records[-1]
+            if spec['mode'] == 'id':
+                self.last_sync_timestamps[table_name] = last_record[spec['primary_key']]
+            else:
+                self.last_sync_timestamps[table_name] = last_record['__change_position']
+                self.last_sync_keys[table_name] = last_record[spec['primary_key']]
+                for record in records:
+                    del record['__change_position']
+        
+        return records
     
     def poll_table_data(self, table_name: str) -> List[Dict[str, Any]]:
         """轮询表数据获取增量记录"""
         try:
-            last_timestamp = self.last_sync_timestamps.get(table_name)
-            if not last_timestamp:
-                logger.warning(f"表 {table_name} 没有同步时间戳，跳过")
+            if table_name not in self.last_sync_timestamps:
+                logger.warning("表 %s 没有同步位置，跳过", table_name)
                 return []
-
-            # 查询增量数据 - using SQL-based validation
-            records = self.execute_incremental_query_with_validation(
-                table_name, 
-                self.config['timestamp_column'], 
-                last_timestamp, 
-                self.config['batch_size']
-            )
+            
+            # 表规格只在首次轮询时校验
+            spec = self.validate_table_spec(table_name)
+            records = self.execute_change_query(table_name, spec, self.config['batch_size'])
             
             if records:
-                # 更新最后同步时间戳
-                latest_timestamp = records[-1][self.config['timestamp_column']]
-                self.last_sync_timestamps[table_name] = latest_timestamp
-                
-                logger.info(f"表 {table_name} 获取到 {len(records)} 条增量记录，最新时间戳: {latest_timestamp}")
+                logger.debug("表 %s 获取到 %d 条增量记录，最新位置: %s",
+                             table_name, len(records), self.last_sync_timestamps[table_name])
             
             return records
-            
+        
         except Exception as e:
-            logger.error(f"轮询表 {table_name} 数据失败: {e}")
+            logger.error("轮询表 %s 数据失败: %s", table_name, e)
             return []
     
+    def record_cursor(self, spec: Dict[str, Any], record: Dict[str, Any]) -> Dict[str, Any]:
+        """记录的增量游标(变更位置, 主键)，编码为可写入日志和清单的JSON"""
+        if spec['mode'] == 'id':
+            position, key = record.get(spec['primary_key']), None
+        else:
+            values = [record.get(column) for column in spec['columns']]
+            values = [value for value in values if value is not None]
+            position, key = (max(values) if values else None), record.get(spec['primary_key'])
+        if isinstance(position, datetime):
+            return {'position': position.isoformat(), 'datetime': True, 'key': key}
+        return {'position': position, 'datetime': False, 'key': key}
+    
+    def restore_cursor(self, table_name: str, cursor: Dict[str, Any]):
+        """把日志中的游标恢复为内存中的同步位置"""
+        position = cursor['position']
+        if cursor.get('datetime'):
+            position = datetime.fromisoformat(position)
+        self.last_sync_timestamps[table_name] = position
+        if cursor.get('key') is not None:
+            self.last_sync_keys[table_name] = cursor['key']
+    
+    def record_change_time(self, spec: Dict[str, Any], record: Dict[str, Any]) -> Optional[datetime]:
+        """记录的变更时间，用于分区；id模式或列为空时返回None（使用同步时间）"""
+        if spec['mode'] == 'id':
+            return None
+        values = [record.get(column) for column in spec['columns']]
+        values = [value for value in values if isinstance(value, datetime)]
+        return max(values) if values else None
+    
+    def convert_record_values(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """转换特殊类型对象为JSON可序列化的格式"""
+        processed_record = {}
+        for key, value in record.items():
+            if isinstance(value, datetime):
+                processed_record[key] = value.isoformat()
+            elif isinstance(value, Decimal):
+                processed_record[key] = float(value)
+            elif value is None:
+                processed_record[key] = None
+            else:
+                processed_record[key] = value
+        return processed_record
+    
     def process_and_send_data(self, table_name: str, records: List[Dict[str, Any]]) -> bool:
-        """处理并发送数据到S3"""
+        """处理数据并写入分区滚动缓冲区，达到目标大小的分区立即提交到S3"""
         try:
             if not records:
                 return True
             
-            # 准备数据
-            processed_data = {
-                'source_type': 'mysql_polling',
-                'table_name': table_name,
-                'sync_timestamp': datetime.utcnow().isoformat() + 'Z',
-                'record_count': len(records),
-                'sync_range': {
-                    'start_time': records[0][self.config['timestamp_column']].isoformat() if records[0][self.config['timestamp_column']] else None,
-                    'end_time': records[-1][self.config['timestamp_column']].isoformat() if records[-1][self.config['timestamp_column']] else None
-                },
-                'records': []
-            }
+            spec = self.get_table_spec(table_name)
+            primary_key = spec['primary_key']
+            rolled_objects = 0
             
-            # 处理每条记录
-            for record in records:
-                # 转换特殊类型对象为JSON可序列化的格式
-                processed_record = {}
-                for key, value in record.items():
-                    if isinstance(value, datetime):
-                        processed_record[key] = value.isoformat()
-                    elif isinstance(value, Decimal):
-                        processed_record[key] = float(value)
-                    elif value is None:
-                        processed_record[key] = None
-                    else:
-                        processed_record[key] = value
-                processed_data['records'].append(processed_record)
-            
-            # 生成S3键名
-            timestamp_str = datetime.utcnow().strftime('%Y/%m/%d/%H%M%S')
-            s3_key = f"{self.config['s3_key_prefix']}{timestamp_str}_{table_name}_polling.json"
-            
-            # 创建临时文件
-            import tempfile
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as temp_file:
-                json.dump(processed_data, temp_file, indent=2)
-                temp_file_path = temp_file.name
-            
-            # 创建S3导出任务
-            s3_export_task = S3ExportTaskDefinition(
-                bucket=self.config['s3_bucket'],
-                key=s3_key,
-                input_url=f"file:{temp_file_path}"
-            )
+            # 处理每条记录；同一主键在未滚动的分区缓冲中只保留最新状态
+            with self.profiler.span('record_conversion'):
+                for record in records:
+                    rolled_objects += self.rollover_writer.add_record(
+                        table_name,
+                        self.record_change_time(spec, record),
+                        json.dumps(self.convert_record_values(record), ensure_ascii=False),
+                        dedup_key=record.get(primary_key),
+                        cursor=self.record_cursor(spec, record)
+                    )
+            
+            logger.debug("表 %s 写入分区缓冲区: %d条记录，滚动对象 %d 个", table_name, len(records), rolled_objects)
+            
+            return True
+        
+        except Exception as e:
+            logger.error("处理并发送数据失败 %s: %s", table_name, e)
+            return False
+    
+    def submit_s3_export(self, s3_key: str, file_path: str, manifest: Dict[str, Any]) -> int:
+        """以预写日志保护的方式提交S3导出任务，返回序列号
+        批次ID由源ID和S3键（含内容哈希）确定，相同数据重试得到相同的批次ID和对象键
+        """
+        batch_id = hashlib.sha256(f"{self.source_id}:{s3_key}".encode('utf-8')).hexdigest()[:32]
+        manifest = {
+            'batch_id': batch_id,
+            'source': f"mysql://{self.config['mysql_host']}:{self.config['mysql_port']}/{self.config['mysql_database']}",
+            **manifest,
+        }
+        # 提交成功后生效的状态: 该表已导出到的游标（binlog模式由GTID检查点负责）
+        state_updates = {}
+        if manifest.get('last_cursor') is not None:
+            state_updates['cursors'] = {manifest['table']: manifest['last_cursor']}
+        if self.binlog_batch_exports:
+            self.binlog_batch_exports -= 1
+            if not self.binlog_batch_exports:
+                # binlog批次的最后一个对象: 提交与GTID检查点在同一条日志记录中生效
+                state_updates['binlog_checkpoint'] = {'gtid_set': self.binlog_batch_gtid_set}
+        
+        self.journal.begin(batch_id, s3_key, file_path, manifest, state_updates)
+        try:
+            if self.should_buffer_export():
+                priority = self.config['table_specs'].get(manifest['table'], {}).get('priority', 0)
+                sequence_number = self.buffer_export(s3_key, file_path, manifest, priority)
+            else:
+                sequence_number = self.append_export_task(s3_key, file_path, manifest)
+        except Exception:
+            self.journal.abort(batch_id)
+            raise
+        self.journal.commit(batch_id)
+        self.journal.compact()
+        return sequence_number
+    
+    def should_buffer_export(self) -> bool:
+        """导出积压时写入本地缓冲区；缓冲区非空时新对象也排在后面，保持写入顺序"""
+        return self.store_buffer is not None and (not self.backpressure.admit() or not self.store_buffer.empty())
+    
+    def buffer_export(self, s3_key: str, file_path: str, manifest: Dict[str, Any], priority: int = 0) -> int:
+        """把待导出的临时文件写入本地缓冲区后删除，返回-1（尚未进入数据流，没有序列号）"""
+        with open(file_path, 'rb') as f:
+            self.store_buffer.append(s3_key, f.read(), manifest, priority)
+        os.remove(file_path)
+        logger.debug("导出积压，对象写入本地缓冲区: %s", s3_key)
+        return -1
+    
+    def export_admitted(self) -> bool:
+        """是否允许继续采集: 导出未积压，或本地缓冲区还没到高水位"""
+        if self.backpressure.admit():
+            return True
+        return self.store_buffer is not None and \
+            self.store_buffer.has_capacity(self.config['store_buffer_high_water_ratio'])
+    
+    def submit_buffered_export(self, s3_key: str, content: bytes, manifest: Dict[str, Any]):
+        """把缓冲区中的一条记录还原成临时文件并提交导出"""
+        with tempfile.NamedTemporaryFile(mode='wb', suffix='.jsonl', delete=False,
+                                         dir=self.config['spool_dir']) as temp_file:
+            temp_file.write(content)
+        try:
+            self.append_export_task(s3_key, temp_file.name, manifest)
+        except Exception:
+            os.remove(temp_file.name)
+            raise
+    
+    def store_buffer_drain_loop(self):
+        """导出恢复（背压解除）后按段顺序连续排空本地缓冲区，再次积压时暂停；定期输出缓冲深度和排空速率"""
+        last_report = time.monotonic()
+        while self.running:
+            if self.store_buffer.empty():
+                time.sleep(1)
+            elif self.backpressure.wait_for_capacity(1):
+                try:
+                    drained = self.store_buffer.drain(self.submit_buffered_export,
+                                                      lambda: self.running and self.backpressure.admit())
+                    if drained:
+                        logger.info("本地缓冲区已排空 %d 个对象", drained)
+                except Exception as e:
+                    logger.error("排空本地缓冲区失败，稍后重试: %s", e)
+                    time.sleep(self.config['retry_delay'])
             
-            # 发送到Stream Manager
+            if time.monotonic() - last_report >= self.config['store_buffer_report_interval']:
+                last_report = time.monotonic()
+                metrics = self.store_buffer.metrics()
+                if metrics['records'] or metrics['evicted_records']:
+                    eta = metrics['catch_up_seconds']
+                    logger.info("本地缓冲区: %d 段, %d 个对象, %d 字节; 写入 %.0f B/s, 排空 %.0f B/s, "
+                                "预计排空 %s; 累计淘汰 %d 个对象",
+                                metrics['segments'], metrics['records'], metrics['bytes'],
+                                metrics['ingest_rate'], metrics['drain_rate'],
+                                f"{eta:.0f}秒" if eta is not None else "未知", metrics['evicted_records'])
+    
+    def start_store_buffer_drain(self):
+        """启动本地缓冲区排空线程（宿主模式下由宿主在注册源时调用）"""
+        if self.store_buffer and not (self.store_buffer_thread and self.store_buffer_thread.is_alive()):
+            self.store_buffer_thread = threading.Thread(target=self.store_buffer_drain_loop, daemon=True)
+            self.store_buffer_thread.start()
+    
+    def append_export_task(self, s3_key: str, file_path: str, manifest: Dict[str, Any]) -> int:
+        """提交S3导出任务到Stream Manager，清单作为对象的用户元数据，下游按batch_id去重"""
+        # 创建S3导出任务
+        s3_export_task = S3ExportTaskDefinition(
+            bucket=self.config['s3_bucket'],
+            key=s3_key,
+            input_url=f"file:{file_path}",
+            user_metadata={name: value if isinstance(value, str) else json.dumps(value, default=str)
+                           for name, value in manifest.items()}
+        )
+        
+        # 发送到Stream Manager
+        with self.profiler.span('append_message'):
             sequence_number = self.stream_manager_client.append_message(
                 self.config['stream_name'],
                 Util.validate_and_serialize_to_json_bytes(s3_export_task)
             )
+        
+        self.backpressure.task_submitted()
+        
+        logger.debug("成功提交S3导出任务: s3://%s/%s (序列号 %s, 临时文件 %s)",
+                     self.config['s3_bucket'], s3_key, sequence_number, file_path)
+        
+        return sequence_number
+    
+    def recover_pending_exports(self):
+        """重新提交上次运行中写了意图但未确认提交的批次（不重新读取数据源）
+        必须在读取新数据之前完成，否则较新的游标可能被较旧的批次覆盖；失败时抛出异常，下轮重试
+        binlog模式下未提交批次的事务不在检查点中，服务器会从检查点重发并重新生成对象，因此只放弃不重新提交
+        """
+        for intent in list(self.journal.pending.values()):
+            batch_id = intent['batch_id']
+            if self.config['capture_mode'] == 'binlog':
+                logger.info("放弃未完成的binlog批次，从GTID检查点重新读取: %s", intent['s3_key'])
+                self.journal.abort(batch_id)
+                continue
+            if not os.path.exists(intent['file_path']):
+                # 临时文件已被清理: 游标未推进，这批数据会从已提交的游标重新读取
+                logger.warning("未完成批次的临时文件不存在，放弃该批次: %s", intent['s3_key'])
+                self.journal.abort(batch_id)
+                continue
             
-            logger.info(f"成功提交S3导出任务: {table_name} ({len(records)}条记录) -> s3://{self.config['s3_bucket']}/{s3_key}")
-            logger.info(f"Stream Manager序列号: {sequence_number}")
-            logger.info(f"临时文件保留供Stream Manager处理: {temp_file_path}")
-            
-            return True
-            
-        except Exception as e:
-            logger.error(f"处理并发送数据失败 {table_name}: {e}")
-            return False
+            self.append_export_task(intent['s3_key'], intent['file_path'], intent['manifest'])
+            self.journal.commit(batch_id)
+            for table_name, cursor in intent['state_updates'].get('cursors', {}).items():
+                self.restore_cursor(table_name, cursor)
+            logger.info("已恢复未完成的导出批次: %s", intent['s3_key'])
     
     def monitor_s3_export_status(self):
         """监控S3导出状态"""
@@ -425,13 +999,25 @@ class MySQLToS3Component:
                     time.sleep(5)
                     continue
                 
-                # 读取状态流消息
+                # 刷新数据流占用，用于背压判断
+                stream_info = self.stream_manager_client.describe_message_stream(self.config['stream_name'])
+                self.backpressure.update_stream_bytes(stream_info.storage_status.total_bytes)
+                
+                # 读取状态流消息（从上次读到的位置继续，避免重复计数）
                 messages = self.stream_manager_client.read_messages(
                     self.config['status_stream_name'],
-                    ReadMessagesOptions(min_message_count=1, read_timeout_millis=1000)
+                    ReadMessagesOptions(
+                        desired_start_sequence_number=self.next_status_sequence,
+                        min_message_count=1,
+                        max_message_count=100,
+                        read_timeout_millis=1000
+                    )
                 )
                 
+                # 按批汇总状态，成功/进行中每批只输出一行
+                status_counts = {'Success': 0, 'InProgress': 0}
                 for message in messages:
+                    self.next_status_sequence = message.sequence_number + 1
                     try:
                         status_data = json.loads(message.payload.decode('utf-8'))
                         
@@ -439,59 +1025,347 @@ class MySQLToS3Component:
                         if 'status' in status_data:
                             status = status_data['status']
                             if status == 'Success':
-                                logger.info(f"✅ S3上传成功")
+                                self.backpressure.task_finished()
+                                status_counts['Success'] += 1
                             elif status in ['Failure', 'Canceled']:
-                                logger.error(f"❌ S3上传失败: {status_data.get('message', 'Unknown error')}")
+                                self.backpressure.task_finished()
+                                logger.error("❌ S3上传失败: %s", status_data.get('message', 'Unknown error'))
                             elif status == 'InProgress':
-                                logger.info(f"⏳ S3上传进行中")
+                                status_counts['InProgress'] += 1
                     except Exception as e:
-                        logger.debug(f"解析状态消息失败: {e}")
+                        logger.debug("解析状态消息失败: %s", e)
                 
+                if status_counts['Success'] or status_counts['InProgress']:
+                    logger.info("S3导出状态: ✅ 成功 %d, ⏳ 进行中 %d", status_counts['Success'], status_counts['InProgress'])
+            
             except Exception as e:
-                logger.debug(f"读取状态流时出错: {e}")
+                logger.debug("读取状态流时出错: %s", e)
             
             time.sleep(5)  # 每5秒检查一次状态
     
+    def load_binlog_checkpoint(self):
+        """加载GTID集合: 检查点文件与预写日志中已提交的检查点逐个服务器取较大者
+        （批次提交后、写检查点文件前崩溃时，以预写日志为准，不会重放已导出的事务）
+        """
+        self.binlog_checkpoint_loaded = True
+        checkpoint_file = self.config['binlog_checkpoint_file']
+        gtid_set: Dict[str, int] = {}
+        if os.path.exists(checkpoint_file):
+            with open(checkpoint_file, 'r', encoding='utf-8') as f:
+                gtid_set = {uuid: int(txn) for uuid, txn in json.load(f).get('gtid_set', {}).items()}
+        for uuid, txn in self.journal.state.get('binlog_checkpoint', {}).get('gtid_set', {}).items():
+            gtid_set[uuid] = max(gtid_set.get(uuid, 0), int(txn))
+        
+        if not gtid_set:
+            logger.info("未找到binlog检查点，从当前binlog位置开始读取")
+            return
+        self.binlog_gtid_set = gtid_set
+        logger.info("加载binlog检查点: %s", self.format_gtid_set())
+    
+    def save_binlog_checkpoint(self):
+        """原子写入GTID检查点（先写临时文件并刷盘再替换）"""
+        checkpoint_file = self.config['binlog_checkpoint_file']
+        temp_path = f"{checkpoint_file}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'gtid_set': self.binlog_gtid_set,
+                'updated_at': datetime.utcnow().isoformat() + 'Z'
+            }, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, checkpoint_file)
+    
+    def format_gtid_set(self) -> str:
+        """格式化为MySQL GTID集合字符串，如 uuid:1-123"""
+        return ','.join(f"{uuid}:1-{txn}" for uuid, txn in sorted(self.binlog_gtid_set.items()))
+    
+    def iter_binlog_changes(self):
+        """产生标准化的变更事件:
+        {'kind': 'gtid', 'gtid': 'uuid:N'} / {'kind': 'commit'} / {'kind': 'heartbeat'} /
+        {'kind': 'row', 'op': 'insert|update|delete', 'table': ..., 'timestamp': epoch秒, 'before': {...}, 'after': {...}}
+        配置了binlog_fixture_path时从录制文件(每行一个上述事件)回放，否则连接MySQL读取binlog
+        """
+        fixture_path = self.config['binlog_fixture_path']
+        if fixture_path:
+            with open(fixture_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+            return
+        
+        # 按需导入，仅binlog模式需要安装mysql-replication
+        from pymysqlreplication import BinLogStreamReader
+        from pymysqlreplication.event import GtidEvent, XidEvent, HeartbeatLogEvent
+        from pymysqlreplication.row_event import WriteRowsEvent, UpdateRowsEvent, DeleteRowsEvent
+        
+        gtid_set = self.format_gtid_set()
+        self.binlog_stream = BinLogStreamReader(
+            connection_settings={
+                'host': self.config['mysql_host'],
+                'port': self.config['mysql_port'],
+                'user': self.config['mysql_username'],
+                'passwd': self.config['mysql_password'],
+            },
+            server_id=self.config['binlog_server_id'],
+            only_events=[GtidEvent, XidEvent, HeartbeatLogEvent,
+                         WriteRowsEvent, UpdateRowsEvent, DeleteRowsEvent],
+            only_schemas=[self.config['mysql_database']],
+            only_tables=self.config['monitored_tables'],
+            auto_position=gtid_set or None,
+            resume_stream=True,
+            blocking=True,
+            # 空闲时由服务器发送心跳，保证批次超时能够及时触发
+            slave_heartbeat=self.config['binlog_batch_timeout_ms'] / 1000
+        )
+        logger.info("binlog流已连接，起始GTID集合: %s", gtid_set or '当前位置')
+        
+        try:
+            for event in self.binlog_stream:
+                if isinstance(event, GtidEvent):
+                    yield {'kind': 'gtid', 'gtid': event.gtid}
+                elif isinstance(event, XidEvent):
+                    yield {'kind': 'commit'}
+                elif isinstance(event, HeartbeatLogEvent):
+                    yield {'kind': 'heartbeat'}
+                else:
+                    for row in event.rows:
+                        if isinstance(event, WriteRowsEvent):
+                            op, before, after = 'insert', None, row['values']
+                        elif isinstance(event, UpdateRowsEvent):
+                            op, before, after = 'update', row['before_values'], row['after_values']
+                        else:
+                            op, before, after = 'delete', row['values'], None
+                        yield {
+                            'kind': 'row',
+                            'op': op,
+                            'table': event.table,
+                            'timestamp': event.timestamp,
+                            'before': before,
+                            'after': after,
+                        }
+        finally:
+            self.binlog_stream.close()
+            self.binlog_stream = None
+    
+    def flush_binlog_batch(self, batch: List[Dict[str, Any]], committed_gtid_set: Dict[str, int]) -> int:
+        """将一批binlog事件写入分区并立即提交导出，成功后推进GTID检查点
+        binlog模式的一轮处理不会结束，每个批次作为一轮: 在批次之间按报告间隔输出计时汇总，SIGUSR1采样下一个批次
+        """
+        def flush():
+            with self.profiler.span('binlog_flush'):
+                return self.export_binlog_batch(batch, committed_gtid_set)
+        return self.profiler.run_cycle(flush)
+    
+    def export_binlog_batch(self, batch: List[Dict[str, Any]], committed_gtid_set: Dict[str, int]) -> int:
+        """转换binlog事件并导出"""
+        for change in batch:
+            event_time = datetime.fromtimestamp(change['timestamp'])
+            record = {
+                'op': change['op'],
+                'table': change['table'],
+                'gtid': change.get('gtid'),
+                'event_time': event_time.isoformat(),
+                'before': self.convert_record_values(change['before']) if change['before'] else None,
+                'after': self.convert_record_values(change['after']) if change['after'] else None,
+            }
+            self.rollover_writer.add_record(
+                change['table'],
+                event_time,
+                json.dumps(record, ensure_ascii=False, default=str)
+            )
+        
+        # binlog模式追求低延迟，每批立即滚动；GTID集合随最后一个对象的提交写入预写日志
+        object_count = len(self.rollover_writer.partitions)
+        self.binlog_batch_exports = object_count
+        self.binlog_batch_gtid_set = dict(committed_gtid_set)
+        self.rollover_writer.flush_all()
+        if self.rollover_writer.partitions:
+            # 提交失败的分区保留在缓冲区，检查点不推进，下一批时重试
+            self.binlog_batch_exports = 0
+            logger.error("binlog批次导出未完成，检查点保持不变")
+            return 0
+        
+        if not object_count:
+            # 只有无行事件的事务时没有对象提交，单独记录检查点
+            self.journal.update_state(updates={'binlog_checkpoint': {'gtid_set': self.binlog_batch_gtid_set}})
+            self.journal.compact()
+        self.binlog_gtid_set = dict(committed_gtid_set)
+        self.save_binlog_checkpoint()
+        if batch:
+            logger.debug("binlog批次导出完成: %d个事件，检查点: %s", len(batch), self.binlog_gtid_set)
+        return len(batch)
+    
+    def consume_binlog_changes(self, changes) -> int:
+        """按批次大小或超时(亚秒级)将变更事件分批导出，返回导出的事件数"""
+        batch: List[Dict[str, Any]] = []
+        batch_started = time.monotonic()
+        batch_timeout = self.config['binlog_batch_timeout_ms'] / 1000
+        current_gtid = None
+        # 事务已包含在检查点中（重连或回放时服务器/录制文件重发的事务）则跳过其全部事件
+        skip_transaction = False
+        # 只有已提交事务的GTID才进入检查点，中断时未完成的事务会整体重发
+        committed_gtid_set = dict(self.binlog_gtid_set)
+        total_events = 0
+        
+        for change in changes:
+            if not self.running:
+                break
+            
+            kind = change['kind']
+            if kind == 'gtid':
+                current_gtid = change['gtid']
+                uuid, txn = current_gtid.rsplit(':', 1)
+                skip_transaction = int(txn) <= committed_gtid_set.get(uuid, 0)
+            elif skip_transaction and kind in ('row', 'commit'):
+                pass
+            elif kind == 'commit' and current_gtid:
+                uuid, txn = current_gtid.rsplit(':', 1)
+                committed_gtid_set[uuid] = max(committed_gtid_set.get(uuid, 0), int(txn))
+            elif kind == 'row':
+                if not batch:
+                    batch_started = time.monotonic()
+                batch.append(dict(change, gtid=current_gtid))
+            
+            batch_due = batch and (len(batch) >= self.config['batch_size']
+                                   or time.monotonic() - batch_started >= batch_timeout)
+            # 无行事件的事务也要推进检查点，避免重启后重复扫描
+            idle_checkpoint_due = (not batch and committed_gtid_set != self.binlog_gtid_set
+                                   and time.monotonic() - batch_started >= batch_timeout)
+            if batch_due:
+                # 导出积压（且本地缓冲区已满）时停止读取binlog，服务器端保留未读事件，不会丢失
+                while self.running and not self.export_admitted():
+                    self.backpressure.wait_for_capacity(1)
+            
+            if batch_due or idle_checkpoint_due:
+                total_events += self.flush_binlog_batch(batch, committed_gtid_set)
+                batch = []
+                batch_started = time.monotonic()
+        
+        # 流结束（断开或录制文件读完）时未提交事务的行不导出，重连后服务器会整体重发
+        if current_gtid and not skip_transaction:
+            uuid, txn = current_gtid.rsplit(':', 1)
+            if int(txn) > committed_gtid_set.get(uuid, 0):
+                batch = [change for change in batch if change['gtid'] != current_gtid]
+        
+        if batch or committed_gtid_set != self.binlog_gtid_set:
+            total_events += self.flush_binlog_batch(batch, committed_gtid_set)
+        
+        return total_events
+    
+    def run_binlog_stream(self) -> int:
+        """读取binlog直到组件停止或连接断开（回放模式下读完录制文件即返回）"""
+        if self.journal.pending:
+            self.recover_pending_exports()
+        if not self.binlog_checkpoint_loaded:
+            self.load_binlog_checkpoint()
+        return self.consume_binlog_changes(self.iter_binlog_changes())
+    
+    def binlog_loop(self):
+        """binlog流式读取循环，连接断开后从GTID检查点恢复"""
+        while self.running:
+            try:
+                exported = self.run_binlog_stream()
+                if self.config['binlog_fixture_path']:
+                    logger.info("binlog录制文件回放完成，共导出 %s 个事件", exported)
+                    break
+            except Exception as e:
+                logger.error("binlog流读取出错: %s", e)
+            
+            if self.running:
+                logger.info("等待 %s 秒后重连binlog流...", self.config['retry_delay'])
+                time.sleep(self.config['retry_delay'])
+    
+    def start_binlog_thread(self):
+        """在独立线程中读取binlog流（读取不会结束，宿主模式下不占用共享线程池），stop()时等待其结束"""
+        if self.polling_thread and self.polling_thread.is_alive():
+            return
+        self.polling_thread = threading.Thread(target=self.binlog_loop, daemon=True,
+                                               name=f"binlog-{self.source_id}")
+        self.polling_thread.start()
+        logger.info("binlog读取线程已启动")
+    
+    def poll_once(self) -> int:
+        """执行一轮轮询，返回成功处理的记录数"""
+        return self.profiler.run_cycle(self.run_poll_cycle)
+    
+    def run_poll_cycle(self) -> int:
+        """轮询所有监控的表（binlog模式下持续读取binlog流）"""
+        if self.journal.pending:
+            self.recover_pending_exports()
+        
+        # binlog模式为长连接流，持续运行直到停止或断开
+        if self.config['capture_mode'] == 'binlog':
+            return self.run_binlog_stream()
+        
+        logger.debug("开始MySQL数据轮询...")
+        
+        # 连接参数在运行时被修改: 在轮询之前重建连接
+        if self.reconnect_requested:
+            self.reconnect_requested = False
+            logger.info("连接配置已变化，重新连接MySQL")
+            if self.mysql_connection and self.mysql_connection.is_connected():
+                self.mysql_connection.close()
+        
+        # 检查MySQL连接
+        if not self.mysql_connection or not self.mysql_connection.is_connected():
+            logger.warning("MySQL连接断开，尝试重连...")
+            if not self.setup_mysql_connection():
+                raise Exception("MySQL重连失败")
+        
+        # 运行时新增的表（或重新初始化的表）从当前位置开始同步
+        if any(table not in self.last_sync_timestamps for table in self.config['monitored_tables']):
+            self.initialize_sync_timestamps()
+        
+        # 轮询每个监控的表
+        cycle_started = time.monotonic()
+        total_records = 0
+        for table_name in self.config['monitored_tables']:
+            if not self.running:
+                break
+            
+            # 导出积压且本地缓冲区已满时暂停轮询（时间戳不推进，恢复后从原位置继续）
+            if not self.export_admitted():
+                logger.warning("导出积压，暂停轮询剩余表，从 %s 开始下轮继续", table_name)
+                break
+            
+            records = self.poll_table_data(table_name)
+            if records:
+                success = self.process_and_send_data(table_name, records)
+                if success:
+                    total_records += len(records)
+                    logger.debug("表 %s 处理成功: %d 条记录", table_name, len(records))
+                else:
+                    logger.error("表 %s 处理失败", table_name)
+        
+        # 滚动超过最大时长的分区（积压且无法缓冲时推迟）
+        if self.export_admitted():
+            self.rollover_writer.flush_expired()
+        
+        if total_records > 0:
+            fields = {
+                'source_id': self.source_id,
+                'records': total_records,
+                'elapsed_s': round(time.monotonic() - cycle_started, 2),
+            }
+            logger.info("本轮轮询完成，共处理 %d 条记录，耗时 %.2f秒", total_records, fields['elapsed_s'],
+                        extra={'fields': fields})
+        else:
+            logger.debug("本轮轮询无新数据")
+        
+        return total_records
+    
     def polling_loop(self):
         """轮询循环"""
         while self.running:
             try:
-                logger.info("开始MySQL数据轮询...")
-                
-                # 检查MySQL连接
-                if not self.mysql_connection or not self.mysql_connection.is_connected():
-                    logger.warning("MySQL连接断开，尝试重连...")
-                    if not self.setup_mysql_connection():
-                        logger.error("MySQL重连失败，等待下次轮询")
-                        time.sleep(self.config['polling_interval'])
-                        continue
-                
-                # 轮询每个监控的表
-                total_records = 0
-                for table_name in self.config['monitored_tables']:
-                    if not self.running:
-                        break
-                    
-                    records = self.poll_table_data(table_name)
-                    if records:
-                        success = self.process_and_send_data(table_name, records)
-                        if success:
-                            total_records += len(records)
-                            logger.info(f"表 {table_name} 处理成功: {len(records)} 条记录")
-                        else:
-                            logger.error(f"表 {table_name} 处理失败")
-                
-                if total_records > 0:
-                    logger.info(f"本轮轮询完成，共处理 {total_records} 条记录")
-                else:
-                    logger.debug("本轮轮询无新数据")
-                
+                self.poll_once()
             except Exception as e:
-                logger.error(f"轮询循环出错: {e}")
+                logger.error("轮询循环出错: %s", e)
             
             # 等待下次轮询
-            logger.info(f"等待 {self.config['polling_interval']} 秒后进行下次轮询...")
-            time.sleep(self.config['polling_interval'])
+            logger.debug("等待 %s 秒后进行下次轮询...", self.config['polling_interval'])
+            self.wake_event.wait(self.config['polling_interval'])
+            self.wake_event.clear()
     
     def start(self):
         """启动组件"""
@@ -501,23 +1375,38 @@ class MySQLToS3Component:
         if not self.setup_stream_manager():
             raise Exception("Stream Manager设置失败")
         
-        # 设置MySQL连接
-        if not self.setup_mysql_connection():
+        binlog_mode = self.config['capture_mode'] == 'binlog'
+        
+        # 设置MySQL连接（binlog模式由复制流自行连接）
+        if not binlog_mode and not self.setup_mysql_connection():
             raise Exception("MySQL连接设置失败")
         
+        # 按需采样: kill -USR1 <pid> 对下一轮处理做cProfile（信号处理只能在主线程注册）
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGUSR1, lambda signum, frame: self.profiler.request_profile())
+        
         # 启动运行标志
         self.running = True
         
-        # 启动轮询线程
-        self.polling_thread = threading.Thread(target=self.polling_loop, daemon=True)
-        self.polling_thread.start()
-        logger.info("轮询线程已启动")
+        # 启动轮询/binlog读取线程
+        if binlog_mode:
+            self.start_binlog_thread()
+        else:
+            self.polling_thread = threading.Thread(target=self.polling_loop, daemon=True)
+            self.polling_thread.start()
+            logger.info("轮询线程已启动")
         
         # 启动状态监控线程
         self.status_monitor_thread = threading.Thread(target=self.monitor_s3_export_status, daemon=True)
         self.status_monitor_thread.start()
         logger.info("状态监控线程已启动")
         
+        self.start_store_buffer_drain()
+        
+        # 监视组件配置变化，运行中生效
+        if self.config_source:
+            self.config_source.watch(self.apply_runtime_config)
+        
         logger.info("MySQL到S3轮询组件启动完成")
     
     def stop(self):
@@ -525,6 +1414,9 @@ class MySQLToS3Component:
         logger.info("停止MySQL到S3轮询组件...")
         
         self.running = False
+        self.wake_event.set()
+        if self.config_source:
+            self.config_source.close()
         
         # 等待线程结束
         if self.polling_thread and self.polling_thread.is_alive():
@@ -533,11 +1425,25 @@ class MySQLToS3Component:
         if self.status_monitor_thread and self.status_monitor_thread.is_alive():
             self.status_monitor_thread.join(timeout=10)
         
+        if self.store_buffer_thread and self.store_buffer_thread.is_alive():
+            self.store_buffer_thread.join(timeout=10)
+        
+        # 提交尚未滚动的分区缓冲区
+        if self.stream_manager_client:
+            self.rollover_writer.flush_all()
+        
         # 关闭连接
+        if self.binlog_stream:
+            self.binlog_stream.close()
+        
         if self.mysql_connection and self.mysql_connection.is_connected():
             self.mysql_connection.close()
         
-        if self.stream_manager_client:
+        self.journal.close()
+        if self.store_buffer:
+            self.store_buffer.close()
+        
+        if self.stream_manager_client and not self.shared_stream_manager:
             self.stream_manager_client.close()
         
         logger.info("MySQL到S3轮询组件已停止")
@@ -550,11 +1456,11 @@ class MySQLToS3Component:
             # 保持运行
             while self.running:
                 time.sleep(1)
-                
+        
         except KeyboardInterrupt:
             logger.info("收到中断信号，正在停止...")
         except Exception as e:
-            logger.error(f"组件运行出错: {e}")
+            logger.error("组件运行出错: %s", e)
             raise
         finally:
             self.stop()
@@ -568,7 +1474,7 @@ def main():
     try:
         component.run()
     except Exception as e:
-        logger.error(f"组件启动失败: {e}")
+        logger.error("组件启动失败: %s", e)
         raise
 
 if __name__ == "__main__":
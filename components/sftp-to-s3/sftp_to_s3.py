@@ -4,13 +4,24 @@ SFTP到S3数据同步组件
 连接本地SFTP服务器，读取CDC文件，通过Stream Manager上传到S3
 """
 
+import fnmatch
 import json
 import logging
+import math
+import mmap
 import os
+import posixpath
+import queue
+import signal
+import stat
+import struct
+import sys
 import time
 import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, List, Optional, Set
+from typing import Any, Dict, List, Optional, Tuple
 import tempfile
 import hashlib
 
@@ -29,26 +40,198 @@ from stream_manager.data import (
 from stream_manager.exceptions import ResourceNotFoundException
 from stream_manager.util import Util
 
-# 配置日志
-logging.basicConfig(
-    level=logging.DEBUG,  # 改为DEBUG级别
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+# 共享模块: 部署后与组件文件位于同一工件目录，源码树中位于 components/common
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'common'))
+from pipeline_common import (
+    ExportBackpressure,
+    ExportJournal,
+    RuntimeConfigSource,
+    StageProfiler,
+    StoreAndForwardBuffer,
+    coerce_config_value,
+    configure_logging,
+    source_scoped_path,
 )
+
+# 配置日志
+log_listener = configure_logging()
 logger = logging.getLogger(__name__)
 
+class HashingFileWriter:
+    """下载时边写本地文件边计算SHA-256，避免下载后再整文件读取一次"""
+    
+    def __init__(self, file_obj):
+        self.file_obj = file_obj
+        self.hasher = hashlib.sha256()
+        self.size = 0
+    
+    def write(self, data: bytes) -> int:
+        self.hasher.update(data)
+        self.size += len(data)
+        return self.file_obj.write(data)
+    
+    def hexdigest(self) -> str:
+        return self.hasher.hexdigest()
+
+
+class BloomFilter:
+    """基于mmap的磁盘Bloom过滤器，按容量和误判率确定位数组大小和哈希次数"""
+    
+    HEADER_FORMAT = '<QQQ'  # 位数, 哈希次数, 已插入数量
+    HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+    
+    def __init__(self, path: str, capacity: int, fp_rate: float):
+        self.path = path
+        self.capacity = capacity
+        self.num_bits = max(8, int(-capacity * math.log(fp_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        file_size = self.HEADER_SIZE + (self.num_bits + 7) // 8
+        
+        # 参数变化时旧文件不可复用，重新创建
+        if not os.path.exists(path) or os.path.getsize(path) != file_size:
+            with open(path, 'wb') as f:
+                f.truncate(file_size)
+        
+        self.file = open(path, 'r+b')
+        self.mm = mmap.mmap(self.file.fileno(), file_size)
+        num_bits, num_hashes, self.count = struct.unpack_from(self.HEADER_FORMAT, self.mm, 0)
+        if (num_bits, num_hashes) != (self.num_bits, self.num_hashes):
+            self.clear()
+    
+    def _positions(self, hex_digest: str):
+        # 双重哈希: 内容哈希本身已均匀分布，直接切分为两个64位整数
+        h1 = int(hex_digest[:16], 16)
+        h2 = int(hex_digest[16:32], 16) | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+    
+    def __contains__(self, hex_digest: str) -> bool:
+        offset = self.HEADER_SIZE
+        return all(self.mm[offset + pos // 8] & (1 << (pos % 8)) for pos in self._positions(hex_digest))
+    
+    def add(self, hex_digest: str):
+        if self.count >= self.capacity:
+            # 超出容量后误判率会快速上升，清空后重新开始（最近的哈希仍由LRU覆盖）
+            logger.warning("Bloom过滤器已达到容量 %s，清空重建", self.capacity)
+            self.clear()
+        
+        offset = self.HEADER_SIZE
+        for pos in self._positions(hex_digest):
+            self.mm[offset + pos // 8] |= 1 << (pos % 8)
+        self.count += 1
+        struct.pack_into(self.HEADER_FORMAT, self.mm, 0, self.num_bits, self.num_hashes, self.count)
+    
+    def clear(self):
+        self.mm[self.HEADER_SIZE:] = bytes(len(self.mm) - self.HEADER_SIZE)
+        self.count = 0
+        struct.pack_into(self.HEADER_FORMAT, self.mm, 0, self.num_bits, self.num_hashes, self.count)
+    
+    def flush(self):
+        self.mm.flush()
+    
+    def close(self):
+        self.mm.flush()
+        self.mm.close()
+        self.file.close()
+
+
+class ContentHashDedupCache:
+    """内容哈希去重缓存: 最近哈希的LRU（精确）+ 可选的磁盘Bloom过滤器（有误判率，内存占用固定）"""
+    
+    def __init__(self, lru_size: int, bloom_path: Optional[str] = None,
+                 bloom_capacity: int = 1000000, bloom_fp_rate: float = 0.001):
+        self.lru_size = lru_size
+        self.recent_hashes: "OrderedDict[str, None]" = OrderedDict()
+        self.bloom = BloomFilter(bloom_path, bloom_capacity, bloom_fp_rate) if bloom_path else None
+    
+    def seen(self, hex_digest: str) -> bool:
+        """判断内容是否已上传过"""
+        if hex_digest in self.recent_hashes:
+            self.recent_hashes.move_to_end(hex_digest)
+            return True
+        return self.bloom is not None and hex_digest in self.bloom
+    
+    def confirmed(self, hex_digest: str) -> bool:
+        """内容是否确定已上传成功（只查精确的LRU，Bloom过滤器可能误判）"""
+        return hex_digest in self.recent_hashes
+    
+    def add(self, hex_digest: str):
+        """记录S3已确认上传成功的内容哈希"""
+        self.recent_hashes[hex_digest] = None
+        self.recent_hashes.move_to_end(hex_digest)
+        while len(self.recent_hashes) > self.lru_size:
+            self.recent_hashes.popitem(last=False)
+        if self.bloom is not None:
+            self.bloom.add(hex_digest)
+    
+    def flush(self):
+        if self.bloom is not None:
+            self.bloom.flush()
+    
+    def close(self):
+        if self.bloom is not None:
+            self.bloom.close()
+
+
 class SFTPToS3Component:
     """SFTP到S3数据同步组件"""
     
-    def __init__(self):
+    # 运行时修改后需要重建SFTP连接的配置
+    CONNECTION_CONFIG_KEYS = ('sftp_host', 'sftp_port', 'sftp_username', 'sftp_password',
+                              'ssh_window_size', 'ssh_max_packet_size', 'ssh_compress', 'ssh_ciphers',
+                              'ssh_keepalive_interval')
+    # 只在启动时生效的配置（数据流、临时文件和日志位置）
+    RESTART_CONFIG_KEYS = ('stream_name', 'status_stream_name', 'stream_max_size', 'stream_segment_size',
+                           'strategy_on_full', 'spool_dir', 'export_journal_path', 'dedup_bloom_path',
+                           'dedup_bloom_capacity', 'dedup_bloom_fp_rate', 'dedup_lru_size',
+                           'store_buffer_enabled', 'store_buffer_dir', 'store_buffer_budget',
+                           'store_buffer_segment_size', 'store_buffer_eviction', 'store_buffer_compress_level')
+    # 每个源独占的本地文件
+    SOURCE_PATH_CONFIG_KEYS = ('export_journal_path', 'dedup_bloom_path', 'store_buffer_dir')
+    # 每个配置项的类型，运行时配置按此转换（默认值为None的可选项也能转换）
+    CONFIG_TYPES = {
+        'sftp_host': str, 'sftp_port': int, 'sftp_username': str, 'sftp_password': str, 'sftp_remote_path': str,
+        'ssh_window_size': int, 'ssh_max_packet_size': int, 'ssh_compress': bool, 'ssh_ciphers': list,
+        'ssh_keepalive_interval': int, 'sftp_prefetch_requests': int,
+        's3_bucket': str, 's3_key_prefix': str, 'stream_name': str, 'status_stream_name': str,
+        'scan_interval': int, 'max_retries': int, 'retry_delay': int, 'file_interval': int,
+        'post_export_action': str, 'processed_dir': str,
+        'scan_max_depth': int, 'scan_include_patterns': list, 'scan_exclude_patterns': list,
+        'scan_channels': int, 'scan_full_relist_every': int,
+        'processed_files_max': int, 'dedup_lru_size': int, 'dedup_bloom_path': str,
+        'dedup_bloom_capacity': int, 'dedup_bloom_fp_rate': float,
+        'stream_max_size': int, 'stream_segment_size': int, 'strategy_on_full': str,
+        'backpressure_high_water_tasks': int, 'backpressure_low_water_tasks': int,
+        'backpressure_high_water_ratio': float, 'backpressure_low_water_ratio': float,
+        'profiling_enabled': bool, 'profiling_report_interval': int, 'profile_dir': str,
+        'export_journal_path': str, 'export_journal_fsync': bool, 'export_journal_compact_every': int,
+        'store_buffer_enabled': bool, 'store_buffer_dir': str, 'store_buffer_budget': int,
+        'store_buffer_segment_size': int, 'store_buffer_eviction': str, 'store_buffer_compress_level': int,
+        'store_buffer_high_water_ratio': float, 'store_buffer_report_interval': int,
+        'spool_dir': str,
+    }
+    
+    def __init__(self, source_id: str = 'default',
+                 config_overrides: Optional[Dict[str, Any]] = None,
+                 stream_manager_client: Optional[StreamManagerClient] = None):
         # 配置参数
         self.config = {
             # SFTP配置
-            'sftp_host': 'localhost',
-            'sftp_port': 22,
+            'sftp_host': os.getenv('SFTP_HOST', 'localhost'),
+            'sftp_port': int(os.getenv('SFTP_PORT', 22)),
             'sftp_username': os.getenv('SFTP_USERNAME'),
             'sftp_password': os.getenv('SFTP_PASSWORD'),
             'sftp_remote_path': os.getenv('SFTP_REMOTE_PATH', '/data'),
             
+            # SSH传输调优（高延迟链路）: None表示使用paramiko默认值
+            # 窗口大小应不小于 带宽 x 往返时延，例如 300ms x 10MB/s ≈ 3MB
+            'ssh_window_size': int(os.getenv('SSH_WINDOW_SIZE')) if os.getenv('SSH_WINDOW_SIZE') else None,
+            'ssh_max_packet_size': int(os.getenv('SSH_MAX_PACKET_SIZE')) if os.getenv('SSH_MAX_PACKET_SIZE') else None,
+            'ssh_compress': os.getenv('SSH_COMPRESS', 'false').lower() == 'true',
+            'ssh_ciphers': [c for c in os.getenv('SSH_CIPHERS', '').split(',') if c],  # 只允许这些加密算法
+            'ssh_keepalive_interval': int(os.getenv('SSH_KEEPALIVE_INTERVAL', 0)),  # 秒，0表示不发送keepalive（paramiko默认）
+            'sftp_prefetch_requests': int(os.getenv('SFTP_PREFETCH_REQUESTS')) if os.getenv('SFTP_PREFETCH_REQUESTS') else None,  # getfo并发预读请求数
+            
             # S3配置
             's3_bucket': 'zihangh-gg-streammanager-poc',
             's3_key_prefix': 'gg_mysql/sftp-sync/',
@@ -61,20 +244,221 @@ class SFTPToS3Component:
             'scan_interval': 30,  # 30秒扫描间隔
             'max_retries': 5,
             'retry_delay': 10,
+            'file_interval': 1,  # 单个文件处理后的间隔(秒)
+            
+            # 远程文件后续动作: 状态流确认S3上传成功后执行，保持热目录只包含新文件
+            #   none: 保留原位; move: 移动到<processed_dir>/YYYY/MM/DD; delete: 删除
+            'post_export_action': os.getenv('SFTP_POST_EXPORT_ACTION', 'none'),
+            'processed_dir': os.getenv('SFTP_PROCESSED_DIR', 'processed'),  # 相对于sftp_remote_path
+            
+            # 目录遍历配置: 最大深度0表示只扫描顶层；匹配规则作用于相对sftp_remote_path的路径
+            'scan_max_depth': int(os.getenv('SFTP_SCAN_MAX_DEPTH', 0)),
+            'scan_include_patterns': os.getenv('SFTP_INCLUDE_PATTERNS', '*.json,*.txt,*.csv,*.log').split(','),
+            'scan_exclude_patterns': [p for p in os.getenv('SFTP_EXCLUDE_PATTERNS', '').split(',') if p],
+            'scan_channels': int(os.getenv('SFTP_SCAN_CHANNELS', 4)),  # 并行列目录的SFTP通道数
+            'scan_full_relist_every': int(os.getenv('SFTP_SCAN_FULL_RELIST_EVERY', 10)),  # 每N轮忽略目录缓存完整列出一次
+            
+            # 去重配置: 文件名+(大小, 修改时间)判断是否变化，内容哈希判断是否重复
+            'processed_files_max': int(os.getenv('PROCESSED_FILES_MAX', 100000)),
+            'dedup_lru_size': int(os.getenv('DEDUP_LRU_SIZE', 10000)),
+            'dedup_bloom_path': os.getenv('DEDUP_BLOOM_PATH'),  # None表示不启用磁盘Bloom过滤器
+            'dedup_bloom_capacity': int(os.getenv('DEDUP_BLOOM_CAPACITY', 1000000)),
+            'dedup_bloom_fp_rate': float(os.getenv('DEDUP_BLOOM_FP_RATE', 0.001)),  # 误判会导致新内容被跳过
+            
+            # 数据流容量与背压配置（RejectNewData: 流满时拒绝写入而不是覆盖最旧数据）
+            'stream_max_size': int(os.getenv('STREAM_MAX_SIZE', 256 * 1024 * 1024)),
+            'stream_segment_size': int(os.getenv('STREAM_SEGMENT_SIZE', 16 * 1024 * 1024)),
+            'strategy_on_full': os.getenv('STREAM_STRATEGY_ON_FULL', 'RejectNewData'),
+            'backpressure_high_water_tasks': int(os.getenv('BACKPRESSURE_HIGH_WATER_TASKS', 50)),
+            'backpressure_low_water_tasks': int(os.getenv('BACKPRESSURE_LOW_WATER_TASKS', 20)),
+            'backpressure_high_water_ratio': float(os.getenv('BACKPRESSURE_HIGH_WATER_RATIO', 0.8)),
+            'backpressure_low_water_ratio': float(os.getenv('BACKPRESSURE_LOW_WATER_RATIO', 0.5)),
+            
+            # 性能剖析配置（默认关闭；kill -USR1 <pid> 对下一轮处理做cProfile采样）
+            'profiling_enabled': os.getenv('PROFILING_ENABLED', 'false').lower() == 'true',
+            'profiling_report_interval': int(os.getenv('PROFILING_REPORT_INTERVAL', 300)),
+            'profile_dir': os.getenv('PROFILE_DIR', tempfile.gettempdir()),
+            
+            # 导出预写日志: 记录每个文件导出的意图/提交和已导出文件的签名，重启后据此恢复
+            'export_journal_path': os.getenv('EXPORT_JOURNAL_PATH'),  # None表示按源ID生成默认路径
+            'export_journal_fsync': os.getenv('EXPORT_JOURNAL_FSYNC', 'true').lower() == 'true',
+            'export_journal_compact_every': int(os.getenv('EXPORT_JOURNAL_COMPACT_EVERY', 1000)),
+            
+            # 本地存储转发缓冲区（默认关闭）: 上行中断导致导出积压时，下载的文件压缩写入本地段文件而不是暂停扫描，
+            # 恢复后按写入顺序排空；超过磁盘预算时按 oldest/priority 策略淘汰整段
+            'store_buffer_enabled': os.getenv('STORE_BUFFER_ENABLED', 'false').lower() == 'true',
+            'store_buffer_dir': os.getenv('STORE_BUFFER_DIR'),  # None表示按源ID生成默认路径
+            'store_buffer_budget': int(os.getenv('STORE_BUFFER_BUDGET', 1024 * 1024 * 1024)),
+            'store_buffer_segment_size': int(os.getenv('STORE_BUFFER_SEGMENT_SIZE', 64 * 1024 * 1024)),
+            'store_buffer_eviction': os.getenv('STORE_BUFFER_EVICTION', 'oldest'),
+            'store_buffer_compress_level': int(os.getenv('STORE_BUFFER_COMPRESS_LEVEL', 3)),
+            # 缓冲区占用超过预算的该比例后才暂停扫描，剩余空间留给正在处理的文件
+            'store_buffer_high_water_ratio': float(os.getenv('STORE_BUFFER_HIGH_WATER_RATIO', 0.9)),
+            'store_buffer_report_interval': int(os.getenv('STORE_BUFFER_REPORT_INTERVAL', 60)),
+            
+            # 临时文件目录（None表示系统默认临时目录）
+            'spool_dir': None,
         }
         
+        # 多源宿主模式下由宿主进程覆盖单个源的配置（下发的值同样可能是浮点数或字符串，按声明的类型转换）
+        if config_overrides:
+            self.apply_runtime_config(config_overrides, initial=True)
+        self.source_id = source_id
+        # 宿主模式下所有源共享进程环境变量: 来自环境变量的文件路径按源ID区分，源自己配置的路径保持不变
+        if stream_manager_client is not None:
+            for key in self.SOURCE_PATH_CONFIG_KEYS:
+                if self.config[key] and key not in (config_overrides or {}):
+                    self.config[key] = source_scoped_path(self.config[key], source_id)
+        
+        # 独立运行时从组件配置（或COMPONENT_CONFIG_FILE）加载并监视变化；宿主模式下由宿主下发
+        self.config_source: Optional[RuntimeConfigSource] = None
+        if stream_manager_client is None:
+            self.config_source = RuntimeConfigSource(os.getenv('COMPONENT_CONFIG_FILE'), [])
+            self.apply_runtime_config(self.config_source.load(), initial=True)
+        # 配置变化后需要在扫描线程中重建连接
+        self.reconnect_requested = False
+        # 扫描间隔变化时提前唤醒等待中的扫描循环
+        self.wake_event = threading.Event()
+        
         # 运行状态
         self.running = False
-        self.processed_files: Set[str] = set()
+        # 已处理文件: 文件名 -> (大小, 修改时间)，按LRU淘汰以限制内存
+        self.processed_files: "OrderedDict[str, Tuple[int, int]]" = OrderedDict()
+        # 本轮扫描得到的远程文件签名
+        self.remote_signatures: Dict[str, Tuple[int, int]] = {}
+        # 等待状态流确认的导出: S3键 -> 清单（同时写入预写日志，确认成功后才记录内容哈希）
+        self.pending_exports: Dict[str, Dict[str, Any]] = {}
+        # 已确认上传成功、等待在下一轮扫描中批量执行后续动作的文件
+        self.confirmed_files: List[str] = []
+        self.lifecycle_lock = threading.Lock()
+        # 已创建的归档目录，每天只需创建一次
+        self.archive_dirs: set = set()
+        # 子目录列表缓存: 相对路径 -> (目录修改时间, [(名称, 是否目录, 大小, 修改时间)])
+        self.dir_cache: Dict[str, Tuple[int, List[Tuple[str, bool, int, int]]]] = {}
+        self.scan_count = 0
+        # 并行遍历使用的额外SFTP通道（与主会话共用同一SSH连接）
+        self.scan_channels: List[paramiko.SFTPClient] = []
+        self.dedup_cache = ContentHashDedupCache(
+            lru_size=self.config['dedup_lru_size'],
+            bloom_path=self.config['dedup_bloom_path'],
+            bloom_capacity=self.config['dedup_bloom_capacity'],
+            bloom_fp_rate=self.config['dedup_bloom_fp_rate']
+        )
         self.sftp_client: Optional[paramiko.SFTPClient] = None
         self.ssh_client: Optional[paramiko.SSHClient] = None
-        self.stream_manager_client: Optional[StreamManagerClient] = None
+        self.stream_manager_client: Optional[StreamManagerClient] = stream_manager_client
+        # 共享客户端由宿主进程负责创建流和关闭连接
+        self.shared_stream_manager = stream_manager_client is not None
+        
+        # 导出准入控制（多源宿主模式下所有源共享同一个实例）
+        self.backpressure = ExportBackpressure(
+            high_water_tasks=self.config['backpressure_high_water_tasks'],
+            low_water_tasks=self.config['backpressure_low_water_tasks'],
+            high_water_bytes=int(self.config['stream_max_size'] * self.config['backpressure_high_water_ratio']),
+            low_water_bytes=int(self.config['stream_max_size'] * self.config['backpressure_low_water_ratio'])
+        )
+        self.next_status_sequence = 0
+        
+        if not self.config['export_journal_path']:
+            self.config['export_journal_path'] = os.path.join(
+                self.config['spool_dir'] or tempfile.gettempdir(),
+                f"sftp_to_s3_journal_{self.source_id}.jsonl"
+            )
+        self.journal = ExportJournal(
+            self.config['export_journal_path'],
+            fsync=self.config['export_journal_fsync'],
+            compact_every=self.config['export_journal_compact_every']
+        )
+        # 已提交导出的文件重启后不再重新下载
+        for filename, signature in self.journal.state.get('processed_files', {}).items():
+            self.processed_files[filename] = tuple(signature)
+        # 上次运行中已提交、还没确认上传结果的导出: 数据流和状态流在启动时重建，旧状态不会再到达，
+        # 需要用保留的临时文件重新提交（相同的S3键），确认成功后才移动/删除远程文件
+        self.unconfirmed_exports: Dict[str, Dict[str, Any]] = dict(self.journal.state.get('unconfirmed_exports', {}))
+        
+        # 本地存储转发缓冲区: 写入缓冲区即视为文件已导出（远程文件的后续动作仍等上传成功后执行）
+        self.store_buffer: Optional[StoreAndForwardBuffer] = None
+        if self.config['store_buffer_enabled']:
+            if not self.config['store_buffer_dir']:
+                self.config['store_buffer_dir'] = os.path.join(
+                    self.config['spool_dir'] or tempfile.gettempdir(),
+                    f"sftp_to_s3_buffer_{self.source_id}"
+                )
+            self.store_buffer = StoreAndForwardBuffer(
+                self.config['store_buffer_dir'],
+                budget_bytes=self.config['store_buffer_budget'],
+                segment_bytes=self.config['store_buffer_segment_size'],
+                eviction=self.config['store_buffer_eviction'],
+                compress_level=self.config['store_buffer_compress_level'],
+                fsync=self.config['export_journal_fsync']
+            )
+        
+        # 分阶段计时
+        self.profiler = StageProfiler(
+            name=f"sftp_{self.source_id}",
+            enabled=self.config['profiling_enabled'],
+            report_interval=self.config['profiling_report_interval'],
+            profile_dir=self.config['profile_dir']
+        )
         
         # 线程
         self.scan_thread: Optional[threading.Thread] = None
         self.status_monitor_thread: Optional[threading.Thread] = None
+        self.store_buffer_thread: Optional[threading.Thread] = None
+        
+        logger.info("SFTP到S3组件初始化完成: %s", self.source_id)
+    
+    def apply_runtime_config(self, new_config: Dict[str, Any], initial: bool = False) -> Dict[str, Any]:
+        """应用运行时配置，返回实际变化的配置项
+        扫描间隔、批次、并发和匹配规则等在下一轮扫描生效，不中断正在处理的文件；
+        连接参数变化时在下一轮扫描开始前重连；数据流等配置需要重启组件
+        """
+        changed = {}
+        for key, value in new_config.items():
+            if key not in self.config:
+                logger.debug("忽略未知配置项: %s", key)
+                continue
+            try:
+                value = coerce_config_value(self.CONFIG_TYPES[key], value)
+            except (TypeError, ValueError, json.JSONDecodeError) as e:
+                logger.error("配置项 %s 的值无效: %s", key, e)
+                continue
+            if value != self.config[key]:
+                changed[key] = value
+        
+        if not initial:
+            for key in [key for key in changed if key in self.RESTART_CONFIG_KEYS]:
+                logger.warning("配置项 %s 需要重启组件才能生效，已忽略", key)
+                del changed[key]
+        if not changed:
+            return changed
+        
+        self.config.update(changed)
+        if initial:
+            return changed
         
-        logger.info("SFTP到S3组件初始化完成")
+        if any(key.startswith('backpressure_') for key in changed):
+            self.backpressure.update_thresholds(
+                high_water_tasks=self.config['backpressure_high_water_tasks'],
+                low_water_tasks=self.config['backpressure_low_water_tasks'],
+                high_water_bytes=int(self.config['stream_max_size'] * self.config['backpressure_high_water_ratio']),
+                low_water_bytes=int(self.config['stream_max_size'] * self.config['backpressure_low_water_ratio'])
+            )
+        self.profiler.enabled = self.config['profiling_enabled']
+        self.profiler.report_interval = self.config['profiling_report_interval']
+        self.journal.fsync = self.config['export_journal_fsync']
+        self.journal.compact_every = self.config['export_journal_compact_every']
+        if any(key.startswith('scan_') or key in ('sftp_remote_path', 'processed_dir') for key in changed):
+            # 目录列表缓存与遍历规则绑定
+            self.dir_cache = {}
+        if any(key in self.CONNECTION_CONFIG_KEYS or key == 'sftp_remote_path' for key in changed):
+            self.reconnect_requested = True
+        if 'scan_interval' in changed:
+            self.wake_event.set()
+        
+        # 不在日志中输出配置值（可能包含密码）
+        logger.info("运行时配置已更新: %s", ', '.join(sorted(changed)))
+        return changed
     
     def setup_stream_manager(self) -> bool:
         """设置Stream Manager - 严格按照GitHub示例"""
@@ -83,7 +467,7 @@ class SFTPToS3Component:
         
         for attempt in range(max_retries):
             try:
-                logger.info(f"尝试连接Stream Manager (第{attempt + 1}次/共{max_retries}次)")
+                logger.info("尝试连接Stream Manager (第%s次/共%s次)", attempt + 1, max_retries)
                 
                 # 创建Stream Manager客户端
                 self.stream_manager_client = StreamManagerClient()
@@ -92,13 +476,13 @@ class SFTPToS3Component:
                 # 删除已存在的流（重新开始）- 严格按照GitHub示例
                 try:
                     self.stream_manager_client.delete_message_stream(self.config['status_stream_name'])
-                    logger.info(f"删除已存在的状态流: {self.config['status_stream_name']}")
+                    logger.info("删除已存在的状态流: %s", self.config['status_stream_name'])
                 except ResourceNotFoundException:
                     pass
                 
                 try:
                     self.stream_manager_client.delete_message_stream(self.config['stream_name'])
-                    logger.info(f"删除已存在的数据流: {self.config['stream_name']}")
+                    logger.info("删除已存在的数据流: %s", self.config['stream_name'])
                 except ResourceNotFoundException:
                     pass
                 
@@ -122,24 +506,26 @@ class SFTPToS3Component:
                         strategy_on_full=StrategyOnFull.OverwriteOldestData
                     )
                 )
-                logger.info(f"成功创建状态流: {self.config['status_stream_name']}")
+                logger.info("成功创建状态流: %s", self.config['status_stream_name'])
                 
                 # 创建带S3导出的消息流 - 严格按照GitHub示例
                 self.stream_manager_client.create_message_stream(
                     MessageStreamDefinition(
                         name=self.config['stream_name'],
-                        strategy_on_full=StrategyOnFull.OverwriteOldestData,
+                        max_size=self.config['stream_max_size'],
+                        stream_segment_size=self.config['stream_segment_size'],
+                        strategy_on_full=getattr(StrategyOnFull, self.config['strategy_on_full']),
                         export_definition=exports
                     )
                 )
-                logger.info(f"成功创建S3导出数据流: {self.config['stream_name']}")
+                logger.info("成功创建S3导出数据流: %s", self.config['stream_name'])
                 
                 return True
-                
+            
             except Exception as e:
-                logger.error(f"设置Stream Manager失败 (第{attempt + 1}次尝试): {e}")
+                logger.error("设置Stream Manager失败 (第%s次尝试): %s", attempt + 1, e)
                 if attempt < max_retries - 1:
-                    logger.info(f"等待{retry_delay}秒后重试...")
+                    logger.info("等待%s秒后重试...", retry_delay)
                     time.sleep(retry_delay)
                 else:
                     logger.error("所有重试都失败了")
@@ -161,62 +547,223 @@ class SFTPToS3Component:
             # Reject unknown hosts by default
             self.ssh_client.set_missing_host_key_policy(paramiko.RejectPolicy())
             
+            # 限制加密算法时由自定义的传输工厂设置安全选项（需要paramiko>=3.2）
+            connect_options = {}
+            if self.config['ssh_ciphers']:
+                connect_options['transport_factory'] = self.create_transport
+            
             # 连接到SFTP服务器
-            logger.info(f"连接到SFTP服务器: {self.config['sftp_username']}@{self.config['sftp_host']}:{self.config['sftp_port']}")
+            logger.info("连接到SFTP服务器: %s@%s:%s", self.config['sftp_username'], self.config['sftp_host'], self.config['sftp_port'])
             self.ssh_client.connect(
                 hostname=self.config['sftp_host'],
                 port=self.config['sftp_port'],
                 username=self.config['sftp_username'],
                 password=self.config['sftp_password'],
-                timeout=30
+                timeout=30,
+                compress=self.config['ssh_compress'],
+                **connect_options
             )
             
+            transport = self.ssh_client.get_transport()
+            if self.config['ssh_keepalive_interval']:
+                transport.set_keepalive(self.config['ssh_keepalive_interval'])
+            
             # 创建SFTP客户端
-            self.sftp_client = self.ssh_client.open_sftp()
+            self.close_scan_channels()
+            self.dir_cache.clear()
+            self.sftp_client = self.open_sftp_channel()
+            logger.info("SSH传输参数: 加密 %s, 压缩 %s, 窗口 %s, 最大包 %s",
+                        transport.remote_cipher, self.config['ssh_compress'],
+                        self.config['ssh_window_size'] or '默认', self.config['ssh_max_packet_size'] or '默认')
             logger.info("SFTP连接建立成功")
             
             # 测试目录访问
             try:
                 file_list = self.sftp_client.listdir(self.config['sftp_remote_path'])
-                logger.info(f"SFTP目录访问成功，发现 {len(file_list)} 个文件")
+                logger.info("SFTP目录访问成功，发现 %s 个文件", len(file_list))
             except Exception as e:
-                logger.error(f"SFTP目录访问失败: {e}")
+                logger.error("SFTP目录访问失败: %s", e)
                 return False
             
             return True
-            
+        
         except Exception as e:
-            logger.error(f"SFTP连接失败: {e}")
+            logger.error("SFTP连接失败: %s", e)
             return False
     
+    def create_transport(self, sock, **kwargs) -> paramiko.Transport:
+        """创建SSH传输，只保留配置允许的加密算法（按paramiko自身的偏好顺序协商）"""
+        transport = paramiko.Transport(sock, **kwargs)
+        security_options = transport.get_security_options()
+        ciphers = [c for c in security_options.ciphers if c in self.config['ssh_ciphers']]
+        if not ciphers:
+            raise ValueError(f"SSH_CIPHERS中没有paramiko支持的加密算法: {self.config['ssh_ciphers']}")
+        security_options.ciphers = ciphers
+        return transport
+    
+    def open_sftp_channel(self) -> paramiko.SFTPClient:
+        """在现有SSH连接上打开一个SFTP通道，使用配置的窗口和包大小"""
+        return paramiko.SFTPClient.from_transport(
+            self.ssh_client.get_transport(),
+            window_size=self.config['ssh_window_size'],
+            max_packet_size=self.config['ssh_max_packet_size']
+        )
+    
+    def connection_alive(self) -> bool:
+        """SSH传输是否仍然可用（keepalive失败或对端断开后变为不可用）"""
+        if not self.sftp_client or not self.ssh_client:
+            return False
+        transport = self.ssh_client.get_transport()
+        return transport is not None and transport.is_active()
+    
+    def ensure_sftp_connection(self) -> bool:
+        """连接断开时透明重连，已打开的通道和目录缓存随旧连接一起丢弃"""
+        if self.connection_alive():
+            return True
+        if self.sftp_client:
+            logger.warning("SFTP连接已断开，重新连接")
+        self.close_sftp_connection()
+        return self.setup_sftp_connection()
+    
+    def close_sftp_connection(self):
+        """关闭SFTP通道和SSH连接"""
+        self.close_scan_channels()
+        for client in (self.sftp_client, self.ssh_client):
+            if client:
+                try:
+                    client.close()
+                except Exception:
+                    pass
+        self.sftp_client = None
+        self.ssh_client = None
+    
+    def close_scan_channels(self):
+        """关闭并行遍历使用的额外SFTP通道"""
+        for channel in self.scan_channels:
+            try:
+                channel.close()
+            except Exception:
+                pass
+        self.scan_channels = []
+    
+    def open_scan_channels(self) -> "queue.Queue[paramiko.SFTPClient]":
+        """准备遍历通道池: 主会话加上按需打开的额外通道"""
+        wanted = max(self.config['scan_channels'], 1) - 1
+        while len(self.scan_channels) < wanted:
+            self.scan_channels.append(self.open_sftp_channel())
+        
+        channels = queue.Queue()
+        for channel in [self.sftp_client, *self.scan_channels[:wanted]]:
+            channels.put(channel)
+        return channels
+    
+    def path_matches(self, relative_path: str, patterns: List[str]) -> bool:
+        return any(fnmatch.fnmatch(relative_path, pattern) for pattern in patterns)
+    
+    def list_remote_dir(self, relative_dir: str, known_mtime: Optional[int], use_cache: bool,
+                        channels: "queue.Queue[paramiko.SFTPClient]"):
+        """列出一个目录，目录修改时间未变时复用缓存（只需一次stat或无需往返）
+        返回(相对路径, 目录修改时间, 条目列表, 是否来自缓存)
+        """
+        remote_dir = posixpath.join(self.config['sftp_remote_path'], relative_dir) if relative_dir else self.config['sftp_remote_path']
+        channel = channels.get()
+        try:
+            cached = self.dir_cache.get(relative_dir) if use_cache else None
+            if cached is not None:
+                if known_mtime is None:
+                    known_mtime = channel.stat(remote_dir).st_mtime
+                if known_mtime == cached[0]:
+                    return relative_dir, known_mtime, cached[1], True
+            
+            with self.profiler.span('listdir'):
+                attrs = channel.listdir_attr(remote_dir)
+            entries = [(attr.filename, stat.S_ISDIR(attr.st_mode or 0), attr.st_size, attr.st_mtime) for attr in attrs]
+            return relative_dir, known_mtime, entries, False
+        finally:
+            channels.put(channel)
+    
+    def walk_remote_tree(self) -> Dict[str, Tuple[int, int]]:
+        """按层并行遍历远程目录树，返回匹配文件的相对路径 -> (大小, 修改时间)
+        顶层目录每轮都完整列出；子目录修改时间未变时复用上次的列表，只有新增/删除/改名的目录需要重新列出。
+        同一层的兄弟目录分配到多个SFTP通道上并行列出。
+        """
+        max_depth = self.config['scan_max_depth']
+        include_patterns = self.config['scan_include_patterns']
+        exclude_patterns = self.config['scan_exclude_patterns']
+        
+        # 目录内文件原地改写不会改变目录修改时间，定期完整列出一次
+        self.scan_count += 1
+        relist_every = self.config['scan_full_relist_every']
+        use_cache = not relist_every or self.scan_count % relist_every != 0
+        
+        channels = self.open_scan_channels() if max_depth > 0 else None
+        if channels is None:
+            channels = queue.Queue()
+            channels.put(self.sftp_client)
+        
+        signatures: Dict[str, Tuple[int, int]] = {}
+        new_cache: Dict[str, Tuple[int, List[Tuple[str, bool, int, int]]]] = {}
+        listed_dirs = cached_dirs = 0
+        # (相对路径, 父目录列表中得到的修改时间; None表示父目录来自缓存，需要重新stat)
+        frontier: List[Tuple[str, Optional[int]]] = [('', None)]
+        depth = 0
+        with ThreadPoolExecutor(max_workers=max(channels.qsize(), 1)) as executor:
+            while frontier:
+                results = list(executor.map(
+                    # 顶层目录不使用缓存，保持原有的逐文件签名比较
+                    lambda item: self.list_remote_dir(item[0], item[1], use_cache and item[0] != '', channels),
+                    frontier
+                ))
+                next_frontier = []
+                for relative_dir, dir_mtime, entries, from_cache in results:
+                    if from_cache:
+                        cached_dirs += 1
+                    else:
+                        listed_dirs += 1
+                    # 修改时间缺失或只有秒级精度时，刚修改过的目录可能漏掉同一秒内的新文件，不缓存
+                    if relative_dir and dir_mtime is not None and dir_mtime < time.time() - 2:
+                        new_cache[relative_dir] = (dir_mtime, entries)
+                    
+                    for name, is_dir, size, mtime in entries:
+                        relative_path = posixpath.join(relative_dir, name) if relative_dir else name
+                        if self.path_matches(relative_path, exclude_patterns):
+                            continue
+                        if is_dir:
+                            if depth < max_depth and relative_path != self.config['processed_dir']:
+                                next_frontier.append((relative_path, None if from_cache else mtime))
+                        elif self.path_matches(relative_path, include_patterns):
+                            signatures[relative_path] = (size, mtime)
+                frontier = next_frontier
+                depth += 1
+        
+        self.dir_cache = new_cache
+        logger.debug("目录遍历完成: 列出 %d 个目录, 缓存命中 %d 个目录", listed_dirs, cached_dirs)
+        return signatures
+    
     def scan_sftp_files(self) -> List[str]:
-        """扫描SFTP目录中的文件"""
+        """扫描SFTP目录中的文件，返回相对sftp_remote_path的路径"""
         try:
             if not self.sftp_client:
                 logger.error("SFTP客户端未初始化")
                 return []
             
-            # 获取目录文件列表
-            file_list = self.sftp_client.listdir(self.config['sftp_remote_path'])
-            logger.debug(f"SFTP目录中的所有文件: {file_list}")
+            # 按包含/排除规则过滤文件
+            self.remote_signatures = self.walk_remote_tree()
+            logger.debug("支持的文件数: %d", len(self.remote_signatures))
             
-            # 过滤支持的文件类型（JSON和TXT文件）
-            supported_files = [f for f in file_list if f.endswith(('.json', '.txt', '.csv', '.log'))]
-            logger.debug(f"支持的文件类型: {supported_files}")
-            
-            # 过滤未处理的文件
-            new_files = [f for f in supported_files if f not in self.processed_files]
-            logger.debug(f"已处理的文件: {list(self.processed_files)}")
+            # 过滤未处理或(大小, 修改时间)已变化的文件
+            new_files = [f for f, signature in self.remote_signatures.items()
+                         if self.processed_files.get(f) != signature]
             
             if new_files:
-                logger.info(f"发现 {len(new_files)} 个新文件: {new_files[:3]}{'...' if len(new_files) > 3 else ''}")
+                logger.debug("发现 %d 个新文件", len(new_files))
             else:
-                logger.debug(f"扫描完成，未发现新文件。已处理文件数: {len(self.processed_files)}")
+                logger.debug("扫描完成，未发现新文件。已处理文件数: %d", len(self.processed_files))
             
             return new_files
-            
+        
         except Exception as e:
-            logger.error(f"扫描SFTP文件失败: {e}")
+            logger.error("扫描SFTP文件失败: %s", e)
             return []
     
     def download_and_process_file(self, filename: str) -> bool:
@@ -231,65 +778,327 @@ class SFTPToS3Component:
             remote_file_path = f"{self.config['sftp_remote_path']}/{filename}"
             
             # 创建临时文件
-            with tempfile.NamedTemporaryFile(mode='w+b', delete=False, suffix='.json') as temp_file:
+            with tempfile.NamedTemporaryFile(mode='w+b', delete=False, suffix='.json',
+                                             dir=self.config['spool_dir']) as temp_file:
                 local_temp_file = temp_file.name
             
-            # 下载文件
-            logger.info(f"下载文件: {filename}")
-            self.sftp_client.get(remote_file_path, local_temp_file)
+            # 下载文件，同时流式计算内容哈希
+            logger.debug("下载文件: %s", filename)
+            with self.profiler.span('sftp_get'), open(local_temp_file, 'wb') as f:
+                writer = HashingFileWriter(f)
+                if self.config['sftp_prefetch_requests']:
+                    # 限制并发预读请求数（paramiko>=3.3），默认对整个文件一次性发出读请求
+                    self.sftp_client.getfo(remote_file_path, writer,
+                                           max_concurrent_prefetch_requests=self.config['sftp_prefetch_requests'])
+                else:
+                    self.sftp_client.getfo(remote_file_path, writer)
+            content_hash = writer.hexdigest()
+            
+            # 内容与已上传文件相同（文件改名或重写了相同内容）则跳过上传
+            with self.lifecycle_lock:
+                duplicate = self.dedup_cache.seen(content_hash)
+                confirmed = duplicate and self.dedup_cache.confirmed(content_hash)
+            if duplicate:
+                logger.debug("内容重复，跳过上传: %s (sha256=%s)", filename, content_hash)
+                self.mark_file_processed(filename)
+                # 只有确定原内容已上传成功时才对重复文件执行后续动作；Bloom过滤器可能误判，文件保留原位
+                if self.config['post_export_action'] != 'none':
+                    if confirmed:
+                        with self.lifecycle_lock:
+                            self.confirmed_files.append(filename)
+                    else:
+                        logger.info("重复内容的上传结果无法确认，文件保留原位: %s", filename)
+                os.remove(local_temp_file)
+                local_temp_file = None
+                return True
             
             # 读取并验证JSON内容
-            with open(local_temp_file, 'r', encoding='utf-8') as f:
+            with self.profiler.span('json_loads'), open(local_temp_file, 'r', encoding='utf-8') as f:
                 file_content = f.read()
                 json_data = json.loads(file_content)  # 验证JSON格式
             
-            # 添加元数据
-            processed_data = {
-                'source_type': 'sftp_sync',
-                'source_filename': filename,
-                'sync_timestamp': datetime.utcnow().isoformat() + 'Z',
-                'file_size': len(file_content),
-                'file_hash': hashlib.md5(file_content.encode(), usedforsecurity=False).hexdigest(),
-                'original_data': json_data
-            }
-            
             # 生成S3键名
             timestamp_str = datetime.utcnow().strftime('%Y/%m/%d/%H%M%S')
             s3_key = f"{self.config['s3_key_prefix']}{timestamp_str}_{filename}"
             
-            # 创建S3导出任务 - 严格按照GitHub示例
-            s3_export_task = S3ExportTaskDefinition(
-                bucket=self.config['s3_bucket'],
-                key=s3_key,
-                input_url=f"file:{local_temp_file}"
-            )
-            
-            # 发送到Stream Manager - 严格按照GitHub示例
-            sequence_number = self.stream_manager_client.append_message(
-                self.config['stream_name'],
-                Util.validate_and_serialize_to_json_bytes(s3_export_task)
-            )
+            # 批次ID由源、文件路径和内容哈希确定，重新读取同一文件得到相同的批次ID
+            batch_id = hashlib.sha256(f"{self.source_id}:{filename}:{content_hash}".encode('utf-8')).hexdigest()[:32]
+            manifest = {
+                'batch_id': batch_id,
+                'source': f"sftp://{self.config['sftp_host']}:{self.config['sftp_port']}{self.config['sftp_remote_path']}",
+                'files': filename,
+                'row_count': len(json_data) if isinstance(json_data, list) else 1,
+                'file_size': writer.size,
+                'content_sha256': content_hash,
+            }
             
-            logger.info(f"成功提交S3导出任务: {filename} -> s3://{self.config['s3_bucket']}/{s3_key}")
-            logger.info(f"Stream Manager序列号: {sequence_number}")
+            # 先写意图再提交；提交成功后文件签名才记为已导出
+            signature = self.remote_signatures.get(filename, (0, 0))
+            self.journal.begin(batch_id, s3_key, local_temp_file, manifest,
+                               {'processed_files': {filename: list(signature)}})
+            try:
+                if self.should_buffer_export():
+                    self.buffer_export(s3_key, local_temp_file, manifest)
+                    local_temp_file = None
+                else:
+                    self.append_export_task(s3_key, local_temp_file, manifest)
+            except Exception:
+                self.journal.abort(batch_id)
+                raise
+            self.journal.commit(batch_id)
             
-            # 标记文件为已处理
-            self.processed_files.add(filename)
+            # 标记文件为已处理（在压缩日志之前，快照才包含本文件）；内容哈希等S3确认成功后再记录
+            self.mark_file_processed(filename)
+            self.journal.compact(self.journal_snapshot_state)
             
             return True
-            
+        
         except json.JSONDecodeError as e:
-            logger.error(f"JSON格式错误 {filename}: {e}")
+            logger.error("JSON格式错误 %s: %s", filename, e)
             return False
         except Exception as e:
-            logger.error(f"处理文件失败 {filename}: {e}")
+            logger.error("处理文件失败 %s: %s", filename, e)
             return False
         finally:
             # 保留临时文件供Stream Manager处理，让系统自动清理/tmp目录
             if local_temp_file and os.path.exists(local_temp_file):
-                logger.debug(f"临时文件保留供Stream Manager处理: {local_temp_file}")
+                logger.debug("临时文件保留供Stream Manager处理: %s", local_temp_file)
             pass
     
+    def append_export_task(self, s3_key: str, file_path: str, manifest: Dict[str, Any]) -> int:
+        """提交S3导出任务到Stream Manager，清单作为对象的用户元数据，下游按batch_id去重"""
+        # 创建S3导出任务 - 严格按照GitHub示例
+        s3_export_task = S3ExportTaskDefinition(
+            bucket=self.config['s3_bucket'],
+            key=s3_key,
+            input_url=f"file:{file_path}",
+            user_metadata={name: str(value) for name, value in manifest.items()}
+        )
+        
+        # 先登记再提交，状态流的确认总是在登记之后到达；重启后据预写日志重新提交未确认的导出
+        with self.lifecycle_lock:
+            self.pending_exports[s3_key] = manifest
+        self.journal.update_state(updates={'unconfirmed_exports': {
+            s3_key: {'file_path': file_path, 'manifest': manifest}
+        }})
+        
+        # 发送到Stream Manager - 严格按照GitHub示例
+        try:
+            with self.profiler.span('append_message'):
+                sequence_number = self.stream_manager_client.append_message(
+                    self.config['stream_name'],
+                    Util.validate_and_serialize_to_json_bytes(s3_export_task)
+                )
+        except Exception:
+            with self.lifecycle_lock:
+                self.pending_exports.pop(s3_key, None)
+            self.journal.update_state(removals={'unconfirmed_exports': [s3_key]})
+            raise
+        
+        self.backpressure.task_submitted()
+        
+        logger.debug("成功提交S3导出任务: %s -> s3://%s/%s (序列号 %s)",
+                     manifest['files'], self.config['s3_bucket'], s3_key, sequence_number)
+        return sequence_number
+    
+    def should_buffer_export(self) -> bool:
+        """导出积压时写入本地缓冲区；缓冲区非空时新文件也排在后面，保持写入顺序"""
+        return self.store_buffer is not None and (not self.backpressure.admit() or not self.store_buffer.empty())
+    
+    def buffer_export(self, s3_key: str, file_path: str, manifest: Dict[str, Any], priority: int = 0):
+        """把下载的临时文件写入本地缓冲区后删除"""
+        with open(file_path, 'rb') as f:
+            self.store_buffer.append(s3_key, f.read(), manifest, priority)
+        os.remove(file_path)
+        logger.debug("导出积压，文件写入本地缓冲区: %s", manifest['files'])
+    
+    def export_admitted(self) -> bool:
+        """是否允许继续处理文件: 导出未积压，或本地缓冲区还没到高水位"""
+        if self.backpressure.admit():
+            return True
+        return self.store_buffer is not None and \
+            self.store_buffer.has_capacity(self.config['store_buffer_high_water_ratio'])
+    
+    def submit_buffered_export(self, s3_key: str, content: bytes, manifest: Dict[str, Any]):
+        """把缓冲区中的一条记录还原成临时文件并提交导出"""
+        with tempfile.NamedTemporaryFile(mode='wb', suffix='.json', delete=False,
+                                         dir=self.config['spool_dir']) as temp_file:
+            temp_file.write(content)
+        try:
+            self.append_export_task(s3_key, temp_file.name, manifest)
+        except Exception:
+            os.remove(temp_file.name)
+            raise
+    
+    def store_buffer_drain_loop(self):
+        """导出恢复（背压解除）后按段顺序连续排空本地缓冲区，再次积压时暂停；定期输出缓冲深度和排空速率"""
+        last_report = time.monotonic()
+        while self.running:
+            if self.store_buffer.empty():
+                time.sleep(1)
+            elif self.backpressure.wait_for_capacity(1):
+                try:
+                    drained = self.store_buffer.drain(self.submit_buffered_export,
+                                                      lambda: self.running and self.backpressure.admit())
+                    if drained:
+                        logger.info("本地缓冲区已排空 %d 个文件", drained)
+                except Exception as e:
+                    logger.error("排空本地缓冲区失败，稍后重试: %s", e)
+                    time.sleep(self.config['retry_delay'])
+            
+            if time.monotonic() - last_report >= self.config['store_buffer_report_interval']:
+                last_report = time.monotonic()
+                metrics = self.store_buffer.metrics()
+                if metrics['records'] or metrics['evicted_records']:
+                    eta = metrics['catch_up_seconds']
+                    logger.info("本地缓冲区: %d 段, %d 个文件, %d 字节; 写入 %.0f B/s, 排空 %.0f B/s, "
+                                "预计排空 %s; 累计淘汰 %d 个文件",
+                                metrics['segments'], metrics['records'], metrics['bytes'],
+                                metrics['ingest_rate'], metrics['drain_rate'],
+                                f"{eta:.0f}秒" if eta is not None else "未知", metrics['evicted_records'])
+    
+    def start_store_buffer_drain(self):
+        """启动本地缓冲区排空线程（宿主模式下由宿主在注册源时调用）"""
+        if self.store_buffer and not (self.store_buffer_thread and self.store_buffer_thread.is_alive()):
+            self.store_buffer_thread = threading.Thread(target=self.store_buffer_drain_loop, daemon=True)
+            self.store_buffer_thread.start()
+    
+    def recover_pending_exports(self):
+        """重新提交上次运行中写了意图但未确认提交的文件（使用保留的临时文件，不重新下载）"""
+        for intent in list(self.journal.pending.values()):
+            batch_id = intent['batch_id']
+            filename = intent['manifest']['files']
+            if not os.path.exists(intent['file_path']):
+                # 临时文件已被清理: 文件未记为已处理，下轮扫描会重新下载
+                logger.warning("未完成批次的临时文件不存在，放弃该批次: %s", intent['s3_key'])
+                self.journal.abort(batch_id)
+                continue
+            
+            try:
+                self.append_export_task(intent['s3_key'], intent['file_path'], intent['manifest'])
+            except Exception as e:
+                logger.error("恢复导出批次失败，下轮重试 %s: %s", intent['s3_key'], e)
+                continue
+            self.journal.commit(batch_id)
+            self.processed_files[filename] = tuple(intent['state_updates']['processed_files'][filename])
+            logger.info("已恢复未完成的导出批次: %s", intent['s3_key'])
+    
+    def resubmit_unconfirmed_exports(self):
+        """重新提交上次运行中未确认上传结果的导出；临时文件已被清理时无法确认，远程文件保留原位"""
+        for s3_key, export in list(self.unconfirmed_exports.items()):
+            if os.path.exists(export['file_path']):
+                try:
+                    self.append_export_task(s3_key, export['file_path'], export['manifest'])
+                except Exception as e:
+                    logger.error("重新提交未确认的导出失败，下轮重试 %s: %s", s3_key, e)
+                    continue
+                logger.info("已重新提交未确认的导出: %s", s3_key)
+            else:
+                logger.warning("未确认导出的临时文件不存在，远程文件保留原位: %s", export['manifest']['files'])
+                self.journal.update_state(removals={'unconfirmed_exports': [s3_key]})
+            del self.unconfirmed_exports[s3_key]
+    
+    def journal_snapshot_state(self) -> Dict[str, Dict[str, Any]]:
+        """压缩预写日志时写入快照的完整状态（在日志锁内调用）"""
+        with self.lifecycle_lock:
+            processed_files = {name: list(signature) for name, signature in self.processed_files.items()}
+        return {
+            'processed_files': processed_files,
+            'unconfirmed_exports': self.journal.state.get('unconfirmed_exports', {}),
+        }
+    
+    def mark_file_processed(self, filename: str):
+        """记录文件签名，超出上限时淘汰最久未见的文件"""
+        with self.lifecycle_lock:
+            self.processed_files[filename] = self.remote_signatures.get(filename, (0, 0))
+            self.processed_files.move_to_end(filename)
+            while len(self.processed_files) > self.config['processed_files_max']:
+                self.processed_files.popitem(last=False)
+    
+    def handle_export_status(self, s3_key: Optional[str], status: str) -> bool:
+        """处理一条导出完成状态，S3键属于本组件时返回True
+        上传成功后记录内容哈希，并把文件加入待执行队列；
+        失败的文件保留在原位，并清除其已处理签名，下一轮扫描重新导出
+        """
+        with self.lifecycle_lock:
+            manifest = self.pending_exports.pop(s3_key, None)
+            if manifest is None:
+                return False
+            if status == 'Success':
+                self.dedup_cache.add(manifest['content_sha256'])
+                if self.config['post_export_action'] != 'none':
+                    self.confirmed_files.append(manifest['files'])
+            else:
+                self.processed_files.pop(manifest['files'], None)
+        # 日志写入在lifecycle_lock之外（压缩日志时会在日志锁内获取lifecycle_lock）
+        removals = {'unconfirmed_exports': [s3_key]}
+        if status != 'Success':
+            removals['processed_files'] = [manifest['files']]
+            logger.warning("S3上传失败，下一轮扫描重新导出: %s", manifest['files'])
+        self.journal.update_state(removals=removals)
+        return True
+    
+    def ensure_remote_dir(self, path: str):
+        """逐级创建远程目录（已创建的目录只检查一次）"""
+        if path in self.archive_dirs:
+            return
+        parts = path.split('/')
+        for depth in range(1, len(parts) + 1):
+            current = '/'.join(parts[:depth])
+            if not current:
+                continue
+            try:
+                self.sftp_client.stat(current)
+            except FileNotFoundError:
+                self.sftp_client.mkdir(current)
+        self.archive_dirs.add(path)
+    
+    def apply_post_export_actions(self) -> int:
+        """批量移动或删除已确认上传成功的远程文件，返回处理的文件数
+        在扫描线程中执行（与下载共用SFTP会话），每轮扫描最多创建一次归档目录
+        """
+        action = self.config['post_export_action']
+        with self.lifecycle_lock:
+            batch = self.confirmed_files
+            self.confirmed_files = []
+        if not batch or action == 'none':
+            return 0
+        
+        remote_path = self.config['sftp_remote_path']
+        archive_dir = f"{remote_path}/{self.config['processed_dir']}/{datetime.utcnow().strftime('%Y/%m/%d')}"
+        applied = 0
+        with self.profiler.span('post_export_action'):
+            for index, filename in enumerate(batch):
+                # 导出后文件又被改写（签名变化）时保留原位，下轮扫描会重新导出
+                if self.remote_signatures.get(filename) != self.processed_files.get(filename):
+                    logger.debug("文件导出后已变化，跳过后续动作: %s", filename)
+                    continue
+                
+                source_path = f"{remote_path}/{filename}"
+                try:
+                    if action == 'move':
+                        target_path = f"{archive_dir}/{filename}"
+                        self.ensure_remote_dir(posixpath.dirname(target_path))
+                        self.sftp_client.posix_rename(source_path, target_path)
+                    elif action == 'delete':
+                        self.sftp_client.remove(source_path)
+                except FileNotFoundError:
+                    logger.debug("远程文件已不存在: %s", source_path)
+                except Exception as e:
+                    # 连接问题等错误: 剩余文件放回队列，下轮重试
+                    logger.error("远程文件%s失败 %s: %s", '移动' if action == 'move' else '删除', filename, e)
+                    with self.lifecycle_lock:
+                        self.confirmed_files[:0] = batch[index:]
+                    break
+                
+                self.processed_files.pop(filename, None)
+                self.remote_signatures.pop(filename, None)
+                applied += 1
+        
+        if applied:
+            logger.info("远程文件后续动作完成: %s %d 个文件", action, applied)
+        return applied
+    
     def monitor_s3_export_status(self):
         """监控S3导出状态 - 严格按照GitHub示例"""
         while self.running:
@@ -298,13 +1107,25 @@ class SFTPToS3Component:
                     time.sleep(5)
                     continue
                 
-                # 读取状态流消息 - 严格按照GitHub示例
+                # 刷新数据流占用，用于背压判断
+                stream_info = self.stream_manager_client.describe_message_stream(self.config['stream_name'])
+                self.backpressure.update_stream_bytes(stream_info.storage_status.total_bytes)
+                
+                # 读取状态流消息（从上次读到的位置继续，避免重复计数） - 严格按照GitHub示例
                 messages = self.stream_manager_client.read_messages(
                     self.config['status_stream_name'],
-                    ReadMessagesOptions(min_message_count=1, read_timeout_millis=1000)
+                    ReadMessagesOptions(
+                        desired_start_sequence_number=self.next_status_sequence,
+                        min_message_count=1,
+                        max_message_count=100,
+                        read_timeout_millis=1000
+                    )
                 )
                 
+                # 按批汇总状态，成功/进行中每批只输出一行
+                status_counts = {'Success': 0, 'InProgress': 0}
                 for message in messages:
+                    self.next_status_sequence = message.sequence_number + 1
                     # 反序列化状态消息 - 严格按照GitHub示例
                     try:
                         status_data = json.loads(message.payload.decode('utf-8'))
@@ -312,46 +1133,115 @@ class SFTPToS3Component:
                         # 检查状态
                         if 'status' in status_data:
                             status = status_data['status']
+                            if status in ['Success', 'Failure', 'Canceled']:
+                                s3_key = status_data.get('statusContext', {}).get('s3ExportTaskDefinition', {}).get('key')
+                                self.handle_export_status(s3_key, status)
                             if status == 'Success':
-                                logger.info(f"✅ S3上传成功")
+                                self.backpressure.task_finished()
+                                status_counts['Success'] += 1
                             elif status in ['Failure', 'Canceled']:
-                                logger.error(f"❌ S3上传失败: {status_data.get('message', 'Unknown error')}")
+                                self.backpressure.task_finished()
+                                logger.error("❌ S3上传失败: %s", status_data.get('message', 'Unknown error'))
                             elif status == 'InProgress':
-                                logger.info(f"⏳ S3上传进行中")
+                                status_counts['InProgress'] += 1
                     except Exception as e:
-                        logger.debug(f"解析状态消息失败: {e}")
+                        logger.debug("解析状态消息失败: %s", e)
                 
+                if status_counts['Success'] or status_counts['InProgress']:
+                    logger.info("S3导出状态: ✅ 成功 %d, ⏳ 进行中 %d", status_counts['Success'], status_counts['InProgress'])
+            
             except Exception as e:
-                logger.debug(f"读取状态流时出错: {e}")
+                logger.debug("读取状态流时出错: %s", e)
             
             time.sleep(5)  # 每5秒检查一次状态
     
+    def scan_once(self) -> int:
+        """执行一轮扫描并处理新文件，返回成功处理的文件数"""
+        return self.profiler.run_cycle(self.run_scan_cycle)
+    
+    def run_scan_cycle(self) -> int:
+        """扫描SFTP目录并逐个处理新文件"""
+        # 先重新提交上次运行中未完成或未确认的导出
+        if self.journal.pending:
+            self.recover_pending_exports()
+        if self.unconfirmed_exports:
+            self.resubmit_unconfirmed_exports()
+        
+        # 连接参数在运行时被修改: 在处理文件之前重建连接
+        if self.reconnect_requested:
+            self.reconnect_requested = False
+            logger.info("连接配置已变化，重新连接SFTP服务器")
+            self.close_sftp_connection()
+        
+        # 连接断开时先尝试重连
+        if not self.ensure_sftp_connection():
+            raise Exception("SFTP连接设置失败")
+        
+        # 扫描新文件
+        new_files = self.scan_sftp_files()
+        
+        # 对已确认上传成功的文件批量执行移动/删除
+        self.apply_post_export_actions()
+        
+        # 处理每个新文件
+        cycle_started = time.monotonic()
+        processed_count = 0
+        failed_count = 0
+        for index, filename in enumerate(new_files):
+            if not self.running:
+                break
+            
+            # 导出积压且本地缓冲区已满时暂停，剩余文件下轮扫描时再处理
+            if not self.export_admitted():
+                logger.warning("导出积压，暂停处理剩余 %d 个文件", len(new_files) - index)
+                break
+            
+            success = self.download_and_process_file(filename)
+            if not success and not self.connection_alive():
+                # 传输中途断开: 重连后重试一次，失败则留到下轮扫描
+                if not self.ensure_sftp_connection():
+                    logger.error("SFTP重连失败，剩余 %d 个文件留到下轮扫描", len(new_files) - index)
+                    failed_count += 1
+                    break
+                success = self.download_and_process_file(filename)
+            
+            if success:
+                processed_count += 1
+                logger.debug("文件处理成功: %s", filename)
+            else:
+                failed_count += 1
+                logger.error("文件处理失败: %s", filename)
+            
+            # 短暂延迟避免过于频繁
+            time.sleep(self.config['file_interval'])
+        
+        self.dedup_cache.flush()
+        
+        # 每轮一条汇总日志代替逐文件日志
+        if new_files:
+            fields = {
+                'source_id': self.source_id,
+                'new_files': len(new_files),
+                'processed': processed_count,
+                'failed': failed_count,
+                'elapsed_s': round(time.monotonic() - cycle_started, 2),
+            }
+            logger.info("本轮扫描完成: 新文件 %d, 成功 %d, 失败 %d, 耗时 %.2f秒",
+                        fields['new_files'], fields['processed'], fields['failed'], fields['elapsed_s'],
+                        extra={'fields': fields})
+        return processed_count
+    
     def file_scan_loop(self):
         """文件扫描循环"""
         while self.running:
             try:
-                # 扫描新文件
-                new_files = self.scan_sftp_files()
-                
-                # 处理每个新文件
-                for filename in new_files:
-                    if not self.running:
-                        break
-                    
-                    success = self.download_and_process_file(filename)
-                    if success:
-                        logger.info(f"文件处理成功: {filename}")
-                    else:
-                        logger.error(f"文件处理失败: {filename}")
-                    
-                    # 短暂延迟避免过于频繁
-                    time.sleep(1)
-                
+                self.scan_once()
             except Exception as e:
-                logger.error(f"文件扫描循环出错: {e}")
+                logger.error("文件扫描循环出错: %s", e)
             
             # 等待下次扫描
-            time.sleep(self.config['scan_interval'])
+            self.wake_event.wait(self.config['scan_interval'])
+            self.wake_event.clear()
     
     def start(self):
         """启动组件"""
@@ -365,6 +1255,10 @@ class SFTPToS3Component:
         if not self.setup_sftp_connection():
             raise Exception("SFTP连接设置失败")
         
+        # 按需采样: kill -USR1 <pid> 对下一轮处理做cProfile（信号处理只能在主线程注册）
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGUSR1, lambda signum, frame: self.profiler.request_profile())
+        
         # 启动运行标志
         self.running = True
         
@@ -378,6 +1272,12 @@ class SFTPToS3Component:
         self.status_monitor_thread.start()
         logger.info("状态监控线程已启动")
         
+        self.start_store_buffer_drain()
+        
+        # 监视组件配置变化，运行中生效
+        if self.config_source:
+            self.config_source.watch(self.apply_runtime_config)
+        
         logger.info("SFTP到S3同步组件启动完成")
     
     def stop(self):
@@ -385,6 +1285,9 @@ class SFTPToS3Component:
         logger.info("停止SFTP到S3同步组件...")
         
         self.running = False
+        self.wake_event.set()
+        if self.config_source:
+            self.config_source.close()
         
         # 等待线程结束
         if self.scan_thread and self.scan_thread.is_alive():
@@ -393,14 +1296,18 @@ class SFTPToS3Component:
         if self.status_monitor_thread and self.status_monitor_thread.is_alive():
             self.status_monitor_thread.join(timeout=10)
         
+        if self.store_buffer_thread and self.store_buffer_thread.is_alive():
+            self.store_buffer_thread.join(timeout=10)
+        
         # 关闭连接
-        if self.sftp_client:
-            self.sftp_client.close()
+        self.close_sftp_connection()
         
-        if self.ssh_client:
-            self.ssh_client.close()
+        self.dedup_cache.close()
+        self.journal.close()
+        if self.store_buffer:
+            self.store_buffer.close()
         
-        if self.stream_manager_client:
+        if self.stream_manager_client and not self.shared_stream_manager:
             self.stream_manager_client.close()
         
         logger.info("SFTP到S3同步组件已停止")
@@ -413,11 +1320,11 @@ class SFTPToS3Component:
             # 保持运行
             while self.running:
                 time.sleep(1)
-                
+        
         except KeyboardInterrupt:
             logger.info("收到中断信号，正在停止...")
         except Exception as e:
-            logger.error(f"组件运行出错: {e}")
+            logger.error("组件运行出错: %s", e)
             raise
         finally:
             self.stop()
@@ -431,7 +1338,7 @@ def main():
     try:
         component.run()
     except Exception as e:
-        logger.error(f"组件启动失败: {e}")
+        logger.error("组件启动失败: %s", e)
         raise
 
 if __name__ == "__main__":
@@ -43,7 +43,7 @@ show_help() {
     echo "用法: $0 [选项]"
     echo ""
     echo "选项:"
-    echo "  --component <name>    只部署指定组件 (debezium-embedded|sftp-to-s3|mysql-to-s3)"
+    echo "  --component <name>    只部署指定组件 (debezium-embedded|sftp-to-s3|mysql-to-s3|multi-source-host)"
     echo "  --environment <env>   部署环境 (dev|staging|prod)"
     echo "  --strategy <strategy> 部署策略 (rolling|blue-green|all-at-once)"
     echo "  --dry-run            模拟部署，不实际执行"
@@ -100,15 +100,31 @@ upload_component_artifacts() {
         sftp-to-s3)
             aws s3 cp "$component_dir/sftp_to_s3.py" \
                 "s3://$S3_BUCKET/components/sftp_to_s3.py" --region "$AWS_REGION"
+            aws s3 cp "components/common/pipeline_common.py" \
+                "s3://$S3_BUCKET/components/pipeline_common.py" --region "$AWS_REGION"
             aws s3 cp "$component_dir/requirements.txt" \
                 "s3://$S3_BUCKET/components/requirements.txt" --region "$AWS_REGION"
             ;;
         mysql-to-s3)
             aws s3 cp "$component_dir/mysql_to_s3.py" \
                 "s3://$S3_BUCKET/components/mysql_to_s3.py" --region "$AWS_REGION"
+            aws s3 cp "components/common/pipeline_common.py" \
+                "s3://$S3_BUCKET/components/pipeline_common.py" --region "$AWS_REGION"
             aws s3 cp "$component_dir/mysql_requirements.txt" \
                 "s3://$S3_BUCKET/components/mysql_requirements.txt" --region "$AWS_REGION"
             ;;
+        multi-source-host)
+            aws s3 cp "$component_dir/multi_source_host.py" \
+                "s3://$S3_BUCKET/components/multi_source_host.py" --region "$AWS_REGION"
+            aws s3 cp "components/sftp-to-s3/sftp_to_s3.py" \
+                "s3://$S3_BUCKET/components/sftp_to_s3.py" --region "$AWS_REGION"
+            aws s3 cp "components/mysql-to-s3/mysql_to_s3.py" \
+                "s3://$S3_BUCKET/components/mysql_to_s3.py" --region "$AWS_REGION"
+            aws s3 cp "components/common/pipeline_common.py" \
+                "s3://$S3_BUCKET/components/pipeline_common.py" --region "$AWS_REGION"
+            aws s3 cp "$component_dir/multi_source_requirements.txt" \
+                "s3://$S3_BUCKET/components/multi_source_requirements.txt" --region "$AWS_REGION"
+            ;;
         *)
             log_error "未知组件: $component_name"
             return 1
@@ -143,6 +159,9 @@ create_component_version() {
         mysql-to-s3)
             current_version=$MYSQL_COMPONENT_VERSION
             ;;
+        multi-source-host)
+            current_version=$MULTI_SOURCE_COMPONENT_VERSION
+            ;;
     esac
     
     # 创建组件版本
@@ -44,7 +44,8 @@ CREATE TABLE IF NOT EXISTS device_status (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     INDEX idx_device_id (device_id),
     INDEX idx_status (status),
-    INDEX idx_last_heartbeat (last_heartbeat)
+    INDEX idx_last_heartbeat (last_heartbeat),
+    INDEX idx_updated_at (updated_at)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
 -- 创建事件日志表
@@ -86,6 +87,9 @@ INSERT INTO event_log (event_type, event_source, event_data, severity) VALUES
 -- SET GLOBAL log_bin = ON;
 -- SET GLOBAL binlog_format = 'ROW';
 -- SET GLOBAL binlog_row_image = 'FULL';
+-- MySQL轮询组件的binlog采集模式(CAPTURE_MODE=binlog)还需要开启GTID:
+-- SET GLOBAL enforce_gtid_consistency = ON;
+-- SET GLOBAL gtid_mode = ON;
 
 -- 创建存储过程用于生成测试数据
 DELIMITER //
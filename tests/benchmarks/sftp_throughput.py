@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+SFTP下载吞吐量基准测试
+在进程内启动paramiko SFTP服务器，经过注入往返时延的TCP代理，用组件的连接设置下载同一个文件，
+比较不同SSH传输调优参数（窗口、最大包、并发预读、加密算法）下的MB/s
+
+用法: python tests/benchmarks/sftp_throughput.py --size-mb 32 --rtt-ms 300
+"""
+
+import argparse
+import heapq
+import logging
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+import paramiko
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir,
+                                'components', 'sftp-to-s3'))
+from sftp_to_s3 import HashingFileWriter, SFTPToS3Component
+
+USERNAME = 'bench'
+PASSWORD = 'bench'
+
+# 对比的调优组合: 名称 -> 组件配置覆盖
+SCENARIOS = [
+    ('paramiko默认', {}),
+    ('窗口4MB', {'ssh_window_size': 4 * 1024 * 1024, 'ssh_max_packet_size': 32768}),
+    ('窗口4MB+预读64', {'ssh_window_size': 4 * 1024 * 1024, 'ssh_max_packet_size': 32768,
+                       'sftp_prefetch_requests': 64}),
+    ('窗口4MB+aes128-gcm', {'ssh_window_size': 4 * 1024 * 1024, 'ssh_max_packet_size': 32768,
+                           'ssh_ciphers': ['aes128-gcm@openssh.com']}),
+]
+
+
+class BenchServer(paramiko.ServerInterface):
+    """只接受固定用户名密码和sftp子系统的SSH服务器"""
+    
+    def check_auth_password(self, username, password):
+        if username == USERNAME and password == PASSWORD:
+            return paramiko.AUTH_SUCCESSFUL
+        return paramiko.AUTH_FAILED
+    
+    def get_allowed_auths(self, username):
+        return 'password'
+    
+    def check_channel_request(self, kind, chanid):
+        if kind == 'session':
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED_OR_NOT_SUPPORTED
+
+
+class DirectorySFTPServer(paramiko.SFTPServerInterface):
+    """只读地提供本地目录中的文件（远程路径按本地目录下的相对路径解析）"""
+    
+    root = None
+    
+    def local_path(self, path):
+        return os.path.join(self.root, path.lstrip('/'))
+    
+    def list_folder(self, path):
+        local_dir = self.local_path(path)
+        try:
+            return [
+                paramiko.SFTPAttributes.from_stat(os.stat(os.path.join(local_dir, name)), name)
+                for name in os.listdir(local_dir)
+            ]
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+    
+    def stat(self, path):
+        try:
+            return paramiko.SFTPAttributes.from_stat(os.stat(self.local_path(path)))
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+    
+    lstat = stat
+    
+    def open(self, path, flags, attr):
+        try:
+            handle = paramiko.SFTPHandle(flags)
+            handle.readfile = open(self.local_path(path), 'rb')
+            return handle
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+
+
+def serve_sftp(listener, host_key, root):
+    """接受SSH连接并在每个连接上提供SFTP子系统"""
+    DirectorySFTPServer.root = root
+    while True:
+        try:
+            sock, _ = listener.accept()
+        except OSError:
+            return
+        transport = paramiko.Transport(sock)
+        transport.add_server_key(host_key)
+        transport.set_subsystem_handler('sftp', paramiko.SFTPServer, DirectorySFTPServer)
+        transport.start_server(server=BenchServer())
+
+
+def delayed_pipe(source, target, delay):
+    """单向转发: 每块数据在到达delay秒后才发出，模拟链路的单向时延（不限制在途数据量）"""
+    pending = []
+    condition = threading.Condition()
+    
+    def receive():
+        sequence = 0
+        while True:
+            try:
+                data = source.recv(65536)
+            except OSError:
+                data = b''
+            with condition:
+                heapq.heappush(pending, (time.monotonic() + delay, sequence, data))
+                condition.notify()
+            sequence += 1
+            if not data:
+                return
+    
+    def send():
+        while True:
+            with condition:
+                while not pending:
+                    condition.wait()
+                deliver_at, _, data = pending[0]
+                wait = deliver_at - time.monotonic()
+                if wait > 0:
+                    condition.wait(wait)
+                    continue
+                heapq.heappop(pending)
+            if not data:
+                try:
+                    target.shutdown(socket.SHUT_WR)
+                except OSError:
+                    pass
+                return
+            try:
+                target.sendall(data)
+            except OSError:
+                return
+    
+    threading.Thread(target=receive, daemon=True).start()
+    threading.Thread(target=send, daemon=True).start()
+
+
+def serve_latency_proxy(listener, upstream_port, rtt):
+    """转发到SFTP服务器的TCP代理，两个方向各注入一半往返时延"""
+    while True:
+        try:
+            client, _ = listener.accept()
+        except OSError:
+            return
+        upstream = socket.create_connection(('127.0.0.1', upstream_port))
+        for sock in (client, upstream):
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        delayed_pipe(client, upstream, rtt / 2)
+        delayed_pipe(upstream, client, rtt / 2)
+
+
+def start_listener():
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(16)
+    return listener
+
+
+def measure(proxy_port, work_dir, file_name, overrides, runs):
+    """用组件建立SFTP连接并下载文件，返回各次下载的MB/s"""
+    component = SFTPToS3Component('bench', {
+        'sftp_host': '127.0.0.1',
+        'sftp_port': proxy_port,
+        'sftp_username': USERNAME,
+        'sftp_password': PASSWORD,
+        'sftp_remote_path': '/',
+        'spool_dir': work_dir,
+        **overrides,
+    })
+    if not component.setup_sftp_connection():
+        raise RuntimeError("SFTP连接失败")
+    
+    results = []
+    try:
+        for _ in range(runs):
+            local_path = os.path.join(work_dir, 'download.bin')
+            started = time.monotonic()
+            with open(local_path, 'wb') as f:
+                writer = HashingFileWriter(f)
+                if component.config['sftp_prefetch_requests']:
+                    component.sftp_client.getfo(f"/{file_name}", writer,
+                                                max_concurrent_prefetch_requests=component.config['sftp_prefetch_requests'])
+                else:
+                    component.sftp_client.getfo(f"/{file_name}", writer)
+            elapsed = time.monotonic() - started
+            results.append(writer.size / (1024 * 1024) / elapsed)
+    finally:
+        component.sftp_client.close()
+        component.ssh_client.close()
+        component.journal.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SFTP下载吞吐量基准测试（注入往返时延）")
+    parser.add_argument('--size-mb', type=int, default=16, help="测试文件大小(MB)")
+    parser.add_argument('--rtt-ms', type=float, default=200, help="注入的往返时延(毫秒)")
+    parser.add_argument('--runs', type=int, default=3, help="每种配置的下载次数")
+    args = parser.parse_args()
+    # 只输出结果表，连接日志降为警告级别
+    logging.getLogger().setLevel(logging.WARNING)
+    
+    with tempfile.TemporaryDirectory() as work_dir:
+        served_dir = os.path.join(work_dir, 'remote')
+        os.makedirs(served_dir)
+        file_name = 'payload.bin'
+        with open(os.path.join(served_dir, file_name), 'wb') as f:
+            f.write(os.urandom(args.size_mb * 1024 * 1024))
+        
+        host_key = paramiko.RSAKey.generate(2048)
+        sftp_listener = start_listener()
+        proxy_listener = start_listener()
+        proxy_port = proxy_listener.getsockname()[1]
+        threading.Thread(target=serve_sftp, args=(sftp_listener, host_key, served_dir), daemon=True).start()
+        threading.Thread(target=serve_latency_proxy,
+                         args=(proxy_listener, sftp_listener.getsockname()[1], args.rtt_ms / 1000),
+                         daemon=True).start()
+        
+        # 组件只信任known_hosts中的主机密钥: 使用临时HOME下的known_hosts
+        os.environ['HOME'] = work_dir
+        os.makedirs(os.path.join(work_dir, '.ssh'))
+        with open(os.path.join(work_dir, '.ssh', 'known_hosts'), 'w') as f:
+            f.write(f"[127.0.0.1]:{proxy_port} {host_key.get_name()} {host_key.get_base64()}\n")
+        
+        print(f"文件 {args.size_mb}MB, 往返时延 {args.rtt_ms:g}ms, 每种配置 {args.runs} 次")
+        print(f"{'配置':<24}{'平均MB/s':>10}{'最大MB/s':>10}")
+        for name, overrides in SCENARIOS:
+            results = measure(proxy_port, work_dir, file_name, overrides, args.runs)
+            print(f"{name:<24}{sum(results) / len(results):>10.2f}{max(results):>10.2f}")
+        
+        sftp_listener.close()
+        proxy_listener.close()
+
+
+if __name__ == "__main__":
+    main()
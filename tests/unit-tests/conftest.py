@@ -0,0 +1,8 @@
+"""单元测试公共配置: 把组件源码目录加入导入路径（部署后这些文件位于同一工件目录）"""
+
+import os
+import sys
+
+COMPONENTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir, 'components')
+for component in ('common', 'sftp-to-s3', 'mysql-to-s3', 'multi-source-host'):
+    sys.path.insert(0, os.path.join(COMPONENTS_DIR, component))
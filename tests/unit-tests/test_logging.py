@@ -0,0 +1,59 @@
+"""日志: 按模板限流与过期窗口清理，结构化日志合并汇总字段"""
+
+import json
+import logging
+
+from pipeline_common import JsonLogFormatter, RateLimitFilter
+
+
+def make_record(msg, *args, level=logging.INFO, fields=None):
+    record = logging.LogRecord('pipeline', level, __file__, 1, msg, args, None)
+    if fields is not None:
+        record.fields = fields
+    return record
+
+
+def test_rate_limit_groups_by_template_and_reports_suppressed(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr('pipeline_common.time.monotonic', lambda: clock[0])
+    rate_filter = RateLimitFilter(rate=2, interval=60)
+    
+    passed = [rate_filter.filter(make_record("上传完成: %s", f"file-{index}")) for index in range(5)]
+    assert passed == [True, True, False, False, False]
+    # 警告及以上不限流
+    assert rate_filter.filter(make_record("上传完成: %s", 'x', level=logging.WARNING))
+    
+    clock[0] += 60
+    record = make_record("上传完成: %s", 'file-5')
+    assert rate_filter.filter(record)
+    assert '另有3条相同日志被抑制' in record.getMessage()
+
+
+def test_rate_limit_expires_idle_windows(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr('pipeline_common.time.monotonic', lambda: clock[0])
+    rate_filter = RateLimitFilter(rate=1, interval=60)
+    
+    rate_filter.filter(make_record("只出现一次的模板 %s", 1))
+    rate_filter.filter(make_record("被抑制的模板 %s", 1))
+    rate_filter.filter(make_record("被抑制的模板 %s", 2))
+    assert len(rate_filter.windows) == 2
+    
+    # 一个周期后: 无抑制条数的窗口被清理，有抑制条数的窗口保留
+    clock[0] += 61
+    rate_filter.filter(make_record("新模板 %s", 1))
+    assert set(key[1] for key in rate_filter.windows) == {"被抑制的模板 %s", "新模板 %s"}
+    
+    # 两个周期后只剩最近出现的模板
+    clock[0] += 61
+    rate_filter.filter(make_record("新模板 %s", 2))
+    assert set(key[1] for key in rate_filter.windows) == {"新模板 %s"}
+
+
+def test_json_formatter_merges_fields():
+    record = make_record("本轮扫描完成: 新文件 %d", 3, fields={'source_id': 'sftp-a', 'new_files': 3})
+    entry = json.loads(JsonLogFormatter().format(record))
+    
+    assert entry['msg'] == "本轮扫描完成: 新文件 3"
+    assert entry['source_id'] == 'sftp-a'
+    assert entry['new_files'] == 3
@@ -0,0 +1,50 @@
+"""多源宿主: 线程池被替换或关闭时调度线程继续运行"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+pytest.importorskip('stream_manager')
+
+from multi_source_host import MultiSourceHost, SourceSlot
+
+
+class FakeSourceComponent:
+    def __init__(self):
+        self.config = {'scan_interval': 0}
+        self.cycles = 0
+    
+    def scan_once(self):
+        self.cycles += 1
+        return 0
+
+
+def test_scheduler_survives_executor_shutdown():
+    host = MultiSourceHost({'scheduler_tick': 0.01})
+    component = FakeSourceComponent()
+    slot = SourceSlot('sftp-a', 'sftp', component)
+    host.slots = [slot]
+    host.executor = ThreadPoolExecutor(max_workers=1)
+    host.executor_workers = 1
+    host.executor.shutdown(wait=True)
+    host.running = True
+    
+    scheduler = threading.Thread(target=host.scheduler_loop, daemon=True)
+    scheduler.start()
+    time.sleep(0.1)
+    assert scheduler.is_alive()
+    assert not slot.in_flight
+    
+    # 替换为新的线程池后恢复调度
+    with host.executor_lock:
+        host.executor = ThreadPoolExecutor(max_workers=1)
+    deadline = time.monotonic() + 2
+    while component.cycles == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    host.running = False
+    scheduler.join(timeout=1)
+    host.executor.shutdown(wait=True)
+    
+    assert component.cycles > 0
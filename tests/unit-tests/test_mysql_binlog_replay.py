@@ -0,0 +1,136 @@
+"""MySQL组件: 回放录制的binlog事件，检查导出的行和GTID检查点"""
+
+import json
+import os
+
+import pytest
+
+pytest.importorskip('mysql.connector')
+pytest.importorskip('stream_manager')
+
+from mysql_to_s3 import MySQLToS3Component
+
+FIXTURE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'binlog_orders.jsonl')
+SERVER_UUID = '3e11fa47-71ca-11e1-9e33-c80aa9429562'
+
+
+class FakeStreamManagerClient:
+    def __init__(self):
+        self.messages = []
+    
+    def append_message(self, stream_name, data):
+        self.messages.append(json.loads(data))
+        return len(self.messages)
+
+
+def replay(tmp_path, client):
+    component = MySQLToS3Component('mysql-a', {
+        'capture_mode': 'binlog',
+        'binlog_fixture_path': FIXTURE_PATH,
+        'spool_dir': str(tmp_path),
+        'export_journal_path': str(tmp_path / 'journal.jsonl'),
+        'binlog_checkpoint_file': str(tmp_path / 'checkpoint.json'),
+    }, client)
+    component.running = True
+    exported = component.run_binlog_stream()
+    component.journal.close()
+    return exported
+
+
+def exported_rows(client):
+    rows = []
+    for message in client.messages:
+        with open(message['inputUrl'][len('file:'):], 'r', encoding='utf-8') as f:
+            rows.extend(json.loads(line) for line in f)
+    return rows
+
+
+def load_checkpoint(tmp_path):
+    with open(tmp_path / 'checkpoint.json', 'r', encoding='utf-8') as f:
+        return json.load(f)['gtid_set']
+
+
+def test_replay_exports_committed_rows_and_checkpoint(tmp_path):
+    client = FakeStreamManagerClient()
+    
+    # 未提交的第3个事务不导出，也不进入检查点
+    assert replay(tmp_path, client) == 4
+    
+    rows = exported_rows(client)
+    assert [(row['op'], row['gtid']) for row in rows] == [
+        ('insert', f"{SERVER_UUID}:1"),
+        ('insert', f"{SERVER_UUID}:1"),
+        ('update', f"{SERVER_UUID}:2"),
+        ('delete', f"{SERVER_UUID}:2"),
+    ]
+    assert all(row['table'] == 'orders' for row in rows)
+    assert rows[2]['before']['status'] == 'new'
+    assert rows[2]['after']['status'] == 'paid'
+    assert rows[3]['before']['id'] == 2
+    assert rows[3]['after'] is None
+    assert load_checkpoint(tmp_path) == {SERVER_UUID: 2}
+
+
+def test_replay_skips_checkpointed_transactions(tmp_path):
+    replay(tmp_path, FakeStreamManagerClient())
+    
+    client = FakeStreamManagerClient()
+    assert replay(tmp_path, client) == 0
+    assert client.messages == []
+    assert load_checkpoint(tmp_path) == {SERVER_UUID: 2}
+
+
+def test_replay_resumes_after_partial_checkpoint(tmp_path):
+    with open(tmp_path / 'checkpoint.json', 'w', encoding='utf-8') as f:
+        json.dump({'gtid_set': {SERVER_UUID: 1}}, f)
+    
+    client = FakeStreamManagerClient()
+    assert replay(tmp_path, client) == 2
+    assert [row['op'] for row in exported_rows(client)] == ['update', 'delete']
+    assert load_checkpoint(tmp_path) == {SERVER_UUID: 2}
+
+
+def test_profile_request_samples_next_binlog_batch(tmp_path):
+    client = FakeStreamManagerClient()
+    component = MySQLToS3Component('mysql-a', {
+        'capture_mode': 'binlog',
+        'binlog_fixture_path': FIXTURE_PATH,
+        'spool_dir': str(tmp_path),
+        'export_journal_path': str(tmp_path / 'journal.jsonl'),
+        'binlog_checkpoint_file': str(tmp_path / 'checkpoint.json'),
+        'profile_dir': str(tmp_path),
+    }, client)
+    component.running = True
+    component.profiler.request_profile()
+    
+    component.run_binlog_stream()
+    component.journal.close()
+    
+    assert not component.profiler.profile_requested
+    assert len(list(tmp_path.glob('*.pstats'))) == 1
+
+
+def test_checkpoint_is_restored_from_journal_after_crash(tmp_path):
+    replay(tmp_path, FakeStreamManagerClient())
+    # 批次已在预写日志中提交，但崩溃前检查点文件还没有写入
+    with open(tmp_path / 'checkpoint.json', 'w', encoding='utf-8') as f:
+        json.dump({'gtid_set': {SERVER_UUID: 1}}, f)
+    
+    client = FakeStreamManagerClient()
+    assert replay(tmp_path, client) == 0
+    assert client.messages == []
+
+
+def test_pending_binlog_intent_is_not_resubmitted(tmp_path):
+    from pipeline_common import ExportJournal
+    
+    temp_file = tmp_path / 'partial.jsonl'
+    temp_file.write_text('{}\n')
+    journal = ExportJournal(str(tmp_path / 'journal.jsonl'))
+    journal.begin('b1', 'prefix/partial.jsonl', str(temp_file), {'table': 'orders'}, {})
+    journal.close()
+    
+    client = FakeStreamManagerClient()
+    assert replay(tmp_path, client) == 4
+    assert all(message['key'] != 'prefix/partial.jsonl' for message in client.messages)
+    assert load_checkpoint(tmp_path) == {SERVER_UUID: 2}
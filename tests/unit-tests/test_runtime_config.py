@@ -0,0 +1,91 @@
+"""运行时配置: 按声明的类型转换配置值，默认值为None的可选项同样转换"""
+
+import pytest
+
+from pipeline_common import coerce_config_value
+
+
+@pytest.mark.parametrize('value_type, value, expected', [
+    (int, '3145728', 3145728),
+    (int, 64.0, 64),
+    (int, '', None),
+    (int, None, None),
+    (float, '0.01', 0.01),
+    (bool, 'TRUE', True),
+    (bool, 0, False),
+    (list, 'aes128-ctr,aes256-ctr', ['aes128-ctr', 'aes256-ctr']),
+    (dict, '{"orders": {"mode": "id"}}', {'orders': {'mode': 'id'}}),
+    (str, 12345, '12345'),
+    (str, '', ''),
+])
+def test_coerce_config_value(value_type, value, expected):
+    assert coerce_config_value(value_type, value) == expected
+
+
+@pytest.mark.parametrize('value_type, value', [
+    (int, 1.5),
+    (int, 'abc'),
+    (bool, 'yes'),
+    (list, 3),
+    (dict, '[1, 2]'),
+    (str, ['a']),
+])
+def test_coerce_config_value_rejects_invalid_values(value_type, value):
+    with pytest.raises((TypeError, ValueError)):
+        coerce_config_value(value_type, value)
+
+
+def test_every_setting_declares_a_type(tmp_path):
+    pytest.importorskip('paramiko')
+    pytest.importorskip('mysql.connector')
+    pytest.importorskip('stream_manager')
+    from mysql_to_s3 import MySQLToS3Component
+    from sftp_to_s3 import SFTPToS3Component
+    
+    for component_class in (SFTPToS3Component, MySQLToS3Component):
+        component = component_class('a', {'spool_dir': str(tmp_path)}, object())
+        assert set(component_class.CONFIG_TYPES) == set(component.config)
+        component.journal.close()
+
+
+def test_optional_settings_are_coerced_at_runtime(tmp_path):
+    pytest.importorskip('paramiko')
+    pytest.importorskip('stream_manager')
+    from sftp_to_s3 import SFTPToS3Component
+    
+    component = SFTPToS3Component('a', {'spool_dir': str(tmp_path)}, object())
+    changed = component.apply_runtime_config({
+        'ssh_window_size': '3145728',
+        'ssh_max_packet_size': 32768.0,
+        'sftp_prefetch_requests': '64',
+        'dedup_bloom_path': str(tmp_path / 'bloom.bin'),
+    }, initial=True)
+    
+    assert changed == {
+        'ssh_window_size': 3145728,
+        'ssh_max_packet_size': 32768,
+        'sftp_prefetch_requests': 64,
+        'dedup_bloom_path': str(tmp_path / 'bloom.bin'),
+    }
+    assert component.apply_runtime_config({'ssh_window_size': 'large'}) == {}
+    assert component.config['ssh_window_size'] == 3145728
+    component.journal.close()
+
+
+def test_host_overrides_are_coerced_at_construction(tmp_path):
+    pytest.importorskip('mysql.connector')
+    pytest.importorskip('stream_manager')
+    from mysql_to_s3 import MySQLToS3Component
+    
+    component = MySQLToS3Component('a', {
+        'spool_dir': str(tmp_path),
+        'batch_size': 250.0,
+        'polling_interval': '60',
+        'monitored_tables': 'orders,events',
+    }, object())
+    
+    assert component.config['batch_size'] == 250
+    assert isinstance(component.config['batch_size'], int)
+    assert component.config['polling_interval'] == 60
+    assert component.config['monitored_tables'] == ['orders', 'events']
+    component.journal.close()
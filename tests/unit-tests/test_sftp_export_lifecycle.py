@@ -0,0 +1,128 @@
+"""SFTP组件: 未确认导出的持久化与重启后重新提交，内容去重，宿主模式下按源区分的文件路径"""
+
+import hashlib
+
+import pytest
+
+pytest.importorskip('paramiko')
+pytest.importorskip('stream_manager')
+
+from sftp_to_s3 import SFTPToS3Component
+
+
+class FakeStreamManagerClient:
+    def __init__(self):
+        self.messages = []
+    
+    def append_message(self, stream_name, data):
+        self.messages.append(data)
+        return len(self.messages)
+
+
+class FakeSFTPClient:
+    def __init__(self, files):
+        self.files = files
+    
+    def getfo(self, remote_path, writer, **kwargs):
+        writer.write(self.files[remote_path.rsplit('/', 1)[-1]])
+
+
+def make_component(tmp_path, client, **overrides):
+    config = {
+        'spool_dir': str(tmp_path),
+        'export_journal_path': str(tmp_path / 'journal.jsonl'),
+        'post_export_action': 'move',
+        **overrides,
+    }
+    return SFTPToS3Component('sftp-a', config, client)
+
+
+def test_unconfirmed_export_is_resubmitted_after_restart(tmp_path):
+    temp_file = tmp_path / 'data.json'
+    temp_file.write_text('{}')
+    manifest = {'batch_id': 'b1', 'files': 'in/data.json', 'content_sha256': 'abc'}
+    component = make_component(tmp_path, FakeStreamManagerClient())
+    component.append_export_task('prefix/data.json', str(temp_file), manifest)
+    component.journal.close()
+    
+    client = FakeStreamManagerClient()
+    restarted = make_component(tmp_path, client)
+    assert list(restarted.unconfirmed_exports) == ['prefix/data.json']
+    restarted.resubmit_unconfirmed_exports()
+    
+    assert len(client.messages) == 1
+    assert restarted.pending_exports == {'prefix/data.json': manifest}
+    assert restarted.handle_export_status('prefix/data.json', 'Success')
+    assert restarted.confirmed_files == ['in/data.json']
+    assert restarted.journal.state['unconfirmed_exports'] == {}
+
+
+def test_unconfirmed_export_without_temp_file_is_left_in_place(tmp_path):
+    manifest = {'batch_id': 'b1', 'files': 'in/data.json', 'content_sha256': 'abc'}
+    component = make_component(tmp_path, FakeStreamManagerClient())
+    component.append_export_task('prefix/data.json', str(tmp_path / 'gone.json'), manifest)
+    component.journal.close()
+    
+    client = FakeStreamManagerClient()
+    restarted = make_component(tmp_path, client)
+    restarted.resubmit_unconfirmed_exports()
+    
+    assert client.messages == []
+    assert restarted.pending_exports == {}
+    assert restarted.journal.state['unconfirmed_exports'] == {}
+
+
+def test_env_paths_are_scoped_per_source_in_host_mode(tmp_path, monkeypatch):
+    monkeypatch.setenv('EXPORT_JOURNAL_PATH', str(tmp_path / 'journal.jsonl'))
+    monkeypatch.setenv('STORE_BUFFER_DIR', str(tmp_path / 'buffer'))
+    client = FakeStreamManagerClient()
+    
+    first = SFTPToS3Component('sftp-a', {'spool_dir': str(tmp_path)}, client)
+    second = SFTPToS3Component('sftp-b', {'spool_dir': str(tmp_path)}, client)
+    
+    assert first.config['export_journal_path'] == str(tmp_path / 'journal_sftp-a.jsonl')
+    assert second.config['export_journal_path'] == str(tmp_path / 'journal_sftp-b.jsonl')
+    assert first.config['store_buffer_dir'] == str(tmp_path / 'buffer_sftp-a')
+
+
+def test_failed_upload_is_exported_again_on_next_scan(tmp_path):
+    client = FakeStreamManagerClient()
+    component = make_component(tmp_path, client)
+    component.sftp_client = FakeSFTPClient({'a.json': b'[1]', 'b.json': b'[1]'})
+    component.walk_remote_tree = lambda: {'a.json': (3, 100)}
+    content_hash = hashlib.sha256(b'[1]').hexdigest()
+    
+    assert component.scan_sftp_files() == ['a.json']
+    assert component.download_and_process_file('a.json')
+    assert component.scan_sftp_files() == []
+    s3_key = next(iter(component.pending_exports))
+    
+    # 上传失败: 不记录内容哈希，清除已处理签名（内存和预写日志），下一轮扫描重新导出
+    component.handle_export_status(s3_key, 'Failure')
+    assert not component.dedup_cache.seen(content_hash)
+    assert component.confirmed_files == []
+    assert 'a.json' not in component.journal.state['processed_files']
+    assert component.scan_sftp_files() == ['a.json']
+    
+    assert component.download_and_process_file('a.json')
+    assert component.scan_sftp_files() == []
+    s3_key = next(iter(component.pending_exports))
+    component.handle_export_status(s3_key, 'Success')
+    assert component.dedup_cache.confirmed(content_hash)
+    
+    # 原内容已确认上传，重复文件跳过上传并执行后续动作
+    assert component.download_and_process_file('b.json')
+    assert len(client.messages) == 2
+    assert component.confirmed_files == ['a.json', 'b.json']
+
+
+def test_unconfirmed_duplicate_is_left_in_place(tmp_path):
+    client = FakeStreamManagerClient()
+    component = make_component(tmp_path, client, dedup_bloom_path=str(tmp_path / 'bloom.bin'))
+    component.sftp_client = FakeSFTPClient({'b.json': b'[1]'})
+    component.dedup_cache.bloom.add(hashlib.sha256(b'[1]').hexdigest())
+    
+    assert component.download_and_process_file('b.json')
+    assert client.messages == []
+    assert component.confirmed_files == []
+    assert 'b.json' in component.processed_files
@@ -0,0 +1,97 @@
+"""本地存储转发缓冲区: 分批排空、暂停后续排、重启恢复和淘汰策略"""
+
+import os
+
+from pipeline_common import StoreAndForwardBuffer
+
+
+def fill(buffer, count, priority=0, size=200):
+    for index in range(count):
+        buffer.append(f"key-{priority}-{index}", os.urandom(size), {'index': index}, priority=priority)
+
+
+def drain_with_backpressure(buffer, high_water_tasks, low_water_tasks, rounds):
+    """模拟准入控制: 每轮最多提交到高水位，轮间在途任务完成到低水位"""
+    submitted = []
+    in_flight = 0
+    for _ in range(rounds):
+        if buffer.empty():
+            break
+        buffer.drain(lambda key, content, manifest: submitted.append(key),
+                     lambda: len(submitted) - in_flight < high_water_tasks)
+        in_flight = len(submitted) - low_water_tasks
+    return submitted
+
+
+def test_drain_larger_than_high_water_resumes_where_it_paused(tmp_path):
+    buffer = StoreAndForwardBuffer(str(tmp_path), budget_bytes=10 * 1024 * 1024, segment_bytes=10 * 1024 * 1024)
+    fill(buffer, 200)
+    
+    submitted = drain_with_backpressure(buffer, high_water_tasks=50, low_water_tasks=20, rounds=20)
+    
+    assert submitted == [f"key-0-{index}" for index in range(200)]
+    assert buffer.empty()
+    assert buffer.depth_records() == 0
+    assert os.listdir(tmp_path) == []
+
+
+def test_depth_shrinks_while_segment_is_partially_drained(tmp_path):
+    buffer = StoreAndForwardBuffer(str(tmp_path), budget_bytes=10 * 1024 * 1024, segment_bytes=10 * 1024 * 1024)
+    fill(buffer, 100)
+    total_bytes = buffer.depth_bytes()
+    submitted = []
+    
+    buffer.drain(lambda key, content, manifest: submitted.append(key), lambda: len(submitted) < 40)
+    
+    assert buffer.depth_records() == 60
+    assert buffer.depth_bytes() < total_bytes
+    # 部分排空的段仍占用整段磁盘空间
+    assert buffer.disk_bytes() == total_bytes
+
+
+def test_restart_resumes_from_saved_offset(tmp_path):
+    buffer = StoreAndForwardBuffer(str(tmp_path), budget_bytes=10 * 1024 * 1024, segment_bytes=10 * 1024 * 1024)
+    fill(buffer, 100)
+    first = []
+    buffer.drain(lambda key, content, manifest: first.append(key), lambda: len(first) < 30)
+    buffer.close()
+    
+    reopened = StoreAndForwardBuffer(str(tmp_path), budget_bytes=10 * 1024 * 1024, segment_bytes=10 * 1024 * 1024)
+    assert reopened.depth_records() == 70
+    second = []
+    reopened.drain(lambda key, content, manifest: second.append(key), lambda: True)
+    
+    assert first + second == [f"key-0-{index}" for index in range(100)]
+    assert reopened.empty()
+
+
+def test_failed_submit_keeps_record_for_next_drain(tmp_path):
+    buffer = StoreAndForwardBuffer(str(tmp_path), budget_bytes=10 * 1024 * 1024, segment_bytes=10 * 1024 * 1024)
+    fill(buffer, 10)
+    submitted = []
+    
+    def flaky_submit(key, content, manifest):
+        if len(submitted) == 5:
+            raise IOError("stream unavailable")
+        submitted.append(key)
+    
+    try:
+        buffer.drain(flaky_submit, lambda: True)
+    except IOError:
+        pass
+    buffer.drain(lambda key, content, manifest: submitted.append(key), lambda: True)
+    
+    assert submitted == [f"key-0-{index}" for index in range(10)]
+
+
+def test_drains_higher_priority_first_and_evicts_lowest_priority(tmp_path):
+    buffer = StoreAndForwardBuffer(str(tmp_path), budget_bytes=6000, segment_bytes=1500, eviction='priority')
+    fill(buffer, 3, priority=1, size=600)
+    fill(buffer, 9, priority=0, size=600)
+    submitted = []
+    
+    buffer.drain(lambda key, content, manifest: submitted.append(key), lambda: True)
+    
+    assert submitted[:3] == ['key-1-0', 'key-1-1', 'key-1-2']
+    assert buffer.evicted_records > 0
+    assert all(key.startswith('key-0-') for key in submitted[3:])